@@ -2,18 +2,16 @@
 
 import os.path as osp
 
-import torch
 import numpy as np
 import cv2
 
-from .utils.prior_box import PriorBox
+from .utils.prior_box import prior_boxes
 from .utils.nms_wrapper import nms
 from .utils.box_utils import decode
 from .utils.timer import Timer
 from .utils.config import cfg
-from .onnx import convert_to_onnx
-
-import onnxruntime
+from ..utils.session import get_session
+from ..utils.model_cache import ensure_model, ensure_variant, faceboxes_model
 
 # some global configs
 confidence_threshold = 0.05
@@ -46,67 +44,72 @@ def viz_bbox(img, dets, wfp='out.jpg'):
 
 
 class FaceBoxes_ONNX(object):
-    def __init__(self, timer_flag=False):
-        if not osp.exists(onnx_path):
-            convert_to_onnx(onnx_path)
-        self.session = onnxruntime.InferenceSession(onnx_path, None)
+    def __init__(self, timer_flag=False, session_options=None, fused_io=False, max_height=HEIGHT, max_width=WIDTH,
+                 variant=None):
+        # validated against its build record, and only exported (which needs
+        # torch) if missing or changed, see utils/model_cache.py
+        model_path = ensure_model(*faceboxes_model(fused_io=fused_io))
+        # optimized ('opt') or quantized ('int8') variant of the detector
+        if variant is not None:
+            model_path = ensure_variant(model_path, variant)
+        self.session = get_session(model_path, **(session_options or {}))
+        # models exported with fused_io take the raw uint8 NHWC frame
+        self.fused_io = self.session.get_inputs()[0].type == 'tensor(uint8)'
 
         self.timer_flag = timer_flag
+        # frames are downscaled to fit within max_height x max_width for inference
+        self.max_height, self.max_width = max_height, max_width
+
+    def __call__(self, img_, scale=None):
+        """Detect faces, returning [xmin, ymin, xmax, ymax, score] boxes in the pixels of img_
 
-    def __call__(self, img_):
-        img_raw = img_.copy()
+        scale: factor img_ is resized by for inference, by default the largest one
+            fitting it within max_height x max_width
+        """
+        img_raw = img_
 
         # scaling to speed up
-        scale = 1
-        if scale_flag:
-            h, w = img_raw.shape[:2]
-            if h > HEIGHT:
-                scale = HEIGHT / h
-            if w * scale > WIDTH:
-                scale *= WIDTH / (w * scale)
-            # print(scale)
-            if scale == 1:
-                img_raw_scale = img_raw
-            else:
-                h_s = int(scale * h)
-                w_s = int(scale * w)
-                # print(h_s, w_s)
-                img_raw_scale = cv2.resize(img_raw, dsize=(w_s, h_s))
-                # print(img_raw_scale.shape)
-
-            img = np.float32(img_raw_scale)
+        h, w = img_raw.shape[:2]
+        if scale is None:
+            scale = 1
+            if scale_flag:
+                if h > self.max_height:
+                    scale = self.max_height / h
+                if w * scale > self.max_width:
+                    scale *= self.max_width / (w * scale)
+        if scale == 1:
+            img = img_raw
         else:
-            img = np.float32(img_raw)
+            h_s = int(scale * h)
+            w_s = int(scale * w)
+            img = cv2.resize(img_raw, dsize=(w_s, h_s))
 
         # forward
         _t = {'forward_pass': Timer(), 'misc': Timer()}
         im_height, im_width, _ = img.shape
-        scale_bbox = torch.Tensor([img.shape[1], img.shape[0], img.shape[1], img.shape[0]])
+        scale_bbox = np.array([img.shape[1], img.shape[0], img.shape[1], img.shape[0]], dtype=np.float32)
 
-        img -= (104, 117, 123)
-        img = img.transpose(2, 0, 1)
-        # img = torch.from_numpy(img).unsqueeze(0)
-        img = img[np.newaxis, ...]
+        if self.fused_io:
+            img = np.ascontiguousarray(img[np.newaxis, ...])
+        else:
+            img = np.float32(img)
+            img -= (104, 117, 123)
+            img = img.transpose(2, 0, 1)
+            # img = torch.from_numpy(img).unsqueeze(0)
+            img = img[np.newaxis, ...]
 
         _t['forward_pass'].tic()
         # loc, conf = self.net(img)  # forward pass
         out = self.session.run(None, {'input': img})
         loc, conf = out[0], out[1]
-        # for compatibility, may need to optimize
-        loc = torch.from_numpy(loc)
         _t['forward_pass'].toc()
         _t['misc'].tic()
 
-        priorbox = PriorBox(image_size=(im_height, im_width))
-        priors = priorbox.forward()
-        prior_data = priors.data
-        boxes = decode(loc.data.squeeze(0), prior_data, cfg['variance'])
-        if scale_flag:
-            boxes = boxes * scale_bbox / scale / resize
-        else:
-            boxes = boxes * scale_bbox / resize
+        # priors are cached per image size, decoded in numpy
+        priors = prior_boxes((im_height, im_width))
+        boxes = decode(loc[0], priors, cfg['variance'])
+        boxes = boxes * scale_bbox / scale / resize
 
-        boxes = boxes.cpu().numpy()
         scores = conf[0][:, 1]
         # scores = conf.squeeze(0).data.cpu().numpy()[:, 1]
 
@@ -115,8 +118,12 @@ class FaceBoxes_ONNX(object):
         boxes = boxes[inds]
         scores = scores[inds]
 
-        # keep top-K before NMS
-        order = scores.argsort()[::-1][:top_k]
+        # keep top-K before NMS, only sorting the boxes kept
+        if len(scores) > top_k:
+            order = np.argpartition(scores, -top_k)[-top_k:]
+            order = order[scores[order].argsort()[::-1]]
+        else:
+            order = scores.argsort()[::-1]
         boxes = boxes[order]
         scores = scores[order]
 
@@ -1 +1,9 @@
-from .FaceBoxes import FaceBoxes
+# the pytorch detector is imported on first use, so that FaceBoxes_ONNX
+# can be used without torch installed
+
+
+def __getattr__(name):
+    if name == 'FaceBoxes':
+        from .FaceBoxes import FaceBoxes
+        return FaceBoxes
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
@@ -0,0 +1,57 @@
+# coding: utf-8
+
+"""
+Micro-benchmark of the NMS backends in utils/nms_wrapper.py, checking that all
+of them keep exactly the same boxes as py_cpu_nms. Run from the repository root:
+
+    python -m EdiHeadyTrack.TDDFA_v2.FaceBoxes.benchmark_nms
+"""
+
+import timeit
+import numpy as np
+
+from .utils.nms_wrapper import available_backends, get_backend
+
+nms_threshold = 0.3
+
+
+def make_dets(n, n_faces=4, seed=0, width=1080, height=720):
+    """Candidate boxes as they reach NMS: clusters of jittered boxes around a few
+    faces, plus boxes scattered over the frame, sorted by score"""
+    rng = np.random.default_rng(seed)
+    n_face = n // 2
+    centres = rng.uniform((100, 100), (width - 100, height - 100), (n_faces, 2))
+    sizes = rng.uniform(40, 200, n_faces)
+    face = rng.integers(n_faces, size=n_face)
+    ctr = centres[face] + rng.normal(0, 0.1, (n_face, 2)) * sizes[face, None]
+    wh = sizes[face, None] * rng.uniform(0.8, 1.2, (n_face, 2))
+    scores = rng.uniform(0.5, 1, n_face)
+
+    ctr = np.vstack((ctr, rng.uniform((0, 0), (width, height), (n - n_face, 2))))
+    wh = np.vstack((wh, rng.uniform(10, 300, (n - n_face, 2))))
+    scores = np.concatenate((scores, rng.uniform(0.05, 0.5, n - n_face)))
+
+    dets = np.hstack((ctr - wh / 2, ctr + wh / 2, scores[:, None])).astype(np.float32)
+    return dets[np.argsort(-scores)]
+
+
+def main():
+    backends = available_backends()
+    print(f'NMS backends: {", ".join(backends)}')
+    reference = get_backend('python')
+    repeat, number = 5, 20
+
+    for n in (100, 1000, 5000):
+        dets = make_dets(n)
+        keep = list(reference(dets, nms_threshold))
+        print(f'{n} boxes, {len(keep)} kept')
+        for name in backends:
+            func = get_backend(name)
+            assert list(func(dets, nms_threshold)) == keep, f'{name} keeps different boxes'
+            res = timeit.repeat(lambda: func(dets, nms_threshold), repeat=repeat, number=number)
+            res = np.array(res, dtype=np.float32) / number
+            print('  {:8s} {:.3f}±{:.3f} ms'.format(name, np.mean(res) * 1000, np.std(res) * 1000))
+
+
+if __name__ == '__main__':
+    main()
@@ -8,8 +8,23 @@ from .models.faceboxes import FaceBoxesNet
 from .utils.functions import load_model
 
 
-def convert_to_onnx(onnx_path):
-    pretrained_path = onnx_path.replace('.onnx', '.pth')
+class FusedIO(torch.nn.Module):
+    """Wraps the detector so that the exported graph takes the raw uint8 NHWC BGR
+    frame, leaving the float cast, mean subtraction and transpose to onnxruntime"""
+
+    def __init__(self, net):
+        super(FusedIO, self).__init__()
+        self.net = net
+        self.register_buffer('mean', torch.tensor([104., 117., 123.]).view(1, 3, 1, 1))
+
+    def forward(self, inp):
+        return self.net(inp.permute(0, 3, 1, 2).float() - self.mean)
+
+
+def convert_to_onnx(onnx_path, fused_io=False, pretrained_path=None):
+    """Export the detector, taking the raw frame with fused_io=True, see FusedIO"""
+    if pretrained_path is None:
+        pretrained_path = onnx_path.replace('_fused.onnx', '.onnx').replace('.onnx', '.pth')
     # 1. load model
     torch.set_grad_enabled(False)
     net = FaceBoxesNet(phase='test', size=None, num_classes=2)  # initialize detector
@@ -18,7 +33,14 @@ def convert_to_onnx(onnx_path):
 
     # 2. convert
     batch_size = 1
-    dummy_input = torch.randn(batch_size, 3, 720, 1080)
+    if fused_io:
+        net = FusedIO(net)
+        net.eval()
+        dummy_input = torch.randint(0, 256, (batch_size, 720, 1080, 3), dtype=torch.uint8)
+        dynamic_axes = [0, 1, 2]
+    else:
+        dummy_input = torch.randn(batch_size, 3, 720, 1080)
+        dynamic_axes = [0, 2, 3]
     # export with dynamic axes for various input sizes
     torch.onnx.export(
         net,
@@ -27,7 +49,7 @@ def convert_to_onnx(onnx_path):
         input_names=['input'],
         output_names=['output'],
         dynamic_axes={
-            'input': [0, 2, 3],
+            'input': dynamic_axes,
             'output': [0]
         },
         do_constant_folding=True
@@ -1,6 +1,5 @@
 # coding: utf-8
 
-import torch
 import numpy as np
 
 
@@ -12,6 +11,7 @@ def point_form(boxes):
     Return:
         boxes: (tensor) Converted xmin, ymin, xmax, ymax form of boxes.
     """
+    import torch
     return torch.cat((boxes[:, :2] - boxes[:, 2:] / 2,  # xmin, ymin
                       boxes[:, :2] + boxes[:, 2:] / 2), 1)  # xmax, ymax
 
@@ -24,6 +24,7 @@ def center_size(boxes):
     Return:
         boxes: (tensor) Converted xmin, ymin, xmax, ymax form of boxes.
     """
+    import torch
     return torch.cat((boxes[:, 2:] + boxes[:, :2]) / 2,  # cx, cy
                      boxes[:, 2:] - boxes[:, :2], 1)  # w, h
 
@@ -39,6 +40,7 @@ def intersect(box_a, box_b):
     Return:
       (tensor) intersection area, Shape: [A,B].
     """
+    import torch
     A = box_a.size(0)
     B = box_b.size(0)
     max_xy = torch.min(box_a[:, 2:].unsqueeze(1).expand(A, B, 2),
@@ -161,6 +163,7 @@ def encode(matched, priors, variances):
     Return:
         encoded boxes (tensor), Shape: [num_priors, 4]
     """
+    import torch
 
     # dist b/t match center and prior's center
     g_cxcy = (matched[:, :2] + matched[:, 2:]) / 2 - priors[:, :2]
@@ -178,15 +181,24 @@ def decode(loc, priors, variances):
     """Decode locations from predictions using priors to undo
     the encoding we did for offset regression at train time.
     Args:
-        loc (tensor): location predictions for loc layers,
+        loc (tensor or ndarray): location predictions for loc layers,
             Shape: [num_priors,4]
-        priors (tensor): Prior boxes in center-offset form.
+        priors (tensor or ndarray): Prior boxes in center-offset form.
             Shape: [num_priors,4].
         variances: (list[float]) Variances of priorboxes
     Return:
-        decoded bounding box predictions
+        decoded bounding box predictions, of the same type as loc
     """
 
+    if isinstance(loc, np.ndarray):
+        boxes = np.concatenate((
+            priors[:, :2] + loc[:, :2] * variances[0] * priors[:, 2:],
+            priors[:, 2:] * np.exp(loc[:, 2:] * variances[1])), 1)
+        boxes[:, :2] -= boxes[:, 2:] / 2
+        boxes[:, 2:] += boxes[:, :2]
+        return boxes
+
+    import torch
     boxes = torch.cat((
         priors[:, :2] + loc[:, :2] * variances[0] * priors[:, 2:],
         priors[:, 2:] * torch.exp(loc[:, 2:] * variances[1])), 1)
@@ -202,6 +214,7 @@ def log_sum_exp(x):
     Args:
         x (Variable(tensor)): conf_preds from conf layers
     """
+    import torch
     x_max = x.data.max()
     return torch.log(torch.sum(torch.exp(x - x_max), 1, keepdim=True)) + x_max
 
@@ -220,6 +233,7 @@ def nms(boxes, scores, overlap=0.5, top_k=200):
     Return:
         The indices of the kept boxes with respect to num_priors.
     """
+    import torch
 
     keep = torch.Tensor(scores.size(0)).fill_(0).long()
     if boxes.numel() == 0:
@@ -7,16 +7,121 @@
 # Written by Ross Girshick
 # --------------------------------------------------------
 
-# from .nms.py_cpu_nms import cpu_nms, cpu_soft_nms
-# import .nms.py_cpu_nms as cpu_nms
-# import sys
-# sys.path.insert(1, '/path/to/application/app/folder')
-# from EdiHeadyTrack.TDDFA_v2.utils import nms.py_cpu_nms.py
+# NMS backends, fastest first. The first one which loads is picked at import,
+# set_backend switches to another one. All backends follow py_cpu_nms: boxes
+# are (x1, y1, x2, y2, score) with inclusive pixel coordinates (widths are
+# x2 - x1 + 1) and a box is suppressed when its overlap is above thresh.
+
+import numpy as np
+
+from .nms.py_cpu_nms import py_cpu_nms
+
+
+def _load_cython():
+    # only there once built, see build_cpu_nms.sh
+    from .nms.cpu_nms import cpu_nms
+    return lambda dets, thresh: cpu_nms(np.ascontiguousarray(dets, dtype=np.float32), thresh)
+
+
+def _load_opencv():
+    import cv2
+    if not hasattr(cv2, 'dnn') or not hasattr(cv2.dnn, 'NMSBoxes'):
+        raise ImportError('cv2.dnn.NMSBoxes is not available')
+
+    def opencv_nms(dets, thresh):
+        # NMSBoxes takes (x, y, w, h) boxes, w and h here include the end pixel
+        boxes = dets[:, :4].astype(np.float64)
+        boxes[:, 2:] -= boxes[:, :2] - 1
+        # and only keeps scores above a non-negative threshold
+        scores = dets[:, 4].astype(np.float64)
+        scores -= scores.min() - 1
+        keep = cv2.dnn.NMSBoxes(boxes, scores, 0., float(thresh))
+        return np.asarray(keep, dtype=np.int64).reshape(-1).tolist()
+    return opencv_nms
+
+
+def _load_numpy():
+    return numpy_nms
+
+
+def _load_python():
+    return py_cpu_nms
+
+
+_loaders = {
+    'cython': _load_cython,
+    'opencv': _load_opencv,
+    'numpy': _load_numpy,
+    'python': _load_python,
+}
+_backends = {}
+
+
+def numpy_nms(dets, thresh):
+    """NMS over boxes sorted once into contiguous arrays: still one numpy pass
+    per kept box, but suppressed boxes are dropped from the arrays as they
+    pile up instead of being indexed out on every pass"""
+    order = dets[:, 4].argsort()[::-1]
+    x1, y1, x2, y2 = np.ascontiguousarray(dets[order, :4].T)
+    areas = (x2 - x1 + 1) * (y2 - y1 + 1)
+    suppressed = np.zeros(len(order), dtype=bool)
+
+    keep = []
+    i = 0
+    while i < len(order):
+        if suppressed[i]:
+            i += 1
+            continue
+        keep.append(int(order[i]))
+        w = np.minimum(x2[i], x2[i + 1:]) - np.maximum(x1[i], x1[i + 1:]) + 1
+        h = np.minimum(y2[i], y2[i + 1:]) - np.maximum(y1[i], y1[i + 1:]) + 1
+        inter = np.maximum(0.0, w) * np.maximum(0.0, h)
+        suppressed[i + 1:] |= inter / (areas[i] + areas[i + 1:] - inter) > thresh
+        i += 1
+
+        # drop the suppressed boxes once they are most of what is left
+        alive = ~suppressed[i:]
+        if 2 * np.count_nonzero(alive) < len(alive):
+            order, x1, y1, x2, y2, areas = (a[i:][alive] for a in (order, x1, y1, x2, y2, areas))
+            suppressed = np.zeros(len(order), dtype=bool)
+            i = 0
+    return keep
+
+
+def available_backends():
+    """Names of the NMS backends which load here, fastest first"""
+    names = []
+    for name, loader in _loaders.items():
+        if name not in _backends:
+            try:
+                _backends[name] = loader()
+            except ImportError:
+                continue
+        names.append(name)
+    return names
+
+
+def get_backend(name):
+    """The NMS function of a backend"""
+    if name not in _loaders:
+        raise ValueError(f'Unknown NMS backend {name}, expected one of {list(_loaders)}')
+    if name not in available_backends():
+        raise ImportError(f'NMS backend {name} is not available')
+    return _backends[name]
+
+
+def set_backend(name):
+    """Use a given backend for nms"""
+    global backend, cpu_nms
+    cpu_nms = get_backend(name)
+    backend = name
+
+
+set_backend(available_backends()[0])
 
-from .nms.py_cpu_nms import py_cpu_nms as cpu_nms
 
 def nms(dets, thresh):
-    """Dispatch to either CPU or GPU NMS implementations."""
+    """Dispatch to the selected NMS backend."""
 
     if dets.shape[0] == 0:
         return []
@@ -2,8 +2,8 @@
 
 from .config import cfg
 
-import torch
-from itertools import product as product
+import numpy as np
+from functools import lru_cache
 from math import ceil
 
 
@@ -18,31 +18,47 @@ class PriorBox(object):
         self.feature_maps = [[ceil(self.image_size[0] / step), ceil(self.image_size[1] / step)] for step in self.steps]
 
     def forward(self):
-        anchors = []
-        for k, f in enumerate(self.feature_maps):
-            min_sizes = self.min_sizes[k]
-            for i, j in product(range(f[0]), range(f[1])):
-                for min_size in min_sizes:
-                    s_kx = min_size / self.image_size[1]
-                    s_ky = min_size / self.image_size[0]
-                    if min_size == 32:
-                        dense_cx = [x * self.steps[k] / self.image_size[1] for x in
-                                    [j + 0, j + 0.25, j + 0.5, j + 0.75]]
-                        dense_cy = [y * self.steps[k] / self.image_size[0] for y in
-                                    [i + 0, i + 0.25, i + 0.5, i + 0.75]]
-                        for cy, cx in product(dense_cy, dense_cx):
-                            anchors += [cx, cy, s_kx, s_ky]
-                    elif min_size == 64:
-                        dense_cx = [x * self.steps[k] / self.image_size[1] for x in [j + 0, j + 0.5]]
-                        dense_cy = [y * self.steps[k] / self.image_size[0] for y in [i + 0, i + 0.5]]
-                        for cy, cx in product(dense_cy, dense_cx):
-                            anchors += [cx, cy, s_kx, s_ky]
-                    else:
-                        cx = (j + 0.5) * self.steps[k] / self.image_size[1]
-                        cy = (i + 0.5) * self.steps[k] / self.image_size[0]
-                        anchors += [cx, cy, s_kx, s_ky]
         # back to torch land
-        output = torch.Tensor(anchors).view(-1, 4)
-        if self.clip:
-            output.clamp_(max=1, min=0)
-        return output
+        import torch
+        return torch.from_numpy(prior_boxes(tuple(self.image_size)).copy())
+
+
+def _cell_offsets(min_sizes):
+    """Anchor (x offset, y offset, min size) within one feature map cell, in the
+    order the anchors are laid out: densified 32 and 64 anchors row by row"""
+    offsets = []
+    for min_size in min_sizes:
+        if min_size == 32:
+            dense = [0, 0.25, 0.5, 0.75]
+        elif min_size == 64:
+            dense = [0, 0.5]
+        else:
+            dense = [0.5]
+        offsets += [(dx, dy, min_size) for dy in dense for dx in dense]
+    return np.array(offsets, dtype=np.float64)
+
+
+@lru_cache(maxsize=8)
+def prior_boxes(image_size):
+    """Prior boxes (cx, cy, s_kx, s_ky) of an image size (height, width), as
+    float32 array of shape (num_priors, 4)
+
+    Every frame of a video has the same size, so the priors are memoized;
+    the returned array is read-only and shared between calls
+    """
+    height, width = image_size
+    anchors = []
+    for step, min_sizes in zip(cfg['steps'], cfg['min_sizes']):
+        rows, cols = ceil(height / step), ceil(width / step)
+        offsets = _cell_offsets(min_sizes)
+        i, j = np.meshgrid(np.arange(rows), np.arange(cols), indexing='ij')
+        cx = (j[..., None] + offsets[:, 0]) * step / width
+        cy = (i[..., None] + offsets[:, 1]) * step / height
+        s_kx = np.broadcast_to(offsets[:, 2] / width, cx.shape)
+        s_ky = np.broadcast_to(offsets[:, 2] / height, cx.shape)
+        anchors.append(np.stack((cx, cy, s_kx, s_ky), axis=-1).reshape(-1, 4))
+    output = np.concatenate(anchors).astype(np.float32)
+    if cfg['clip']:
+        np.clip(output, 0, 1, out=output)
+    output.flags.writeable = False
+    return output
@@ -17,7 +17,7 @@ from EdiHeadyTrack.TDDFA_v2.utils.functions import (
     crop_img, parse_roi_box_from_bbox, parse_roi_box_from_landmark,
 )
 from EdiHeadyTrack.TDDFA_v2.utils.tddfa_util import (
-    load_model, _parse_param, similar_transform,
+    load_model, _parse_param, similar_transform, recon_vers_seq,
     ToTensorGjz, NormalizeGjz
 )
 
@@ -37,6 +37,7 @@ class TDDFA(object):
             exp_dim=kvs.get('exp_dim', 10)
         )
         self.tri = self.bfm.tri
+        self._bases = {}  # stacked bases for recon_seq
 
         # config
         self.gpu_mode = kvs.get('gpu_mode', False)
@@ -141,3 +142,17 @@ class TDDFA(object):
             ver_lst.append(pts3d)
 
         return ver_lst
+
+    def recon_seq(self, params, roi_boxes, dense_flag=False, dtype=np.float32):
+        """Reconstruct the (T, 3, 68), or dense (T, 3, N), vertices of a whole
+        sequence from a (T, 62) param array and a (T, 4) roi box array, with one
+        matmul over the stacked shape and expression bases, see recon_vers_seq"""
+        key = 'dense' if dense_flag else 'sparse'
+        if key not in self._bases:
+            if dense_flag:
+                u, w_shp, w_exp = self.bfm.u, self.bfm.w_shp, self.bfm.w_exp
+            else:
+                u, w_shp, w_exp = self.bfm.u_base, self.bfm.w_shp_base, self.bfm.w_exp_base
+            self._bases[key] = (u, np.concatenate((w_shp, w_exp), axis=1))
+        u, w = self._bases[key]
+        return recon_vers_seq(params, roi_boxes, u, w, self.size, dtype=dtype)
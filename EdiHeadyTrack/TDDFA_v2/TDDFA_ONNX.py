@@ -5,16 +5,17 @@ __author__ = 'cleardusk'
 import os.path as osp
 import numpy as np
 import cv2
-import onnxruntime
 
-from EdiHeadyTrack.TDDFA_v2.utils.onnx import convert_to_onnx
-from EdiHeadyTrack.TDDFA_v2.utils.io import _load
+from EdiHeadyTrack.TDDFA_v2.utils.assets import load_param_mean_std
+from EdiHeadyTrack.TDDFA_v2.utils.session import get_session
+from EdiHeadyTrack.TDDFA_v2.utils.model_cache import (
+    ensure_model, ensure_variant, bfm_model, tddfa_model,
+)
 from EdiHeadyTrack.TDDFA_v2.utils.functions import (
-    crop_img, parse_roi_box_from_bbox, parse_roi_box_from_landmark,
+    crop_resize, resize_roi, parse_roi_box_from_bbox, parse_roi_box_from_landmark,
 )
-from EdiHeadyTrack.TDDFA_v2.utils.tddfa_util import _parse_param, similar_transform
+from EdiHeadyTrack.TDDFA_v2.utils.tddfa_util import _parse_param, similar_transform, recon_vers_seq
 from EdiHeadyTrack.TDDFA_v2.bfm.bfm import BFMModel
-from EdiHeadyTrack.TDDFA_v2.bfm.bfm_onnx import convert_bfm_to_onnx
 
 current_path = osp.dirname(osp.abspath(__file__))
 make_abs_path = lambda fn: osp.join(osp.dirname(osp.abspath(__file__)), fn)
@@ -31,20 +32,17 @@ class TDDFA_ONNX(object):
         # bfm_fp = kvs.get('bfm_fp', f'{current_path}/configs/bfm_noneck_v3.pkl')
         bfm_fp = f'{current_path}/configs/bfm_noneck_v3.pkl'
         # print(bfm_fp)
-        bfm_onnx_fp = bfm_fp.replace('.pkl', '.onnx')
-        
-        if not osp.exists(bfm_onnx_fp):
-            convert_bfm_to_onnx(
-                bfm_onnx_fp,
-                shape_dim=kvs.get('shape_dim', 40),
-                exp_dim=kvs.get('exp_dim', 10)
-            )
-        self.bfm_session = onnxruntime.InferenceSession(bfm_onnx_fp, None)
+        # models are validated against their build record, and only exported
+        # (which needs torch) if missing or changed, see utils/model_cache.py
+        bfm_onnx_fp = ensure_model(*bfm_model(bfm_fp, shape_dim=kvs.get('shape_dim', 40), exp_dim=kvs.get('exp_dim', 10)))
+        # sessions are shared between instances, see utils/session.py
+        session_options = kvs.get('session_options') or {}
+        self.bfm_session = get_session(bfm_onnx_fp, **session_options)
 
         # load for optimization
-        bfm = BFMModel(bfm_fp, shape_dim=kvs.get('shape_dim', 40), exp_dim=kvs.get('exp_dim', 10))
-        self.tri = bfm.tri
-        self.u_base, self.w_shp_base, self.w_exp_base = bfm.u_base, bfm.w_shp_base, bfm.w_exp_base
+        self.bfm = BFMModel(bfm_fp, shape_dim=kvs.get('shape_dim', 40), exp_dim=kvs.get('exp_dim', 10))
+        self.tri = self.bfm.tri
+        self.u_base, self.w_shp_base, self.w_exp_base = self.bfm.u_base, self.bfm.w_shp_base, self.bfm.w_exp_base
 
         # config
         self.gpu_mode = kvs.get('gpu_mode', False)
@@ -58,50 +56,141 @@ class TDDFA_ONNX(object):
         param_mean_std_fp = f'{current_path}/configs/param_mean_std_62d_{self.size}x{self.size}.pkl'
         # print(kvs.get('onnx_fp'))
         # onnx_fp = kvs.get('onnx_fp', kvs.get('checkpoint_fp').replace('.pth', '.onnx'))
-        onnx_fp = f'{current_path}/weights/mb1_120x120.onnx'
-
-        # convert to onnx online if not existed
-        if onnx_fp is None or not osp.exists(onnx_fp):
-            print(f'{onnx_fp} does not exist, try to convert the `.pth` version to `.onnx` online')
-            onnx_fp = convert_to_onnx(**kvs)
-
-        self.session = onnxruntime.InferenceSession(onnx_fp, None)
+        onnx_fp = ensure_model(*tddfa_model(**kvs))
+        # optimized ('opt') or quantized ('int8') variant of the regressor
+        if kvs.get('variant') is not None:
+            onnx_fp = ensure_variant(onnx_fp, kvs.get('variant'))
+
+        self.session = get_session(onnx_fp, **session_options)
+        # models exported before the batch axis was made dynamic take a fixed batch
+        batch_dim = self.session.get_inputs()[0].shape[0]
+        self.batch_size = batch_dim if isinstance(batch_dim, int) else None
+        # models exported with fused_io take raw uint8 NHWC crops and return
+        # de-standardized params, see utils/onnx.py
+        self.fused_io = self.session.get_inputs()[0].type == 'tensor(uint8)'
+        # models exported with sparse_pose also take the roi boxes and return
+        # the 68 landmarks and the pose
+        self.sparse_pose = 'roi_box' in [node.name for node in self.session.get_inputs()]
 
         # params normalization config
-        r = _load(param_mean_std_fp)
+        r = load_param_mean_std(param_mean_std_fp)
         self.param_mean = r.get('mean')
         self.param_std = r.get('std')
 
-    def __call__(self, img_ori, objs, **kvs):
-        # Crop image, forward to get the param
-        param_lst = []
-        roi_box_lst = []
+        # preprocessing buffers, grown to the largest batch seen
+        if self.fused_io:
+            self._inp = np.empty((0, self.size, self.size, 3), dtype=np.uint8)
+        else:
+            self._inp = np.empty((0, 3, self.size, self.size), dtype=np.float32)
+        self._crop = np.empty((self.size, self.size, 3), dtype=np.uint8)
 
+    def __call__(self, img_ori, objs, **kvs):
+        # Crop image, forward to get the param, all faces in one batch
+        param_lst_lst, roi_box_lst_lst = self.batch([img_ori], [objs], **kvs)
+        return param_lst_lst[0], roi_box_lst_lst[0]
+
+    def batch(self, img_lst, objs_lst, **kvs):
+        """Crop the objs of several images, e.g. several frames, and
+        regress the params of all crops in a single forward pass
+
+        Returns a param list and a roi box list for each image
+        """
+        out_lst_lst, roi_box_lst_lst = self._regress(img_lst, objs_lst, **kvs)
+        return out_lst_lst[0], roi_box_lst_lst
+
+    def sparse(self, img_ori, objs, **kvs):
+        """Crop the objs and regress the params, the 68 landmarks and the pose
+        (yaw, pitch, roll in degrees, as calc_pose) of every crop in a single
+        session.run of a model exported with sparse_pose, see utils/onnx.py
+
+        Returns a param list, a roi box list, a landmark list and a pose list
+        """
+        if not self.sparse_pose:
+            raise ValueError('TDDFA_ONNX.sparse needs a model exported with sparse_pose')
+        out_lst_lst, roi_box_lst_lst = self._regress([img_ori], [objs], **kvs)
+        param_lst, ver_lst, pose_lst = (out_lst[0] for out_lst in out_lst_lst)
+        return param_lst, roi_box_lst_lst[0], ver_lst, pose_lst
+
+    def _regress(self, img_lst, objs_lst, **kvs):
+        """Crop the objs of several images and run the model on all crops
+
+        Returns, for each model output, a list of per-crop outputs for each
+        image, and a roi box list for each image
+        """
         crop_policy = kvs.get('crop_policy', 'box')
-        for obj in objs:
-            if crop_policy == 'box':
-                # by face box
-                roi_box = parse_roi_box_from_bbox(obj)
-            elif crop_policy == 'landmark':
-                # by landmarks
-                roi_box = parse_roi_box_from_landmark(obj)
-            else:
-                raise ValueError(f'Unknown crop policy {crop_policy}')
-
-            roi_box_lst.append(roi_box)
-            img = crop_img(img_ori, roi_box)
-            img = cv2.resize(img, dsize=(self.size, self.size), interpolation=cv2.INTER_LINEAR)
-            img = img.astype(np.float32).transpose(2, 0, 1)[np.newaxis, ...]
-            img = (img - 127.5) / 128.
-
-            inp_dct = {'input': img}
-
-            param = self.session.run(None, inp_dct)[0]
-            param = param.flatten().astype(np.float32)
+        roi_box_lst_lst = []
+        for objs in objs_lst:
+            roi_box_lst = []
+            for obj in objs:
+                if crop_policy == 'box':
+                    # by face box
+                    roi_box = parse_roi_box_from_bbox(obj)
+                elif crop_policy == 'landmark':
+                    # by landmarks
+                    roi_box = parse_roi_box_from_landmark(obj)
+                else:
+                    raise ValueError(f'Unknown crop policy {crop_policy}')
+
+                roi_box_lst.append(roi_box)
+            roi_box_lst_lst.append(roi_box_lst)
+
+        # crops are warped straight into a reused input buffer
+        n = sum(len(roi_box_lst) for roi_box_lst in roi_box_lst_lst)
+        if len(self._inp) < n:
+            self._inp = np.empty((n,) + self._inp.shape[1:], dtype=self._inp.dtype)
+        inp = self._inp[:n]
+        i = 0
+        for img_ori, roi_box_lst in zip(img_lst, roi_box_lst_lst):
+            for roi_box in roi_box_lst:
+                if self.fused_io:
+                    resize_roi(img_ori, roi_box, self.size, dst=inp[i])
+                else:
+                    crop_resize(img_ori, roi_box, self.size, out=inp[i], buf=self._crop)
+                i += 1
+
+        roi_boxes = [roi_box for roi_box_lst in roi_box_lst_lst for roi_box in roi_box_lst]
+        outs = self.forward(inp, roi_boxes)
+
+        out_lst_lst = []
+        for out in outs:
+            out_lst = []
+            n = 0
+            for roi_box_lst in roi_box_lst_lst:
+                out_lst.append(list(out[n:n + len(roi_box_lst)]))
+                n += len(roi_box_lst)
+            out_lst_lst.append(out_lst)
+        return out_lst_lst, roi_box_lst_lst
+
+    def forward(self, inp, roi_box=None):
+        """Regress the re-scaled params of a (N, 3, size, size) batch of normalized
+        crops, or of a (N, size, size, 3) uint8 batch with fused_io
+
+        Returns the list of model outputs: the (N, 62) params, and with sparse_pose
+        the (N, 3, 68) landmarks and (N, 3) poses, given the (N, 4) roi boxes
+        """
+        if len(inp) == 0:
+            shapes = [(0, self.param_mean.shape[0]), (0, 3, 68), (0, 3)]
+            return [np.zeros(shape, dtype=np.float32) for shape in shapes[:len(self.session.get_outputs())]]
+
+        feeds = {'input': inp}
+        if self.sparse_pose:
+            feeds['roi_box'] = np.asarray(roi_box, dtype=np.float32).reshape(-1, 4)
+        if self.batch_size is None:
+            outs = self.session.run(None, feeds)
+        else:
+            chunks = []
+            for i in range(0, len(inp), self.batch_size):
+                chunk = {k: v[i:i + self.batch_size] for k, v in feeds.items()}
+                # the last chunk is padded up to the fixed batch with its last crop
+                pad = self.batch_size - len(chunk['input'])
+                if pad:
+                    chunk = {k: np.concatenate((v, np.repeat(v[-1:], pad, axis=0))) for k, v in chunk.items()}
+                chunks.append(self.session.run(None, chunk))
+            outs = [np.concatenate(out)[:len(inp)] for out in zip(*chunks)]
+        param = outs[0].reshape(len(inp), -1).astype(np.float32)
+        if not self.fused_io:
             param = param * self.param_std + self.param_mean  # re-scale
-            param_lst.append(param)
-
-        return param_lst, roi_box_lst
+        return [param] + outs[1:]
 
     def recon_vers(self, param_lst, roi_box_lst, **kvs):
         dense_flag = kvs.get('dense_flag', False)
@@ -123,4 +212,14 @@ class TDDFA_ONNX(object):
 
             ver_lst.append(pts3d)
 
-        return ver_lst
\ No newline at end of file
+        return ver_lst
+
+    def recon_seq(self, params, roi_boxes, dense_flag=False, dtype=np.float32):
+        """Reconstruct the (T, 3, 68), or dense (T, 3, N), vertices of a whole
+        sequence from a (T, 62) param array and a (T, 4) roi box array, with one
+        matmul over the stacked shape and expression bases, see recon_vers_seq"""
+        if dense_flag:
+            u, w = self.bfm.u, self.bfm.w
+        else:
+            u, w = self.bfm.u_base, self.bfm.w_base
+        return recon_vers_seq(params, roi_boxes, u, w, self.size, dtype=dtype)
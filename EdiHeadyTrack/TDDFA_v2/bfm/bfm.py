@@ -8,7 +8,7 @@ sys.path.append('..')
 
 import os.path as osp
 import numpy as np
-from EdiHeadyTrack.TDDFA_v2.utils.io import _load
+from EdiHeadyTrack.TDDFA_v2.utils.assets import load_bfm
 
 make_abs_path = lambda fn: osp.join(osp.dirname(osp.realpath(__file__)), fn)
 
@@ -21,20 +21,19 @@ def _to_ctype(arr):
 
 class BFMModel(object):
     def __init__(self, bfm_fp, shape_dim=40, exp_dim=10):
-        bfm = _load(bfm_fp)
-        self.u = bfm.get('u').astype(np.float32)  # fix bug
-        self.w_shp = bfm.get('w_shp').astype(np.float32)[..., :shape_dim]
-        self.w_exp = bfm.get('w_exp').astype(np.float32)[..., :exp_dim]
-        if osp.split(bfm_fp)[-1] == 'bfm_noneck_v3.pkl':
-            self.tri = _load(make_abs_path('../configs/tri.pkl'))  # this tri/face is re-built for bfm_noneck_v3
-        else:
-            self.tri = bfm.get('tri')
-
-        self.tri = _to_ctype(self.tri.T).astype(np.int32)
-        self.keypoints = bfm.get('keypoints').astype(np.long)  # fix bug
-        w = np.concatenate((self.w_shp, self.w_exp), axis=1)
-        self.w_norm = np.linalg.norm(w, axis=0)
-
-        self.u_base = self.u[self.keypoints].reshape(-1, 1)
-        self.w_shp_base = self.w_shp[self.keypoints]
-        self.w_exp_base = self.w_exp[self.keypoints]
+        # compiled once and memory-mapped read-only, see utils/assets.py
+        bfm = load_bfm(bfm_fp, shape_dim=shape_dim, exp_dim=exp_dim)
+        self.u = bfm['u']
+        self.w_shp = bfm['w_shp']
+        self.w_exp = bfm['w_exp']
+        self.tri = bfm['tri']
+        self.keypoints = bfm['keypoints']
+        self.w_norm = bfm['w_norm']
+
+        self.u_base = bfm['u_base']
+        self.w_shp_base = bfm['w_shp_base']
+        self.w_exp_base = bfm['w_exp_base']
+
+        # shape and expression bases stacked, as used by recon_vers_seq
+        self.w = bfm['w']
+        self.w_base = bfm['w_base']
@@ -0,0 +1,167 @@
+# coding: utf-8
+
+"""
+Compiled assets: the BFM bases and triangles, the param normalization, the uv
+coordinates and the ncc code, written once as .npy files in the dtype, layout
+and slicing they are used in, under configs/compiled/. Later loads memory-map
+them read-only and keep them in a process-wide registry, so every TDDFA_ONNX
+in a process shares one copy and forked workers share its pages. Compile ahead
+of time from the repository root with:
+
+    python -m EdiHeadyTrack.TDDFA_v2.utils.assets
+"""
+
+import json
+import os
+import os.path as osp
+import shutil
+import tempfile
+import threading
+
+import numpy as np
+
+from .io import _load
+from .model_cache import _locked
+
+make_abs_path = lambda fn: osp.join(osp.dirname(osp.realpath(__file__)), fn)
+compiled_dir = osp.normpath(make_abs_path('../configs/compiled'))
+
+_assets = {}
+_lock = threading.Lock()
+
+
+def _stat(sources):
+    stats = {osp.basename(fp): os.stat(fp) for fp in sources}
+    return {name: [st.st_size, st.st_mtime_ns] for name, st in stats.items()}
+
+
+def _is_compiled(out_dir, sources):
+    """Whether out_dir holds an asset compiled from the sources as they are now,
+    going by the size and mtime of each source recorded in its manifest"""
+    try:
+        with open(osp.join(out_dir, 'sources.json')) as f:
+            return json.load(f) == _stat(sources)
+    except (OSError, ValueError):
+        return False
+
+
+def _compile(out_dir, sources, build):
+    """Write the arrays returned by build() to out_dir, along with a manifest
+    of the sources they were built from
+
+    The arrays are written to a temporary directory which is then renamed, so
+    that a process never sees a partly written asset
+    """
+    stat = _stat(sources)
+    arrays = build()
+    tmp_dir = tempfile.mkdtemp(prefix=f'.{osp.basename(out_dir)}.', dir=compiled_dir)
+    os.chmod(tmp_dir, 0o755)
+    for key, arr in arrays.items():
+        # np.save pads the header, so the data of every file is 64 byte aligned
+        np.save(osp.join(tmp_dir, f'{key}.npy'), np.ascontiguousarray(arr))
+    with open(osp.join(tmp_dir, 'sources.json'), 'w') as f:
+        json.dump(stat, f)
+    shutil.rmtree(out_dir, ignore_errors=True)
+    os.rename(tmp_dir, out_dir)
+
+
+def _get(name, sources, build):
+    """Get the memory-mapped arrays of an asset, compiling it on first use"""
+    with _lock:
+        arrays = _assets.get(name)
+        if arrays is None:
+            out_dir = osp.join(compiled_dir, name)
+            os.makedirs(compiled_dir, exist_ok=True)
+            # other processes hold the lock while compiling or mapping the
+            # asset, so none of them maps a directory being replaced
+            with _locked(out_dir):
+                if not _is_compiled(out_dir, sources):
+                    _compile(out_dir, sources, build)
+                arrays = {osp.splitext(fn)[0]: np.load(osp.join(out_dir, fn), mmap_mode='r')
+                          for fn in sorted(os.listdir(out_dir)) if fn.endswith('.npy')}
+            _assets[name] = arrays
+    return arrays
+
+
+def load_bfm(bfm_fp, shape_dim=40, exp_dim=10):
+    """Get the float32 BFM bases cut to shape_dim and exp_dim, the triangles,
+    keypoints and the bases of the 68 keypoints, see bfm/bfm.py
+
+    w and w_base are the shape and expression bases stacked as used by
+    recon_vers_seq, w_norm the norm of each of their columns
+    """
+    tri_fp = make_abs_path('../configs/tri.pkl')
+    # this tri/face is re-built for bfm_noneck_v3
+    rebuilt_tri = osp.split(bfm_fp)[-1] == 'bfm_noneck_v3.pkl'
+
+    def build():
+        bfm = _load(bfm_fp)
+        u = bfm.get('u').astype(np.float32)
+        w_shp = bfm.get('w_shp').astype(np.float32)[..., :shape_dim]
+        w_exp = bfm.get('w_exp').astype(np.float32)[..., :exp_dim]
+        tri = _load(tri_fp) if rebuilt_tri else bfm.get('tri')
+        keypoints = bfm.get('keypoints').astype(np.int64)
+        w = np.concatenate((w_shp, w_exp), axis=1)
+        return {
+            'u': u, 'w_shp': w_shp, 'w_exp': w_exp, 'w': w,
+            'tri': tri.T.astype(np.int32),
+            'keypoints': keypoints,
+            'w_norm': np.linalg.norm(w, axis=0),
+            'u_base': u[keypoints].reshape(-1, 1),
+            'w_shp_base': w_shp[keypoints],
+            'w_exp_base': w_exp[keypoints],
+            'w_base': w[keypoints],
+        }
+
+    name = f'{osp.splitext(osp.basename(bfm_fp))[0]}_{shape_dim}_{exp_dim}'
+    sources = [bfm_fp, tri_fp] if rebuilt_tri else [bfm_fp]
+    return _get(name, sources, build)
+
+
+def load_param_mean_std(param_mean_std_fp):
+    """Get the mean and std the regressed params are de-standardized with"""
+    def build():
+        r = _load(param_mean_std_fp)
+        return {'mean': r.get('mean'), 'std': r.get('std')}
+
+    return _get(osp.splitext(osp.basename(param_mean_std_fp))[0], [param_mean_std_fp], build)
+
+
+def load_ncc_code():
+    """Get the (m, 3) float32 ncc code used as the colors by pncc"""
+    ncc_fp = make_abs_path('../configs/ncc_code.npy')
+    return _get('ncc_code', [ncc_fp], lambda: {'ncc_code': np.load(ncc_fp).T.astype(np.float32)})['ncc_code']
+
+
+def load_uv_coords():
+    """Get the (m, 2) float32 uv coordinates of the BFM vertices in indices.npy"""
+    uv_fp = make_abs_path('../configs/BFM_UV.mat')
+    indices_fp = make_abs_path('../configs/indices.npy')
+
+    def build():
+        import scipy.io as sio
+        uv_coords = sio.loadmat(uv_fp)['UV'].astype(np.float32)
+        return {'uv_coords': uv_coords[_load(indices_fp), :]}  # todo: handle bfm_slim
+
+    return _get('uv_coords', [uv_fp, indices_fp], build)['uv_coords']
+
+
+def clear_assets():
+    """Drop all loaded assets, e.g. after a source file has been replaced"""
+    with _lock:
+        _assets.clear()
+
+
+def main():
+    configs = make_abs_path('../configs')
+    load_bfm(osp.join(configs, 'bfm_noneck_v3.pkl'))
+    load_param_mean_std(osp.join(configs, 'param_mean_std_62d_120x120.pkl'))
+    load_ncc_code()
+    load_uv_coords()
+    print(f'Compiled assets to {compiled_dir}:')
+    for name in sorted(_assets):
+        print(f'  {name}: {", ".join(sorted(_assets[name]))}')
+
+
+if __name__ == '__main__':
+    main()
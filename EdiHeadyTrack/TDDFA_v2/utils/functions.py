@@ -5,7 +5,6 @@ __author__ = 'cleardusk'
 import numpy as np
 import cv2
 from math import sqrt
-import matplotlib.pyplot as plt
 
 RED = (0, 0, 255)
 GREEN = (0, 255, 0)
@@ -53,6 +52,42 @@ def crop_img(img, roi_box):
     return res
 
 
+def resize_roi(img, roi_box, size, dst=None):
+    """crop_img followed by cv2.resize to size x size, reading the roi straight
+    from the original image
+
+    dst: (size, size, 3) uint8 array the resized crop is written to
+    """
+    h, w = img.shape[:2]
+    sx, sy, ex, ey = [int(round(_)) for _ in roi_box]
+    if sx >= 0 and sy >= 0 and ex <= w and ey <= h:
+        return cv2.resize(img[sy:ey, sx:ex], dsize=(size, size), dst=dst, interpolation=cv2.INTER_LINEAR)
+
+    # roi partly outside the image: warp with pixel centres mapped as in
+    # cv2.resize, outside the image is black as in crop_img
+    scale_x, scale_y = (ex - sx) / size, (ey - sy) / size
+    M = np.array([[scale_x, 0, sx + 0.5 * scale_x - 0.5],
+                  [0, scale_y, sy + 0.5 * scale_y - 0.5]])
+    return cv2.warpAffine(img, M, (size, size), dst=dst,
+                          flags=cv2.INTER_LINEAR | cv2.WARP_INVERSE_MAP,
+                          borderMode=cv2.BORDER_CONSTANT, borderValue=0)
+
+
+def crop_resize(img, roi_box, size, out=None, buf=None):
+    """resize_roi and (img - 127.5) / 128 in one pass, without the intermediate copies
+
+    out: (3, size, size) float32 array the normalized CHW crop is written to
+    buf: (size, size, 3) uint8 array reused for the resized crop
+    """
+    buf = resize_roi(img, roi_box, size, dst=buf)
+    if out is None:
+        out = np.empty((3, size, size), dtype=np.float32)
+    for c, channel in enumerate(cv2.split(buf)):
+        np.subtract(channel, np.float32(127.5), out=out[c], dtype=np.float32)
+    out /= np.float32(128.)
+    return out
+
+
 def calc_hypotenuse(pts):
     bbox = [min(pts[0, :]), min(pts[1, :]), max(pts[0, :]), max(pts[1, :])]
     center = [(bbox[0] + bbox[2]) / 2, (bbox[1] + bbox[3]) / 2]
@@ -99,6 +134,7 @@ def parse_roi_box_from_bbox(bbox):
 
 
 def plot_image(img):
+    import matplotlib.pyplot as plt  # only needed for plotting
     height, width = img.shape[:2]
     plt.figure(figsize=(12, height / width * 12))
 
@@ -111,6 +147,7 @@ def plot_image(img):
 
 def draw_landmarks(img, pts, style='fancy', wfp=None, show_flag=False, **kwargs):
     """Draw landmarks using matplotlib"""
+    import matplotlib.pyplot as plt
     height, width = img.shape[:2]
     plt.figure(figsize=(12, height / width * 12))
     plt.imshow(img[..., ::-1])
@@ -4,7 +4,6 @@ __author__ = 'cleardusk'
 
 import os
 import numpy as np
-import torch
 import pickle
 
 
@@ -39,6 +38,7 @@ def _dump(wfp, obj):
 
 
 def _load_tensor(fp, mode='cpu'):
+    import torch
     if mode.lower() == 'cpu':
         return torch.from_numpy(_load(fp))
     elif mode.lower() == 'gpu':
@@ -53,12 +53,18 @@ def _tensor_to_cuda(x):
 
 
 def _load_gpu(fp):
+    import torch
     return torch.from_numpy(_load(fp)).cuda()
 
 
+def _numpy_to_tensor(x):
+    # torch is only needed by the pytorch models, keep it out of the onnx path
+    import torch
+    return torch.from_numpy(x)
+
+
 _load_cpu = _load
-_numpy_to_tensor = lambda x: torch.from_numpy(x)
 _tensor_to_numpy = lambda x: x.numpy()
-_numpy_to_cuda = lambda x: _tensor_to_cuda(torch.from_numpy(x))
+_numpy_to_cuda = lambda x: _tensor_to_cuda(_numpy_to_tensor(x))
 _cuda_to_tensor = lambda x: x.cpu()
 _cuda_to_numpy = lambda x: x.cpu().numpy()
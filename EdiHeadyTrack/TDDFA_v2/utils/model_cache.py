@@ -0,0 +1,319 @@
+# coding: utf-8
+
+"""
+Model cache: every ONNX model is built once, ideally ahead of time with
+prepare(), and recorded in <model>.json next to it. The record holds the sha256
+and size of the model, the exporter that built it and the onnxruntime version
+it was checked with. Later runs validate the model against its record instead
+of exporting it again.
+
+Builds hold a lock file and write to a temporary file that is then renamed into
+place. When several processes start at once, each model is built only once and
+no process loads a partly written model. Run from the repository root:
+
+    python -m EdiHeadyTrack.TDDFA_v2.utils.model_cache [--optimize] [--quantize]
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import os.path as osp
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:  # no advisory file locks, e.g. on Windows
+    fcntl = None
+
+make_abs_path = lambda fn: osp.join(osp.dirname(osp.realpath(__file__)), fn)
+root = osp.normpath(make_abs_path('..'))
+
+# variants built from a model by onnxruntime: the graph optimized offline, and
+# the weights quantized to uint8 with dynamic quantization of the activations
+VARIANTS = ('opt', 'int8')
+
+
+def record_path(model_fp):
+    return f'{model_fp}.json'
+
+
+def variant_path(model_fp, variant):
+    """mb1_120x120.onnx -> mb1_120x120.opt.onnx"""
+    if variant not in VARIANTS:
+        raise ValueError(f'Unknown model variant {variant}, expected one of {VARIANTS}')
+    return model_fp.replace('.onnx', f'.{variant}.onnx')
+
+
+def bfm_onnx_path(bfm_fp):
+    return bfm_fp.replace('.pkl', '.onnx')
+
+
+def tddfa_onnx_path(fused_io=False, sparse_pose=False):
+    """The regressor TDDFA_ONNX loads, see utils/onnx.py for the fused and sparse graphs"""
+    onnx_fp = osp.join(root, 'weights/mb1_120x120.onnx')
+    if sparse_pose:
+        return onnx_fp.replace('.onnx', '_sparse.onnx')
+    if fused_io:
+        return onnx_fp.replace('.onnx', '_fused.onnx')
+    return onnx_fp
+
+
+def faceboxes_onnx_path(fused_io=False):
+    onnx_fp = osp.join(root, 'FaceBoxes/weights/FaceBoxesProd.onnx')
+    return onnx_fp.replace('.onnx', '_fused.onnx') if fused_io else onnx_fp
+
+
+def _sha256(fp):
+    h = hashlib.sha256()
+    with open(fp, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _ort_version():
+    import onnxruntime
+    return onnxruntime.__version__
+
+
+def read_record(model_fp):
+    try:
+        with open(record_path(model_fp)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _source_hashes(sources):
+    # sources which are not there, e.g. weights not downloaded, are left out
+    return {osp.basename(fp): _sha256(fp) for fp in sources if osp.exists(fp)}
+
+
+def _write_record(model_fp, exporter, sources=()):
+    stat = os.stat(model_fp)
+    record = {
+        'sha256': _sha256(model_fp),
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'exporter': exporter,
+        'onnxruntime': _ort_version(),
+        'sources': _source_hashes(sources),
+        'created': datetime.now().isoformat(timespec='seconds'),
+    }
+    tmp_fp = f'{record_path(model_fp)}.{os.getpid()}.tmp'
+    with open(tmp_fp, 'w') as f:
+        json.dump(record, f, indent=2)
+    os.replace(tmp_fp, record_path(model_fp))
+    return record
+
+
+def verify(model_fp, full=False, sources=(), check=None):
+    """Check a model against its record, and against check(record) if given
+
+    Unless full is set, a model whose size and mtime match the record is taken
+    as valid without hashing it. A full check hashes the model and also checks
+    that the sources it was built from have not changed. A source which is
+    there but missing from the record counts as changed
+    """
+    record = read_record(model_fp)
+    if record is None or not osp.exists(model_fp):
+        return False
+    if check is not None and not check(record):
+        return False
+    stat = os.stat(model_fp)
+    if stat.st_size != record['size']:
+        return False
+    if full or stat.st_mtime_ns != record['mtime_ns']:
+        if _sha256(model_fp) != record['sha256']:
+            return False
+    if full:
+        for name, digest in _source_hashes(sources).items():
+            if record['sources'].get(name) != digest:
+                return False
+    return True
+
+
+@contextmanager
+def _locked(model_fp):
+    with open(f'{model_fp}.lock', 'a') as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def dynamic_batch(model_fp):
+    """Whether the batch axis of every input of a model is dynamic"""
+    import onnxruntime
+    session = onnxruntime.InferenceSession(model_fp, providers=['CPUExecutionProvider'])
+    return all(not isinstance(inp.shape[0], int) for inp in session.get_inputs() if inp.shape)
+
+
+def ensure_model(model_fp, build, sources=(), adopt=None, full=False, check=None):
+    """Get a valid model, building it with build(wfp) if it is missing or does
+    not match its record
+
+    build writes the model to wfp and returns a description of the exporter.
+    A model found without a record, e.g. built before the cache existed, is
+    recorded as it is, with an unknown exporter and the sources as they are now,
+    unless adopt(model_fp) is given and false, e.g. for a model exported before
+    its batch axis was made dynamic, which is built again instead
+    """
+    if verify(model_fp, full, sources, check):
+        return model_fp
+    with _locked(model_fp):
+        # built by another process while waiting for the lock
+        if verify(model_fp, full, sources, check):
+            return model_fp
+        if osp.exists(model_fp) and read_record(model_fp) is None and (adopt is None or adopt(model_fp)):
+            _write_record(model_fp, None, sources)
+            return model_fp
+        print(f'{model_fp} is missing or out of date, building it')
+        tmp_fp = f'{model_fp}.{os.getpid()}.tmp'
+        try:
+            exporter = build(tmp_fp)
+            os.replace(tmp_fp, model_fp)
+        finally:
+            if osp.exists(tmp_fp):
+                os.remove(tmp_fp)
+        _write_record(model_fp, exporter, sources)
+    return model_fp
+
+
+def ensure_variant(model_fp, variant, full=False):
+    """Get the optimized ('opt') or quantized ('int8') variant of a valid model
+
+    Variants are rebuilt when the model changes. Graphs optimized offline are
+    only valid for the onnxruntime version that optimized them, so they are
+    also rebuilt when onnxruntime changes
+    """
+    variant_fp = variant_path(model_fp, variant)
+    base = read_record(model_fp)
+
+    def check(record):
+        if base is None or record['sources'].get(osp.basename(model_fp)) != base['sha256']:
+            return False
+        return variant != 'opt' or record['onnxruntime'] == _ort_version()
+
+    def build(wfp):
+        import onnxruntime
+        if variant == 'opt':
+            opts = onnxruntime.SessionOptions()
+            opts.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_EXTENDED
+            opts.optimized_model_filepath = wfp
+            onnxruntime.InferenceSession(model_fp, sess_options=opts, providers=['CPUExecutionProvider'])
+        else:
+            from onnxruntime.quantization import quantize_dynamic, QuantType
+            quantize_dynamic(model_fp, wfp, weight_type=QuantType.QUInt8)
+        return f'onnxruntime {onnxruntime.__version__}'
+
+    return ensure_model(variant_fp, build, sources=(model_fp,), full=full, check=check)
+
+
+def _torch_exporter():
+    import torch
+    return f'torch {torch.__version__}'
+
+
+def bfm_builder(bfm_fp, shape_dim=40, exp_dim=10):
+    def build(wfp):
+        from EdiHeadyTrack.TDDFA_v2.bfm.bfm_onnx import convert_bfm_to_onnx
+        convert_bfm_to_onnx(wfp, shape_dim=shape_dim, exp_dim=exp_dim, bfm_fp=bfm_fp)
+        return _torch_exporter()
+    return build
+
+
+def tddfa_builder(**kvs):
+    """kvs as given to TDDFA_ONNX, with checkpoint_fp relative to TDDFA_v2/"""
+    kvs = dict(kvs)
+    kvs['checkpoint_fp'] = osp.join(root, kvs.get('checkpoint_fp', 'weights/mb1_120x120.pth'))
+
+    def build(wfp):
+        from EdiHeadyTrack.TDDFA_v2.utils.onnx import convert_to_onnx
+        convert_to_onnx(**kvs, wfp=wfp)
+        return _torch_exporter()
+    return build
+
+
+def faceboxes_builder(fused_io=False):
+    def build(wfp):
+        from EdiHeadyTrack.TDDFA_v2.FaceBoxes.onnx import convert_to_onnx
+        convert_to_onnx(wfp, fused_io=fused_io, pretrained_path=osp.join(root, 'FaceBoxes/weights/FaceBoxesProd.pth'))
+        return _torch_exporter()
+    return build
+
+
+def bfm_model(bfm_fp, shape_dim=40, exp_dim=10):
+    """The BFM decoder as (model path, build, sources, adopt)"""
+    return bfm_onnx_path(bfm_fp), bfm_builder(bfm_fp, shape_dim, exp_dim), (bfm_fp,), None
+
+
+def tddfa_model(**kvs):
+    """The regressor for the kvs given to TDDFA_ONNX as (model path, build, sources,
+    adopt), where older models with a fixed batch are built again to batch crops"""
+    checkpoint_fp = osp.join(root, kvs.get('checkpoint_fp', 'weights/mb1_120x120.pth'))
+    onnx_fp = tddfa_onnx_path(fused_io=kvs.get('fused_io', False), sparse_pose=kvs.get('sparse_pose', False))
+    return onnx_fp, tddfa_builder(**kvs), (checkpoint_fp,), dynamic_batch
+
+
+def faceboxes_model(fused_io=False):
+    """The face detector as (model path, build, sources, adopt)"""
+    pretrained_path = osp.join(root, 'FaceBoxes/weights/FaceBoxesProd.pth')
+    return faceboxes_onnx_path(fused_io), faceboxes_builder(fused_io), (pretrained_path,), None
+
+
+def models(config=None):
+    """Every ONNX model used by TDDFA_V2 with the given config, as a dict of
+    name -> (model path, build, sources, adopt)"""
+    import yaml
+    if config is None:
+        config = osp.join(root, 'configs/mb1_120x120.yml')
+    with open(config) as f:
+        cfg = yaml.load(f, Loader=yaml.SafeLoader)
+    bfm_fp = osp.join(root, 'configs/bfm_noneck_v3.pkl')
+    return {
+        'bfm': bfm_model(bfm_fp, cfg.get('shape_dim', 40), cfg.get('exp_dim', 10)),
+        'tddfa': tddfa_model(**cfg),
+        'tddfa_fused': tddfa_model(**cfg, fused_io=True),
+        'tddfa_sparse': tddfa_model(**cfg, sparse_pose=True),
+        'faceboxes': faceboxes_model(),
+        'faceboxes_fused': faceboxes_model(fused_io=True),
+    }
+
+
+def prepare(config=None, names=None, variants=(), full=True):
+    """Build and verify every model, and the given variants of each but the
+    BFM decoder, returning a dict of name -> model path"""
+    built = {}
+    for name, (model_fp, build, sources, adopt) in models(config).items():
+        if names is not None and name not in names:
+            continue
+        built[name] = ensure_model(model_fp, build, sources, adopt, full=full)
+        for variant in variants:
+            if name != 'bfm':
+                built[f'{name}.{variant}'] = ensure_variant(model_fp, variant, full=full)
+    return built
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build and verify the ONNX models of TDDFA_V2')
+    parser.add_argument('-c', '--config', type=str, default=None)
+    parser.add_argument('--models', nargs='+', default=None, help='names of the models, by default all')
+    parser.add_argument('--optimize', action='store_true', help='also build graphs optimized offline')
+    parser.add_argument('--quantize', action='store_true', help='also build uint8 quantized models')
+    args = parser.parse_args()
+
+    variants = [variant for variant, flag in zip(VARIANTS, (args.optimize, args.quantize)) if flag]
+    for name, model_fp in prepare(args.config, args.models, variants).items():
+        record = read_record(model_fp)
+        print(f'{name:24s} {osp.relpath(model_fp, root):44s} {record["sha256"][:12]} '
+              f'{record["exporter"] or "unknown exporter"}')
+
+
+if __name__ == '__main__':
+    main()
@@ -6,12 +6,85 @@ import sys
 
 sys.path.append('..')
 
+import os.path as osp
+import numpy as np
 import torch
 import EdiHeadyTrack.TDDFA_v2.models as models
+from EdiHeadyTrack.TDDFA_v2.utils.io import _load
 from EdiHeadyTrack.TDDFA_v2.utils.tddfa_util import load_model
+from EdiHeadyTrack.TDDFA_v2.bfm.bfm import BFMModel
+
+make_abs_path = lambda fn: osp.join(osp.dirname(osp.realpath(__file__)), fn)
+
+
+class FusedIO(torch.nn.Module):
+    """Wraps the regressor so that the exported graph takes raw uint8 NHWC crops
+    and returns de-standardized params, leaving the arithmetic to onnxruntime"""
+
+    def __init__(self, model, param_mean, param_std):
+        super(FusedIO, self).__init__()
+        self.model = model
+        self.register_buffer('param_mean', torch.from_numpy(param_mean.astype('float32')))
+        self.register_buffer('param_std', torch.from_numpy(param_std.astype('float32')))
+
+    def forward(self, inp):
+        x = (inp.permute(0, 3, 1, 2).float() - 127.5) / 128.
+        param = self.model(x)
+        return param * self.param_std + self.param_mean
+
+
+class SparsePose(torch.nn.Module):
+    """Extends FusedIO with the sparse reconstruction, similar_transform and calc_pose,
+    so that one session.run gives the params, the 68 landmarks and the pose of
+    each crop. The roi box of each crop is a second input"""
+
+    def __init__(self, model, param_mean, param_std, bfm, size=120):
+        super(SparsePose, self).__init__()
+        self.fused = FusedIO(model, param_mean, param_std)
+        self.size = size
+        # the bfm arrays are read-only memory maps, see utils/assets.py
+        self.register_buffer('u_base', torch.from_numpy(np.array(bfm.u_base)))
+        self.register_buffer('w_base', torch.from_numpy(np.array(bfm.w_base)))
+
+    def forward(self, inp, roi_box):
+        param = self.fused(inp)
+        n = param.shape[0]
+
+        # R @ (u_base + w_shp_base @ alpha_shp + w_exp_base @ alpha_exp) + offset
+        P = param[:, :12].reshape(n, 3, 4)
+        alpha = param[:, 12:].unsqueeze(-1)
+        vertex = (self.u_base + self.w_base @ alpha).reshape(n, -1, 3).transpose(1, 2)
+        pts3d = P[:, :, :3] @ vertex + P[:, :, 3:]
+
+        # similar_transform
+        sx, sy, ex, ey = roi_box[:, 0:1], roi_box[:, 1:2], roi_box[:, 2:3], roi_box[:, 3:4]
+        scale_x = (ex - sx) / self.size
+        scale_y = (ey - sy) / self.size
+        x = (pts3d[:, 0] - 1) * scale_x + sx
+        y = (self.size - pts3d[:, 1]) * scale_y + sy
+        z = (pts3d[:, 2] - 1) * (scale_x + scale_y) / 2
+        z = z - z.min(dim=1, keepdim=True)[0]
+        ver = torch.stack((x, y, z), dim=1)
+
+        # calc_pose: P2sRt, then matrix2angle
+        r1 = P[:, 0, :3] / P[:, 0, :3].norm(dim=1, keepdim=True)
+        r2 = P[:, 1, :3] / P[:, 1, :3].norm(dim=1, keepdim=True)
+        r3 = torch.cross(r1, r2, dim=1)
+        r20 = r3[:, 0].clamp(-1, 1)
+        gimbal = r20.abs() > 0.998
+        sign = torch.sign(r20)
+        yaw = torch.where(gimbal, sign * np.pi / 2, torch.asin(r20))
+        pitch = torch.where(gimbal, torch.atan2(-sign * r1[:, 1], -sign * r1[:, 2]),
+                            torch.atan2(r3[:, 1], r3[:, 2]))
+        roll = torch.where(gimbal, torch.zeros_like(r20), torch.atan2(r2[:, 0], r1[:, 0]))
+        pose = torch.stack((yaw, pitch, roll), dim=1) * (180 / np.pi)
+        return param, ver, pose
 
 
 def convert_to_onnx(**kvs):
+    """Export the regressor next to its checkpoint, as *_fused.onnx with
+    fused_io=True, see FusedIO, or as *_sparse.onnx with sparse_pose=True,
+    see SparsePose, or to wfp if given"""
     # 1. load model
     size = kvs.get('size', 120)
     model = getattr(models, kvs.get('arch'))(
@@ -24,16 +97,37 @@ def convert_to_onnx(**kvs):
     model = load_model(model, checkpoint_fp)
     model.eval()
 
-    # 2. convert
+    # 2. convert, with a dynamic batch axis so crops can be batched
     batch_size = 1
-    dummy_input = torch.randn(batch_size, 3, size, size)
-    wfp = checkpoint_fp.replace('.pth', '.onnx')
+    input_names, output_names = ['input'], ['output']
+    if kvs.get('fused_io', False) or kvs.get('sparse_pose', False):
+        param_mean_std_fp = kvs.get(
+            'param_mean_std_fp', make_abs_path(f'../configs/param_mean_std_62d_{size}x{size}.pkl')
+        )
+        r = _load(param_mean_std_fp)
+        dummy_input = (torch.randint(0, 256, (batch_size, size, size, 3), dtype=torch.uint8), )
+        if kvs.get('sparse_pose', False):
+            bfm_fp = kvs.get('bfm_fp', make_abs_path('../configs/bfm_noneck_v3.pkl'))
+            bfm = BFMModel(bfm_fp, shape_dim=kvs.get('shape_dim', 40), exp_dim=kvs.get('exp_dim', 10))
+            model = SparsePose(model, r.get('mean'), r.get('std'), bfm, size=size)
+            dummy_input += (torch.tensor([[0., 0., size, size]] * batch_size), )
+            input_names, output_names = ['input', 'roi_box'], ['output', 'landmarks', 'pose']
+            wfp = checkpoint_fp.replace('.pth', '_sparse.onnx')
+        else:
+            model = FusedIO(model, r.get('mean'), r.get('std'))
+            wfp = checkpoint_fp.replace('.pth', '_fused.onnx')
+        model.eval()
+    else:
+        dummy_input = (torch.randn(batch_size, 3, size, size), )
+        wfp = checkpoint_fp.replace('.pth', '.onnx')
+    wfp = kvs.get('wfp') or wfp
     torch.onnx.export(
         model,
-        (dummy_input, ),
+        dummy_input,
         wfp,
-        input_names=['input'],
-        output_names=['output'],
+        input_names=input_names,
+        output_names=output_names,
+        dynamic_axes={name: {0: 'batch'} for name in input_names + output_names},
         do_constant_folding=True
     )
     print(f'Convert {checkpoint_fp} to {wfp} done.')
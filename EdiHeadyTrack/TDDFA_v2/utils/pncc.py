@@ -13,6 +13,7 @@ import os.path as osp
 from Sim3DR import rasterize
 from utils.functions import plot_image
 from utils.io import _load, _dump
+from utils.assets import load_ncc_code
 from utils.tddfa_util import _to_ctype
 
 make_abs_path = lambda fn: osp.join(osp.dirname(osp.realpath(__file__)), fn)
@@ -32,7 +33,8 @@ def calc_ncc_code():
 
 
 def pncc(img, ver_lst, tri, show_flag=False, wfp=None, with_bg_flag=True):
-    ncc_code = _load(make_abs_path('../configs/ncc_code.npy'))
+    # (m, 3) float32, compiled once and memory-mapped, see utils/assets.py
+    ncc_code = load_ncc_code()
 
     if with_bg_flag:
         overlap = img.copy()
@@ -42,7 +44,7 @@ def pncc(img, ver_lst, tri, show_flag=False, wfp=None, with_bg_flag=True):
     # rendering pncc
     for ver_ in ver_lst:
         ver = _to_ctype(ver_.T)  # transpose
-        overlap = rasterize(ver, tri, ncc_code.T, bg=overlap)  # m x 3
+        overlap = rasterize(ver, tri, ncc_code, bg=overlap)  # m x 3
 
     if wfp is not None:
         cv2.imwrite(wfp, overlap)
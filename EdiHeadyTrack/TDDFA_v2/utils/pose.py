@@ -81,6 +81,29 @@ def calc_pose(param):
     return P, pose
 
 
+def calc_pose_seq(params):
+    """Vectorized calc_pose of a whole sequence
+    params: (T, 62) params
+    returns: (T, 3, 4) camera matrices without scale, (T, 3) yaw, pitch, roll in degrees
+    """
+    P = np.asarray(params, dtype=np.float64).reshape(len(params), -1)[:, :12].reshape(-1, 3, 4)
+    r1 = P[:, 0, :3] / np.linalg.norm(P[:, 0, :3], axis=1, keepdims=True)
+    r2 = P[:, 1, :3] / np.linalg.norm(P[:, 1, :3], axis=1, keepdims=True)
+    R = np.stack((r1, r2, np.cross(r1, r2)), axis=1)
+    P = np.concatenate((R, P[:, :, 3:]), axis=2)
+
+    # matrix2angle, with the same gimbal lock branches
+    x = np.arcsin(np.clip(R[:, 2, 0], -1, 1))
+    cos_x = np.cos(x)
+    y = np.arctan2(R[:, 2, 1] / cos_x, R[:, 2, 2] / cos_x)
+    z = np.arctan2(R[:, 1, 0] / cos_x, R[:, 0, 0] / cos_x)
+    up, down = R[:, 2, 0] > 0.998, R[:, 2, 0] < -0.998
+    x = np.where(up, np.pi / 2, np.where(down, -np.pi / 2, x))
+    y = np.where(up, np.arctan2(-R[:, 0, 1], -R[:, 0, 2]), np.where(down, np.arctan2(R[:, 0, 1], R[:, 0, 2]), y))
+    z = np.where(up | down, 0, z)
+    return P, np.degrees(np.stack((x, y, z), axis=1))
+
+
 def build_camera_box(rear_size=90):
     point_3d = []
     rear_depth = 0
@@ -102,11 +125,9 @@ def build_camera_box(rear_size=90):
     return point_3d
 
 
-def plot_pose_box(img, P, ver, color=(40, 255, 0), line_width=2):
-    """ Draw a 3D box as annotation of pose.
-    Ref:https://github.com/yinguobing/head-pose-estimation/blob/master/pose_estimator.py
+def calc_pose_box(P, ver):
+    """ Project the 3D pose box to (10, 2) int32 image points
     Args:
-        img: the input image
         P: (3, 4). Affine Camera Matrix.
         kpt: (2, 68) or (3, 68)
     """
@@ -118,7 +139,18 @@ def plot_pose_box(img, P, ver, color=(40, 255, 0), line_width=2):
 
     point_2d[:, 1] = - point_2d[:, 1]
     point_2d[:, :2] = point_2d[:, :2] - np.mean(point_2d[:4, :2], 0) + np.mean(ver[:2, :27], 1)
-    point_2d = np.int32(point_2d.reshape(-1, 2))
+    return np.int32(point_2d.reshape(-1, 2))
+
+
+def plot_pose_box(img, P, ver, color=(40, 255, 0), line_width=2):
+    """ Draw a 3D box as annotation of pose.
+    Ref:https://github.com/yinguobing/head-pose-estimation/blob/master/pose_estimator.py
+    Args:
+        img: the input image
+        P: (3, 4). Affine Camera Matrix.
+        kpt: (2, 68) or (3, 68)
+    """
+    point_2d = calc_pose_box(P, ver)
 
     # Draw all the lines
     cv2.polylines(img, [point_2d], True, color, line_width, cv2.LINE_AA)
@@ -24,7 +24,15 @@ cfg = {
     'view_pos': (0, 0, 5)
 }
 
-render_app = RenderPipeline(**cfg)
+_render_app = None
+
+
+def get_render_app():
+    """The RenderPipeline is built on first use rather than at import"""
+    global _render_app
+    if _render_app is None:
+        _render_app = RenderPipeline(**cfg)
+    return _render_app
 
 
 def render(img, ver_lst, tri, alpha=0.6, show_flag=False, wfp=None, with_bg_flag=True):
@@ -33,6 +41,7 @@ def render(img, ver_lst, tri, alpha=0.6, show_flag=False, wfp=None, with_bg_flag
     else:
         overlap = np.zeros_like(img)
 
+    render_app = get_render_app()
     for ver_ in ver_lst:
         ver = _to_ctype(ver_.T)  # transpose
         overlap = render_app(ver, tri, overlap)
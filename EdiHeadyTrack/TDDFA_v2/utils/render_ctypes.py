@@ -61,7 +61,15 @@ class TrianglesMeshRender(object):
         )
 
 
-render_app = TrianglesMeshRender(clibs=make_abs_path('asset/render.so'))
+_render_app = None
+
+
+def get_render_app():
+    """The renderer loads its C library on first use rather than at import"""
+    global _render_app
+    if _render_app is None:
+        _render_app = TrianglesMeshRender(clibs=make_abs_path('asset/render.so'))
+    return _render_app
 
 
 def render(img, ver_lst, tri, alpha=0.6, show_flag=False, wfp=None, with_bg_flag=True):
@@ -70,6 +78,7 @@ def render(img, ver_lst, tri, alpha=0.6, show_flag=False, wfp=None, with_bg_flag
     else:
         overlap = np.zeros_like(img)
 
+    render_app = get_render_app()
     for ver_ in ver_lst:
         ver = np.ascontiguousarray(ver_.T)  # transpose
         render_app(ver, tri, bg=overlap)
@@ -0,0 +1,80 @@
+# coding: utf-8
+
+"""
+Shared onnxruntime session factory: every ONNX model (3DMM regressor, BFM
+decoder, FaceBoxes) gets its session from here, built with one set of
+SessionOptions and cached per model path and options, so that several
+detectors in one process share sessions instead of each loading the model
+and spinning up its own thread pools.
+"""
+
+import os
+import os.path as osp
+import threading
+
+import onnxruntime
+
+_sessions = {}
+_lock = threading.Lock()
+
+_graph_optimization_levels = {
+    'disable': onnxruntime.GraphOptimizationLevel.ORT_DISABLE_ALL,
+    'basic': onnxruntime.GraphOptimizationLevel.ORT_ENABLE_BASIC,
+    'extended': onnxruntime.GraphOptimizationLevel.ORT_ENABLE_EXTENDED,
+    'all': onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL,
+}
+
+_execution_modes = {
+    'sequential': onnxruntime.ExecutionMode.ORT_SEQUENTIAL,
+    'parallel': onnxruntime.ExecutionMode.ORT_PARALLEL,
+}
+
+
+def session_options(model_fp=None, intra_op_num_threads=0, inter_op_num_threads=0,
+                    graph_optimization_level='all', execution_mode='sequential',
+                    enable_mem_pattern=True, enable_cpu_mem_arena=True, optimized_model_dir=None):
+    """Build the SessionOptions for a model
+
+    Thread counts of 0 leave the choice to onnxruntime. If optimized_model_dir
+    is given, the optimized graph of the model is saved there as <name>.opt.onnx
+    """
+    opts = onnxruntime.SessionOptions()
+    opts.intra_op_num_threads = intra_op_num_threads
+    opts.inter_op_num_threads = inter_op_num_threads
+    if graph_optimization_level not in _graph_optimization_levels:
+        raise ValueError(f'Unknown graph optimization level {graph_optimization_level}')
+    opts.graph_optimization_level = _graph_optimization_levels[graph_optimization_level]
+    if execution_mode not in _execution_modes:
+        raise ValueError(f'Unknown execution mode {execution_mode}')
+    opts.execution_mode = _execution_modes[execution_mode]
+    opts.enable_mem_pattern = enable_mem_pattern
+    opts.enable_cpu_mem_arena = enable_cpu_mem_arena
+    if optimized_model_dir is not None and model_fp is not None:
+        os.makedirs(optimized_model_dir, exist_ok=True)
+        name = osp.splitext(osp.basename(model_fp))[0]
+        opts.optimized_model_filepath = osp.join(optimized_model_dir, f'{name}.opt.onnx')
+    return opts
+
+
+def get_session(model_fp, **kvs):
+    """Get the cached session of a model, creating it on first use
+
+    kvs are passed on to session_options
+    """
+    key = (osp.realpath(model_fp), tuple(sorted(kvs.items())))
+    with _lock:
+        session = _sessions.get(key)
+        if session is None:
+            session = onnxruntime.InferenceSession(
+                model_fp,
+                sess_options=session_options(model_fp, **kvs),
+                providers=['CPUExecutionProvider']
+            )
+            _sessions[key] = session
+    return session
+
+
+def clear_sessions():
+    """Drop all cached sessions, e.g. after a model file has been rebuilt"""
+    with _lock:
+        _sessions.clear()
@@ -8,7 +8,6 @@ sys.path.append('..')
 
 import argparse
 import numpy as np
-import torch
 
 
 def _to_ctype(arr):
@@ -27,6 +26,7 @@ def str2bool(v):
 
 
 def load_model(model, checkpoint_fp):
+    import torch
     checkpoint = torch.load(checkpoint_fp, map_location=lambda storage, loc: storage)['state_dict']
     model_dict = model.state_dict()
     # because the model is trained by multiple gpus, prefix module should be removed
@@ -43,6 +43,7 @@ def load_model(model, checkpoint_fp):
 
 class ToTensorGjz(object):
     def __call__(self, pic):
+        import torch
         if isinstance(pic, np.ndarray):
             img = torch.from_numpy(pic.transpose((2, 0, 1)))
             return img.float()
@@ -77,6 +78,49 @@ def similar_transform(pts3d, roi_box, size):
     return np.array(pts3d, dtype=np.float32)
 
 
+def similar_transform_seq(pts3d, roi_boxes, size):
+    """similar_transform of a (T, 3, N) vertex array with a (T, 4) roi box array, in place"""
+    roi_boxes = np.asarray(roi_boxes, dtype=pts3d.dtype).reshape(-1, 4, 1)
+    sx, sy, ex, ey = roi_boxes[:, 0], roi_boxes[:, 1], roi_boxes[:, 2], roi_boxes[:, 3]
+    scale_x = (ex - sx) / size
+    scale_y = (ey - sy) / size
+    pts3d[:, 0] -= 1  # for Python compatibility
+    pts3d[:, 2] -= 1
+    pts3d[:, 1] = size - pts3d[:, 1]
+
+    pts3d[:, 0] = pts3d[:, 0] * scale_x + sx
+    pts3d[:, 1] = pts3d[:, 1] * scale_y + sy
+    pts3d[:, 2] *= (scale_x + scale_y) / 2
+    pts3d[:, 2] -= pts3d[:, 2].min(axis=1, keepdims=True)
+    return pts3d
+
+
+def recon_vers_seq(params, roi_boxes, u, w, size, dtype=np.float32, chunk=None):
+    """Reconstruct the vertices of a whole sequence of faces at once
+
+    params: (T, 62) params, roi_boxes: (T, 4) roi boxes
+    u: (3N, 1) mean shape, w: (3N, 50) shape and expression bases side by side
+    dtype: dtype of the returned (T, 3, N) vertices, computed in float32
+    chunk: number of faces reconstructed per matmul, by default bounding
+        the float32 temporaries to about 64MB
+    """
+    params = np.asarray(params, dtype=np.float32).reshape(len(params), -1)
+    roi_boxes = np.asarray(roi_boxes, dtype=np.float32).reshape(-1, 4)
+    n = len(u) // 3
+    if chunk is None:
+        chunk = max(1, (64 << 20) // (3 * n * 4 * 2))
+
+    ver = np.empty((len(params), 3, n), dtype=dtype)
+    for i in range(0, len(params), chunk):
+        param = params[i:i + chunk]
+        P = param[:, :12].reshape(-1, 3, 4)
+        # u + w_shp @ alpha_shp + w_exp @ alpha_exp for every face in one matmul
+        vertex = (u.reshape(1, -1) + param[:, 12:] @ w.T).reshape(-1, n, 3).transpose(0, 2, 1)
+        pts3d = P[:, :, :3] @ vertex + P[:, :, 3:]
+        ver[i:i + chunk] = similar_transform_seq(pts3d, roi_boxes[i:i + chunk], size)
+    return ver
+
+
 def _parse_param(param):
     """matrix pose form
     param: shape=(trans_dim+shape_dim+exp_dim,), i.e., 62 = 12 + 40 + 10
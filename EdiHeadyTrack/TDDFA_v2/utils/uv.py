@@ -9,17 +9,18 @@ sys.path.append('..')
 import cv2
 import numpy as np
 import os.path as osp
-import scipy.io as sio
 
 from Sim3DR import rasterize
 from utils.functions import plot_image
 from utils.io import _load
+from utils.assets import load_uv_coords as load_compiled_uv_coords
 from utils.tddfa_util import _to_ctype
 
 make_abs_path = lambda fn: osp.join(osp.dirname(osp.realpath(__file__)), fn)
 
 
 def load_uv_coords(fp):
+    import scipy.io as sio
     C = sio.loadmat(fp)
     uv_coords = C['UV'].copy(order='C').astype(np.float32)
     return uv_coords
@@ -33,11 +34,6 @@ def process_uv(uv_coords, uv_h=256, uv_w=256):
     return uv_coords
 
 
-g_uv_coords = load_uv_coords(make_abs_path('../configs/BFM_UV.mat'))
-indices = _load(make_abs_path('../configs/indices.npy'))  # todo: handle bfm_slim
-g_uv_coords = g_uv_coords[indices, :]
-
-
 def get_colors(img, ver):
     # nearest-neighbor sampling
     [h, w, _] = img.shape
@@ -77,7 +73,7 @@ def bilinear_interpolate(img, x, y):
 
 
 def uv_tex(img, ver_lst, tri, uv_h=256, uv_w=256, uv_c=3, show_flag=False, wfp=None):
-    uv_coords = process_uv(g_uv_coords.copy(), uv_h=uv_h, uv_w=uv_w)
+    uv_coords = process_uv(np.array(load_compiled_uv_coords()), uv_h=uv_h, uv_w=uv_w)
 
     res_lst = []
     for ver_ in ver_lst:
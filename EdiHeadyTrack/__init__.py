@@ -1,35 +1,33 @@
-from .camera import(
-    Camera
-)
-
-from .video import(
-    Video
-)
-
-
-from .posedetector import(
-    MediaPipe,
-    TDDFA_V2
-)
-
-
-from .imu import(
-    Wax9
-)
-
-from .filter import(
-    Filter
-)
-
-from .sensordata import(
-    Head,
-    IMU,
-    SensorData
-)
-
-from .plot import(
-    Plot
-)
+# the public classes are imported from their modules on first use, so that
+# importing EdiHeadyTrack (or one of its modules, in a worker process) does
+# not load mediapipe, matplotlib, pandas or onnxruntime until a feature
+# needing them is used
+
+_lazy = {
+    'Camera': 'camera',
+    'Video': 'video',
+    'MediaPipe': 'posedetector',
+    'TDDFA_V2': 'posedetector',
+    'Wax9': 'imu',
+    'Filter': 'filter',
+    'Head': 'sensordata',
+    'IMU': 'sensordata',
+    'SensorData': 'sensordata',
+    'Plot': 'plot',
+}
+
+
+def __getattr__(name):
+    if name in _lazy:
+        from importlib import import_module
+        value = getattr(import_module(f'.{_lazy[name]}', __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_lazy))
 
 
 __all__ = [
@@ -40,4 +38,4 @@ __all__ = [
     "process",
     "compare",
     "archive"
-]
\ No newline at end of file
+]
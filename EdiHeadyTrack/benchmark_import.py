@@ -0,0 +1,67 @@
+"""
+Import-time benchmark of EdiHeadyTrack, timing each statement in a fresh
+interpreter and listing the heavy backends it loaded. Run from the repository
+root:
+
+    python -m EdiHeadyTrack.benchmark_import
+"""
+
+import json
+import subprocess
+import sys
+
+import numpy as np
+
+
+HEAVY_MODULES = ('mediapipe', 'matplotlib', 'pandas', 'scipy', 'onnxruntime', 'torch')
+
+STATEMENTS = (
+    'import EdiHeadyTrack',
+    'from EdiHeadyTrack import Video, Camera',
+    'from EdiHeadyTrack.posedetector import TDDFA_V2; TDDFA_V2()',
+    'from EdiHeadyTrack import MediaPipe; MediaPipe()',
+    'from EdiHeadyTrack import Head',
+    'from EdiHeadyTrack import Plot',
+)
+
+_SCRIPT = '''
+import json, sys, time
+start = time.perf_counter()
+{statement}
+elapsed = time.perf_counter() - start
+print(json.dumps([elapsed, [name for name in {heavy!r} if name in sys.modules]]))
+'''
+
+
+def time_import(statement):
+    """Times a statement in a fresh interpreter
+
+    Parameters
+    ----------
+    statement : str
+        Python statement importing part of EdiHeadyTrack
+
+    Returns
+    -------
+    elapsed : float
+        wall time taken by the statement in seconds
+    loaded : list
+        names of the heavy modules loaded by the statement
+    """
+    script = _SCRIPT.format(statement=statement, heavy=HEAVY_MODULES)
+    output = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True, check=True).stdout
+    elapsed, loaded = json.loads(output.strip().splitlines()[-1])
+    return elapsed, loaded
+
+
+def main(repeat=5):
+    # the interpreter start-up itself is not counted, only the statement
+    for statement in STATEMENTS:
+        results = [time_import(statement) for _ in range(repeat)]
+        times = np.array([elapsed for elapsed, _ in results]) * 1000
+        loaded = ', '.join(results[-1][1]) or '-'
+        print('{:<60} {:8.1f}±{:.1f} ms   {}'.format(statement, np.median(times), np.std(times), loaded))
+
+
+if __name__ == '__main__':
+    main()
@@ -38,7 +38,7 @@ class Camera:
         
     Methods
     -------
-    calibrate(checkerboard=(9,6), video=Video()):
+    calibrate(checkerboard=(9,6), video=None):
         Performs calibration on the camera
     """
     def __init__(self):
@@ -59,7 +59,7 @@ class Camera:
         self.calibrated = False
 
     
-    def calibrate(self, checkerboard=(9,6), video=Video(), show=True):
+    def calibrate(self, checkerboard=(9,6), video=None, show=True):
         """Creates a calibrator object and calibrates the Camera.
 
         If arguments checkerboard and video aren't passed in, the
@@ -70,10 +70,10 @@ class Camera:
         checkerboard : tuple, optional
             Checkerboard pattern used in camera calibration (default is 9x6)
         video : Video, optional
-            Video used to calibrate camera
+            Video used to calibrate camera (default None, an empty video)
         """
         
-        self.video = video
+        self.video = video if video is not None else Video()
         self.calibrator = Calibrator(checkerboard, self.video, show)
         self.calibrated = True
 
@@ -190,7 +190,7 @@ class Calibrator:
         Save camera parameters to csv files
     """
 
-    def __init__(self, checkerboard, video=Video(), show=True):
+    def __init__(self, checkerboard, video=None, show=True):
         """
         Parameters
         ----------
@@ -202,7 +202,7 @@ class Calibrator:
         """
         timestamp = datetime.now().strftime("%H:%M:%S")
         self.show = show
-        self.video = video
+        self.video = video if video is not None else Video()
         print('-'*120)
         print('{:<100} {:>19}'.format(f'Creating Calibrator object for video {self.video.filename}:', timestamp))
         print('-'*120)
@@ -0,0 +1,180 @@
+import os
+import shutil
+import tempfile
+
+import cv2
+
+
+class FrameStore:
+    """
+    A class representing a store for tracked frames, which keeps no
+    frames at all
+
+    Frames are added as BGR images, keyed by their index in the video,
+    and returned as RGB images. Frames which are not held by a store are
+    returned as None, in which case they can be decoded again from the
+    source video.
+
+    ...
+
+    Methods
+    -------
+    add(idx, img)
+        adds a frame to the store
+    get(idx)
+        gets a frame from the store
+    close()
+        discards all frames held by the store
+    """
+    def add(self, idx, img):
+        """Adds a frame to the store
+
+        Parameters
+        ----------
+        idx : int
+            index of the frame in the video
+        img : ndarray
+            ndarray representing the BGR frame
+        """
+        return
+
+    def get(self, idx):
+        """Gets a frame from the store
+
+        Parameters
+        ----------
+        idx : int
+            index of the frame in the video
+
+        Returns
+        -------
+        ndarray
+            ndarray representing the RGB frame, or None if the frame is
+            not held by the store
+        """
+        return None
+
+    def close(self):
+        """Discards all frames held by the store
+        """
+        return
+
+    def __contains__(self, idx):
+        return self.get(idx) is not None
+
+    def __len__(self):
+        return 0
+
+
+class ThumbnailStore(FrameStore):
+    """
+    A class representing a store which keeps downscaled copies of every
+    step-th tracked frame in memory
+
+    ...
+
+    Attributes
+    ----------
+    scale : float
+        factor the frames are resized by before being stored
+    step : int
+        only frames whose index is a multiple of step are stored
+    thumbnails : dict
+        dict of stored RGB thumbnails keyed by frame index
+    """
+    def __init__(self, scale=0.25, step=1):
+        """
+        Parameters
+        ----------
+        scale : float, optional
+            factor the frames are resized by before being stored (default 0.25)
+        step : int, optional
+            only frames whose index is a multiple of step are stored (default 1)
+        """
+        if not 0 < scale <= 1:
+            raise ValueError(f'Thumbnail scale must be in (0, 1], got {scale}')
+        self.scale = scale
+        self.step = step
+        self.thumbnails = {}
+
+    def add(self, idx, img):
+        if idx % self.step != 0:
+            return
+        if self.scale != 1:
+            img = cv2.resize(img, None, fx=self.scale, fy=self.scale, interpolation=cv2.INTER_AREA)
+        self.thumbnails[idx] = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+
+    def get(self, idx):
+        return self.thumbnails.get(idx)
+
+    def close(self):
+        self.thumbnails = {}
+
+    def __contains__(self, idx):
+        return idx in self.thumbnails
+
+    def __len__(self):
+        return len(self.thumbnails)
+
+
+class DiskStore(FrameStore):
+    """
+    A class representing a store which keeps tracked frames as JPEG
+    images on disk, so memory use does not grow with video length
+
+    ...
+
+    Attributes
+    ----------
+    directory : str
+        path of the directory the frames are written to
+    quality : int
+        JPEG quality the frames are written with
+    """
+    def __init__(self, directory=None, quality=90):
+        """
+        Parameters
+        ----------
+        directory : str, optional
+            path of the directory the frames are written to (default a
+            temporary directory, removed when the store is closed)
+        quality : int, optional
+            JPEG quality the frames are written with (default 90)
+        """
+        self._temporary = directory is None
+        if self._temporary:
+            directory = tempfile.mkdtemp(prefix='EdiHeadyTrack_')
+        else:
+            os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.quality = quality
+        self._indices = set()
+
+    def add(self, idx, img):
+        if not self._indices:
+            # the directory is removed when a temporary store is closed
+            os.makedirs(self.directory, exist_ok=True)
+        cv2.imwrite(self._path(idx), img, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+        self._indices.add(idx)
+
+    def get(self, idx):
+        if idx not in self._indices:
+            return None
+        return cv2.cvtColor(cv2.imread(self._path(idx)), cv2.COLOR_BGR2RGB)
+
+    def close(self):
+        if self._temporary:
+            shutil.rmtree(self.directory, ignore_errors=True)
+        else:
+            for idx in self._indices:
+                os.remove(self._path(idx))
+        self._indices = set()
+
+    def _path(self, idx):
+        return os.path.join(self.directory, f'{idx:08d}.jpg')
+
+    def __contains__(self, idx):
+        return idx in self._indices
+
+    def __len__(self):
+        return len(self._indices)
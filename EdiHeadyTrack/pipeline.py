@@ -0,0 +1,190 @@
+import queue
+import threading
+
+
+_DONE = object()
+
+
+class Pipeline:
+    """
+    A class representing a chain of processing stages, each running in
+    its own thread and joined to the next by a bounded queue
+
+    Every stage is served by exactly one worker thread and the queues
+    are first-in first-out, so items leave the Pipeline in the same
+    order they were produced by the source.
+
+    ...
+
+    Attributes
+    ----------
+    maxsize : int
+        maximum number of items waiting between two stages
+    source : iterable
+        iterable producing the items fed into the first stage
+    stages : list, callable
+        list of functions applied to each item in turn
+
+    Methods
+    -------
+    close()
+        stops all worker threads and discards items still in flight
+    """
+    def __init__(self, source, *stages, maxsize=8):
+        """
+        Parameters
+        ----------
+        source : iterable
+            iterable producing the items fed into the first stage
+        *stages : callable
+            functions applied to each item in turn, in a separate thread
+        maxsize : int, optional
+            maximum number of items waiting between two stages (default 8)
+        """
+        self.source = source
+        self.stages = list(stages)
+        self.maxsize = maxsize
+        self._queues = [queue.Queue(maxsize) for _ in range(len(self.stages) + 1)]
+        self._threads = []
+        self._error = None
+        self._stop = threading.Event()
+
+    def __iter__(self):
+        self._start()
+        output = self._queues[-1]
+        try:
+            while True:
+                item = output.get()
+                if item is _DONE:
+                    break
+                yield item
+        finally:
+            self.close()
+        if self._error is not None:
+            raise self._error
+
+    def close(self):
+        """Stops all worker threads and discards items still in flight
+        """
+        self._stop.set()
+        for q in self._queues:
+            self._drain(q)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def _start(self):
+        self._threads = [threading.Thread(target=self._produce, daemon=True)]
+        for idx, stage in enumerate(self.stages):
+            self._threads.append(threading.Thread(target=self._work,
+                                                  args=(stage, self._queues[idx], self._queues[idx+1]),
+                                                  daemon=True))
+        for thread in self._threads:
+            thread.start()
+
+    def _produce(self):
+        try:
+            for item in self.source:
+                if not self._put(self._queues[0], item):
+                    return
+        except Exception as error:
+            self._error = error
+        self._put(self._queues[0], _DONE)
+
+    def _work(self, stage, inbox, outbox):
+        while True:
+            item = self._get(inbox)
+            if item is _DONE or self._stop.is_set():
+                break
+            try:
+                item = stage(item)
+            except Exception as error:
+                self._error = error
+                break
+            if not self._put(outbox, item):
+                return
+        self._put(outbox, _DONE)
+
+    def _get(self, q):
+        while not self._stop.is_set():
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return _DONE
+
+    def _put(self, q, item):
+        while not self._stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    @staticmethod
+    def _drain(q):
+        while True:
+            try:
+                q.get_nowait()
+            except queue.Empty:
+                return
+
+
+class AsyncWriter:
+    """
+    A class representing a video writer which encodes frames in a
+    background thread
+
+    ...
+
+    Attributes
+    ----------
+    writer : cv2.VideoWriter
+        writer object used to encode the frames
+
+    Methods
+    -------
+    write(frame)
+        queues a frame to be written
+    release()
+        writes any queued frames and releases the writer
+    """
+    def __init__(self, writer, maxsize=8):
+        """
+        Parameters
+        ----------
+        writer : cv2.VideoWriter
+            writer object used to encode the frames
+        maxsize : int, optional
+            maximum number of frames waiting to be written (default 8)
+        """
+        self.writer = writer
+        self._queue = queue.Queue(maxsize)
+        self._thread = threading.Thread(target=self._encode, daemon=True)
+        self._thread.start()
+
+    def write(self, frame):
+        """Queues a frame to be written
+
+        Parameters
+        ----------
+        frame : ndarray
+            ndarray representing the frame to be written
+        """
+        self._queue.put(frame)
+
+    def release(self):
+        """Writes any queued frames and releases the writer
+        """
+        if self._thread.is_alive():
+            self._queue.put(_DONE)
+            self._thread.join()
+        self.writer.release()
+
+    def _encode(self):
+        while True:
+            frame = self._queue.get()
+            if frame is _DONE:
+                break
+            self.writer.write(frame)
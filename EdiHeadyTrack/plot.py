@@ -192,10 +192,11 @@ class Plot:
         if key_times or key_frames:
             for sensor_idx, sensor in enumerate(self.heads):
                 for idx, frame in enumerate(key_frames):
-                    img = sensor.posedetector.tracking_frames[frame]
-                    frame_index = sensor.posedetector.pose['frame'].index(frame)
-                    x_list = [pos[0] for pos in sensor.posedetector.face2d['all landmark positions'][frame_index]]
-                    y_list = [pos[1] for pos in sensor.posedetector.face2d['all landmark positions'][frame_index]]
+                    img = sensor.posedetector.get_frame(frame)
+                    frame_index = sensor.posedetector.face2d.row(frame)
+                    positions = sensor.posedetector.face2d['all landmark positions'][frame_index]
+                    x_list = positions[:, 0].tolist()
+                    y_list = positions[:, 1].tolist()
                     # print(x_list)
                     # print(y_list)
                     top_bound = max(0, min(y_list[:]) - 200)
@@ -203,9 +204,12 @@ class Plot:
                     left_bound = max(0, min(x_list[:]) - 200)
                     right_bound = min(sensor.posedetector.video.width, max(x_list[:]) + 200)
                     
-                    img = img[top_bound:bottom_bound, left_bound:right_bound, :]
+                    # frame stores may hold downscaled frames
+                    scale = img.shape[1] / sensor.posedetector.video.width
+                    img = img[int(top_bound*scale):int(bottom_bound*scale), 
+                              int(left_bound*scale):int(right_bound*scale), :]
 
-                    imagebox = OffsetImage(img, zoom=0.08)
+                    imagebox = OffsetImage(img, zoom=0.08/scale)
                     imagebox.image.axes = axs[0]
                     
                     if len(self.heads) == 1:
@@ -11,18 +11,22 @@
 # **************************************************************************** #
 
 import cv2
-import mediapipe as mp
 import numpy as np
-from numpy import genfromtxt
-from tqdm import tqdm
 from datetime import datetime
 import time
+import os.path as osp
 
 from EdiHeadyTrack.camera import Camera
 from EdiHeadyTrack.video import Video
 from .camera import Camera
 from .video import Video
-from .filter import Filter
+from .pipeline import Pipeline, AsyncWriter
+from .framestore import FrameStore
+from .results import Results
+from .posesolver import PoseSolver, solve_poses
+from .reconstruction import Reconstruction
+from .scheduler import DetectionScheduler
+from .resolution import Resolution
 
 class PoseDetector:
     """
@@ -34,29 +38,390 @@ class PoseDetector:
     ----------
     camera : Camera, optional
         Camera object to be used with PoseDetector
-    face2d : dict
-        dict of detected face points in 2d
+    face2d : Results
+        time history of detected face points in 2d, read like a dict
     face3d : list
         list of known 3d face points (from mesh model)
+    headless : bool, optional
+        flag for analysis-only tracking, which skips all drawing, display
+        and video writing and keeps no tracking frames (default False)
+    overlap : int, optional
+        number of warm-up frames decoded before each shard so tracking
+        is locked on at the cut (default 10)
+    pipeline : bool, optional
+        flag for running decoding, inference, pose solving and encoding
+        as separate threaded stages (default False)
+    shard : tuple, optional
+        (start, stop, overlap) frame range processed by a sharded worker
+        (default None, whole video)
+    shards : int, optional
+        number of worker processes the video is split between (default 1).
+        Workers are spawned, so scripts using shards must guard their
+        entry point with ``if __name__ == '__main__':``
     show : bool, optional
             flag for displaying video output (default True)
-    tracking_frames : list, ndarray
-        list containing frames which have successfully been tracked
+    tracking_frames : FrameStore
+        store holding frames which have successfully been tracked. The
+        default FrameStore keeps no frames, so memory use is constant in
+        video length and frames are decoded again when requested
+
+    Methods
+    -------
+    run(video=None)
+        tracks the whole video, filling in face2d and pose
+    stream(video=None)
+        tracks the video, yielding the results of each frame as it is
+        tracked
+    get_frame(frame_number)
+        gets the annotated RGB image of a tracked frame
+    render(filename='tracking.mp4', show=False)
+        renders the tracking overlay from stored results onto the video
     """
-    def __init__(self, video=Video(), camera=Camera(), show=True):
-        self.camera = camera
-        self.video = video
-        self.face2d = {'time': [],
-                       'frame': [],
-                       'key landmark positions':    [],
-                       'all landmark positions':    []}
-        self.pose = {'frame':   [],
-                     'time':    [],
-                     'yaw':     [],
-                     'pitch':   [],
-                     'roll':    []}
+    def __init__(self, video=None, camera=None, show=True, pipeline=False,
+                 shards=1, overlap=10, shard=None, headless=False, frame_store=None):
+        self.camera = camera if camera is not None else Camera()
         self.show = show
-        self.tracking_frames = []
+        self.pipeline = pipeline
+        self.shards = shards
+        self.overlap = overlap
+        self.shard = shard
+        self.headless = headless
+        self.tracking_frames = frame_store if frame_store is not None else FrameStore()
+        self._reset(video if video is not None else Video())
+
+    def run(self, video=None):
+        """Tracks the whole video, filling in face2d and pose
+
+        Parameters
+        ----------
+        video : Video, optional
+            video to track instead of the current one, replacing the
+            results of any previous run (default None, current video)
+
+        Returns
+        -------
+        self
+        """
+        for _ in self.stream(video):
+            pass
+        return self
+
+    def stream(self, video=None):
+        """Tracks the video, yielding the results of each frame as soon
+        as it has been tracked
+
+        Results are also recorded in face2d and pose as they are yielded,
+        replacing the results of any previous run. Frames in which no
+        face was found are not yielded.
+
+        Parameters
+        ----------
+        video : Video, optional
+            video to track instead of the current one (default None,
+            current video)
+
+        Yields
+        ------
+        dict
+            dict of the face2d and pose values of a tracked frame
+        """
+        raise NotImplementedError(f'{type(self).__name__} does not implement tracking')
+
+    def _reset(self, video):
+        '''
+        Start again on a video, with empty results
+        '''
+        self.video = video
+        # one preallocated row per frame, landmark positions are in pixels
+        capacity = getattr(video, 'total_frames', 0)
+        self.face2d = Results({'time': np.float64,
+                               'frame': np.int64,
+                               'key landmark positions':    np.int16,
+                               'all landmark positions':    np.int16}, capacity)
+        self.pose = Results({'frame':   np.int64,
+                             'time':    np.float64,
+                             'yaw':     np.float64,
+                             'pitch':   np.float64,
+                             'roll':    np.float64}, capacity)
+        if len(self.tracking_frames):
+            # frames of a previous run
+            self.tracking_frames.close()
+
+    def get_frame(self, frame_number):
+        """Gets the annotated RGB image of a tracked frame, from the
+        frame store if it is held there or decoded again from the video
+
+        Parameters
+        ----------
+        frame_number : int
+            frame number as recorded in face2d and pose
+
+        Returns
+        -------
+        ndarray
+            ndarray representing the RGB frame, or None if the frame
+            could not be read
+        """
+        idx = self._frame_index(frame_number)
+        img = self.tracking_frames.get(idx)
+        if img is not None:
+            return img
+        for _, img in self.video.frames(idx, idx+1):
+            self._draw(img,
+                       self._select(self.face2d, self.face2d.row(frame_number)),
+                       self._select(self.pose, self.pose.row(frame_number)))
+            return cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+        return None
+
+    def render(self, filename='tracking.mp4', show=False):
+        """Renders the tracking overlay onto the video from the stored
+        face2d and pose results, without running the detector again
+
+        Parameters
+        ----------
+        filename : str, optional
+            path of the annotated video to be written (default 'tracking.mp4')
+        show : bool, optional
+            flag for displaying video output (default False)
+
+        Returns
+        -------
+        self
+        """
+        print('Rendering tracking results onto selected video...')
+        face2d = dict(self.face2d)
+        pose = dict(self.pose)
+        face2d_rows = {frame: row for row, frame in enumerate(face2d['frame'])}
+        pose_rows = {frame: row for row, frame in enumerate(pose['frame'])}
+        writer = cv2.VideoWriter(filename,
+                                 cv2.VideoWriter_fourcc(*'mp4v'),
+                                 self.video.fps,
+                                 (self.video.width,self.video.height))
+        from tqdm import tqdm
+        for idx, img in tqdm(self.video.frames(), total=self.video.total_frames):
+            frame_number = self._frame_number(idx)
+            self._draw(img,
+                       self._select(face2d, face2d_rows.get(frame_number)),
+                       self._select(pose, pose_rows.get(frame_number)))
+            writer.write(img)
+            if self._display(img, show):
+                print('Rendering interrupted...')
+                break
+        writer.release()
+        cv2.destroyAllWindows()
+        print(f'Dump to {filename}')
+
+        return self
+
+    def _draw(self, img, face2d, pose):
+        '''
+        Draw the stored face2d and pose values of one frame onto the
+        frame, either being None if the frame was not tracked
+        '''
+        if face2d is not None:
+            for position in face2d['all landmark positions']:
+                cv2.circle(img, (int(position[0]), int(position[1])), 2, (0, 255, 0), -1)
+
+    def _frame_number(self, idx):
+        '''
+        Get the frame number recorded for a given frame index
+        '''
+        return idx
+
+    def _frame_index(self, frame_number):
+        '''
+        Get the frame index for a given recorded frame number
+        '''
+        return frame_number
+
+    @staticmethod
+    def _select(columns, row):
+        '''
+        Get the values of each column at a given row, or None if there
+        is no row
+        '''
+        if row is None:
+            return None
+        return {key: column[row] for key, column in columns.items()}
+
+    def _display(self, img, show=None):
+        '''
+        Display a frame if requested, returning True if tracking has
+        been interrupted by pressing 'q'
+        '''
+        if show is None:
+            show = self.show
+        if show != True:
+            return False
+        cv2.namedWindow("EdiHeadyTrack", cv2.WINDOW_NORMAL)
+        cv2.resizeWindow("EdiHeadyTrack", int(self.video.width/2), int(self.video.height/2))
+        cv2.imshow("EdiHeadyTrack", img)
+        return cv2.waitKey(5) & 0xFF == ord('q')
+
+    def _writer(self, filename):
+        '''
+        Create the writer for the annotated video, or None if running headless
+        '''
+        if self.headless:
+            return None
+        writer = cv2.VideoWriter(filename,
+                                 cv2.VideoWriter_fourcc(*'mp4v'),
+                                 self.video.fps,
+                                 (self.video.width,self.video.height))
+        if self.pipeline:
+            writer = AsyncWriter(writer)
+        return writer
+
+    def _frame_range(self):
+        '''
+        Get the first frame to decode, the first frame to record and
+        the frame to stop before
+        '''
+        if self.shard:
+            start, stop, overlap = self.shard
+            return max(0, start - overlap), start, stop
+        return 0, 0, None
+
+    def _frames(self, *stages):
+        '''
+        Iterate over the video, passing each frame through the given
+        stages either one after another or as a threaded Pipeline
+        '''
+        first, start, stop = self._frame_range()
+        frames = self.video.frames(first, stop)
+        if self.pipeline:
+            return Pipeline(frames, *stages)
+        return self._serial(frames, stages)
+
+    def _progress_bar(self):
+        first, start, stop = self._frame_range()
+        if stop is None:
+            stop = self.video.total_frames
+        from tqdm import tqdm
+        return tqdm(range(max(stop - first, 0)))
+
+    def _shard_kwargs(self):
+        '''
+        Get the keyword arguments needed to rebuild this PoseDetector in
+        a worker process
+        '''
+        return {'pipeline': self.pipeline, 'headless': True}
+
+    def _results(self):
+        '''
+        Get the Results objects filled in by a run, in the order they are
+        returned from a sharded worker process
+        '''
+        return self.face2d, self.pose
+
+    def _row(self, idx):
+        '''
+        Get the values recorded for a frame index in every Results
+        object, as one dict
+        '''
+        row = {}
+        for results in self._results():
+            row.update({key: column[idx] for key, column in results.columns.items()
+                        if column is not None and idx < len(column)})
+        return row
+
+    def _stream_sharded(self):
+        '''
+        Split the video into frame ranges, process each range in its own
+        worker process and merge the results back in frame order, yielding
+        the rows of each range once it has been merged
+        '''
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+
+        print(f'Splitting video between {self.shards} worker processes...')
+        bounds = np.linspace(0, self.video.total_frames, self.shards + 1).astype(int)
+        shards = [(int(bounds[idx]), int(bounds[idx+1]), self.overlap) for idx in range(self.shards)]
+        # the frame count reported by the container can be inaccurate, so
+        # the last shard always runs to the end of the video
+        shards[-1] = (shards[-1][0], None, self.overlap)
+        camera = (self.camera.internal_matrix, self.camera.distortion_matrix)
+
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(self.shards, mp_context=context) as pool:
+            futures = [pool.submit(_run_shard, type(self), self.video.filename,
+                                   camera, self._shard_kwargs(), shard)
+                       for shard in shards]
+            for future in futures:
+                shard_results = future.result()
+                for results, merged in zip(self._results(), shard_results):
+                    results.merge(merged)
+                for idx in np.flatnonzero(shard_results[0].valid):
+                    yield self._row(idx)
+        print('Face tracking complete...')
+
+    @staticmethod
+    def _serial(items, stages):
+        for item in items:
+            for stage in stages:
+                item = stage(item)
+            yield item
+
+
+def _run_shard(cls, filename, camera, kwargs, shard):
+    """Runs a PoseDetector over one shard of a video in a worker process
+
+    Parameters
+    ----------
+    cls : type
+        PoseDetector subclass to be run
+    filename : str
+        path to video file
+    camera : tuple, ndarray
+        camera internal and distortion matrices
+    kwargs : dict
+        keyword arguments passed on to the PoseDetector
+    shard : tuple
+        (start, stop, overlap) frame range to be processed
+
+    Returns
+    -------
+    tuple, Results
+        results for the frames in the shard, face2d and pose first
+    """
+    video = Video(filename)
+    worker_camera = Camera()
+    worker_camera.internal_matrix, worker_camera.distortion_matrix = camera
+    detector = cls(video, worker_camera, False, shard=shard, **kwargs).run()
+    return detector._results()
+
+
+# the bytes of a serialized NormalizedLandmark holding x, y and z: the field
+# tag and length of the landmark, then the tags of x, y and z
+_LANDMARK_TAGS = np.array([0x0a, 0x0f, 0x0d, 0x15, 0x1d], dtype=np.uint8)
+
+
+def _landmark_xy(landmark_list):
+    """Reads the normalised x, y coordinates of a FaceMesh landmark list
+
+    Every landmark of a serialized list is a 17 byte record with x, y and z
+    as tagged float32 values, so they are read as one strided array instead
+    of one attribute access per landmark. Lists laid out otherwise, e.g.
+    with visibility set, are read landmark by landmark
+
+    Parameters
+    ----------
+    landmark_list : NormalizedLandmarkList
+        landmarks of one face found by FaceMesh
+
+    Returns
+    -------
+    ndarray
+        (n, 2) float64 array of normalised landmark coordinates
+    """
+    data = landmark_list.SerializeToString()
+    n = len(landmark_list.landmark)
+    if n and len(data) == 17 * n:
+        records = np.frombuffer(data, dtype=np.uint8).reshape(n, 17)
+        if np.all(records[:, [0, 1, 2, 7, 12]] == _LANDMARK_TAGS):
+            return np.ndarray((n, 2), dtype='<f4', buffer=data, offset=3, strides=(17, 5)).astype(np.float64)
+    return np.array([(lm.x, lm.y) for lm in landmark_list.landmark], dtype=np.float64).reshape(n, 2)
+
 
 class MediaPipe(PoseDetector):
     """
@@ -74,6 +439,10 @@ class MediaPipe(PoseDetector):
         MediaPipe FaceMesh object 
     key_landmarks : list
         list of key landmark positions used for pose estimation
+    pose_solver : PoseSolver
+        PnP solver used for pose estimation, warm started between frames
+    rmats : ndarray
+        rotation matrix of each tracked frame, set by solve_poses
     maxFaces : int
         int number of maximum faces to be detected in video
     minDetectionCon : float
@@ -82,15 +451,26 @@ class MediaPipe(PoseDetector):
         float representing minimum tracking confidence
     mpDraw : module
         MediaPipe drawing utilities
+    mpDrawStyles : module
+        MediaPipe drawing styles
     mpFaceMesh : module
         MediaPipe face mesh utilities
     refineLandmarks : bool
         bool for choosing if landmarks will be refined
+    resolution : Resolution
+        resolution frames are downscaled to before running FaceMesh, or
+        None for full resolution
+    roi : bool
+        bool for running FaceMesh on a crop around the face found in the
+        previous frame instead of the whole frame
+    roi_margin : float
+        size of the crop either side of the face, as a fraction of the
+        face size
     staticMode : bool
         bool representing if searching for landmarks on static frame
         or non static video file
-    face2d : dict
-        dict of detected face points in 2d
+    face2d : Results
+        time history of detected face points in 2d, read like a dict
     face3d : list
         list of known 3d face points (from mesh model)
         
@@ -98,11 +478,16 @@ class MediaPipe(PoseDetector):
     -------
     find_faces(img)
         search for faces in a given frame
-    run()
-        run through the tracking procedure using MediaPipe face mesh
+    stream(video=None)
+        run through the tracking procedure using MediaPipe face mesh,
+        yielding the results of each frame
+    solve_poses(camera=None, threads=1)
+        solves the head pose again from the stored key landmark positions
     """
-    def __init__(self, video=Video(), camera=Camera(), show=True,
-                 staticMode=False, maxFaces=1, refineLandmarks=True, minDetectionCon=0.5, minTrackCon=0.5):
+    def __init__(self, video=None, camera=None, show=True,
+                 staticMode=False, maxFaces=1, refineLandmarks=True, minDetectionCon=0.5, minTrackCon=0.5,
+                 pipeline=False, shards=1, overlap=10, shard=None, headless=False, frame_store=None,
+                 roi=False, roi_margin=0.5, resolution=None):
         """
         Parameters
         ----------
@@ -122,88 +507,171 @@ class MediaPipe(PoseDetector):
             minimum detection confidence (default 0.5)
         minTrackCon : float, optional
             minimum tracking confidence (default 0.5)
+        pipeline : bool, optional
+            flag for running decoding, inference, pose solving and encoding
+            as separate threaded stages (default False)
+        shards : int, optional
+            number of worker processes the video is split between (default 1)
+        overlap : int, optional
+            number of warm-up frames decoded before each shard (default 10)
+        shard : tuple, optional
+            (start, stop, overlap) frame range processed by a sharded worker
+            (default None, whole video)
+        headless : bool, optional
+            flag for analysis-only tracking without drawing, display or
+            video writing (default False)
+        frame_store : FrameStore, optional
+            store the tracked frames are kept in (default FrameStore(),
+            which keeps no frames)
+        roi : bool, optional
+            flag for running FaceMesh on a crop around the face found in
+            the previous frame, falling back to the whole frame when the
+            face is lost (default False)
+        roi_margin : float, optional
+            size of the crop either side of the face, as a fraction of the
+            face size (default 0.5)
+        resolution : Resolution, optional
+            resolution frames are downscaled to before running FaceMesh,
+            with landmarks given in full resolution pixels (default None,
+            full resolution)
         """
-        super().__init__(video, camera, show)
-        timestamp = datetime.now().strftime("%H:%M:%S")
-        print('-'*120)
-        print('{:<100} {:>19}'.format(f'Creating MediaPipe object for video {self.video.filename}:', timestamp))
-        print('-'*120)
-        print(self.video)
+        super().__init__(video, camera, show, pipeline, shards, overlap, shard, headless, frame_store)
+        self.roi = roi
+        self.roi_margin = roi_margin
+        self.resolution = resolution
+        self._window = None
+        self._roi_mesh = None
+        self._roi_mesh_window = None
         self.staticMode = staticMode
         self.refineLandmarks = refineLandmarks
         self.maxFaces = maxFaces
         self.minDetectionCon = minDetectionCon
         self.minTrackCon = minTrackCon
-        self.mpDraw = mp.solutions.drawing_utils
-        self.mpFaceMesh = mp.solutions.face_mesh
-        self.faceMesh = self.mpFaceMesh.FaceMesh(self.staticMode,
-                                                 self.maxFaces,
-                                                 self.refineLandmarks,
-                                                 self.minDetectionCon,
-                                                 self.minTrackCon)
-        self.drawSpec = self.mpDraw.DrawingSpec(thickness=1, circle_radius=2)
+        # built for each run, as FaceMesh tracks from frame to frame
+        self.faceMesh = None
         self.key_landmarks = [33, 263, 1, 61, 291, 199]
-        self.face3d = []
-        self.run()
+        # key landmarks are taken in index order, matching face3d
+        self._key_landmark_indices = np.array(sorted(self.key_landmarks))
+        self.face3d = [[0, -1.126865, 7.475604], # 1
+                       [-4.445859, 2.663991, 3.173422], # 33
+                       [-2.456206,	-4.342621, 4.283884], # 61
+                       [0, -9.403378, 4.264492], # 199
+                       [4.445859, 2.663991, 3.173422], # 263
+                       [2.456206, -4.342621, 4.283884]] # 291
         # self.calculate_pose()
         # offset values
         # self.pose['yaw'] = [val - self.pose['yaw'][0] for val in self.pose['yaw']]
         # self.pose['pitch'] = [val - self.pose['pitch'][0] for val in self.pose['pitch']]
         # self.pose['roll'] = [val - self.pose['roll'][0] for val in self.pose['roll']]
-        timestamp = datetime.now().strftime("%H:%M:%S")
-        print('-'*120)
-        print('{:<100} {:>19}'.format(f'MediaPipe object complete!', timestamp))
-        print('-'*120)
     
-    def run(self):
+    def stream(self, video=None):
         """Runs through MediaPipe tracking process, calling relevant
-        functions
+        functions and yielding the results of each tracked frame
         
         More information found here:
 
         https://github.com/google/mediapipe/blob/master/docs/solutions/face_mesh.md
+
+        Parameters
+        ----------
+        video : Video, optional
+            video to track instead of the current one (default None,
+            current video)
+
+        Yields
+        ------
+        dict
+            dict of the face2d and pose values of a tracked frame
         """
+        self._reset(video if video is not None else self.video)
+        timestamp = datetime.now().strftime("%H:%M:%S")
+        print('-'*120)
+        print('{:<100} {:>19}'.format(f'Running MediaPipe object on video {self.video.filename}:', timestamp))
+        print('-'*120)
+        print(self.video)
+        if self.shards > 1:
+            yield from self._stream_sharded()
+            return
         print('Running MediaPipe Face Mesh on selected video...')
-        self.face3d = [[0, -1.126865, 7.475604], # 1
-                       [-4.445859, 2.663991, 3.173422], # 33
-                       [-2.456206,	-4.342621, 4.283884], # 61
-                       [0, -9.403378, 4.264492], # 199
-                       [4.445859, 2.663991, 3.173422], # 263
-                       [2.456206, -4.342621, 4.283884]] # 291
+        self._start()
         
-        progress_bar = tqdm(range(self.video.total_frames))
-        out = cv2.VideoWriter('tracking.mp4',
-                              cv2.VideoWriter_fourcc(*'mp4v'),
-                              self.video.fps,
-                              (self.video.width,self.video.height))
+        first, start, stop = self._frame_range()
+        progress_bar = self._progress_bar()
+        out = self._writer('tracking.mp4')
         # self.video.create_writer('tracking.mp4')
-        self.video.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
-        while True:
-            success, img = self.video.cap.read()
-            if success:
+        frames = self._frames(self._detect, self._solve)
+        try:
+            for idx, img, faces in frames:
                 progress_bar.update(1)
-                self.find_faces(img)
-                if self.show == True:
-                    cv2.namedWindow("EdiHeadyTrack", cv2.WINDOW_NORMAL)
-                    cv2.resizeWindow("EdiHeadyTrack", int(self.video.width/2), int(self.video.height/2))
-                    cv2.imshow("EdiHeadyTrack", img)
+                if idx < start:
+                    # warm-up frame before the start of a shard
+                    continue
+                self._record(idx, img, faces)
+                if faces:
+                    yield self._row(idx)
+                if self.headless:
+                    continue
                 out.write(img)
-                if cv2.waitKey(5) & 0xFF == ord('q'):
-                    # self.video.cap.release()
-                    out.release()
-                    cv2.destroyAllWindows()
-                    progress_bar.close()
+                if self._display(img):
                     print('Face tracking interuppted...')
-                    break     
+                    break
             else:
-                # self.video.cap.release()
-                out.release()
-                cv2.destroyAllWindows()
-                progress_bar.close()
                 print('Face tracking complete...')
-                break
+        finally:
+            frames.close()
+            # self.video.cap.release()
+            if out is not None:
+                out.release()
+            cv2.destroyAllWindows()
+            progress_bar.close()
+        timestamp = datetime.now().strftime("%H:%M:%S")
+        print('-'*120)
+        print('{:<100} {:>19}'.format(f'MediaPipe object complete!', timestamp))
+        print('-'*120)
 
-        return
+    # mediapipe, and the matplotlib its drawing utilities pull in, is only
+    # imported once a MediaPipe object first tracks or draws
+
+    @property
+    def mpDraw(self):
+        """module : MediaPipe drawing utilities"""
+        import mediapipe as mp
+        return mp.solutions.drawing_utils
+
+    @property
+    def mpDrawStyles(self):
+        """module : MediaPipe drawing styles"""
+        import mediapipe as mp
+        return mp.solutions.drawing_styles
+
+    @property
+    def mpFaceMesh(self):
+        """module : MediaPipe face mesh utilities"""
+        import mediapipe as mp
+        return mp.solutions.face_mesh
+
+    @property
+    def drawSpec(self):
+        """DrawingSpec : drawing specifications for face mesh"""
+        return self.mpDraw.DrawingSpec(thickness=1, circle_radius=2)
+
+    def _start(self):
+        '''
+        Build a new FaceMesh and pose solver, so that nothing is tracked
+        on from a previous run
+        '''
+        for face_mesh in (self.faceMesh, self._roi_mesh):
+            if face_mesh is not None:
+                face_mesh.close()
+        self.faceMesh = self.mpFaceMesh.FaceMesh(self.staticMode,
+                                                 self.maxFaces,
+                                                 self.refineLandmarks,
+                                                 self.minDetectionCon,
+                                                 self.minTrackCon)
+        self._window = None
+        self._roi_mesh = None
+        self._roi_mesh_window = None
+        self.pose_solver = PoseSolver(self.face3d, self.camera)
 
     def find_faces(self, img):
         """Finds faces in a supplied image
@@ -213,44 +681,142 @@ class MediaPipe(PoseDetector):
         img : ndarray
             ndarray representing the image in which faces should be found
         """
-        from .TDDFA_v2.utils.pose import viz_pose
-        imgRGB = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-        results = self.faceMesh.process(imgRGB)
-        frame_number = int(self.video.cap.get(cv2.CAP_PROP_POS_FRAMES))
-        time = frame_number / self.video.fps
-        # print(time)
-        if results.multi_face_landmarks:
-            self.face2d['time'].append(time)
-            self.pose['time'].append(time)
-            self.face2d['frame'].append(frame_number)
-            self.pose['frame'].append(frame_number)
-            landmark_positions=[]
-            key_landmark_positions=[]
-            for faceLandmarks in results.multi_face_landmarks:
-                self.mpDraw.draw_landmarks(img,
-                                           faceLandmarks,
-                                           self.mpFaceMesh.FACEMESH_TESSELATION,
-                                           None,
-                                           mp.solutions.drawing_styles
-                                           .get_default_face_mesh_tesselation_style())
-                
-                for idx, lm in enumerate(faceLandmarks.landmark):
-                    x = int(lm.x * self.video.width)
-                    y = int(lm.y * self.video.height)
+        if self.faceMesh is None:
+            self._start()
+        idx = int(self.video.cap.get(cv2.CAP_PROP_POS_FRAMES)) - 1
+        self._record(*self._solve(self._detect((idx, img))))
+        
+        return
 
-                    landmark_position = [x,y]
-                    landmark_positions.append(landmark_position)
-                    
-                    if idx in self.key_landmarks:
-                        if idx == 1:
-                            self.nose2d = (lm.x * self.video.width, lm.y * self.video.height)
-                            nose3d = (lm.x * self.video.width, lm.y * self.video.height, lm.z * 3000)
+    def _detect(self, item):
+        """Runs the FaceMesh network on a frame (inference stage)
 
-                        key_landmark_positions.append(landmark_position)
+        Parameters
+        ----------
+        item : tuple
+            frame index and ndarray representing the frame
+
+        Returns
+        -------
+        tuple
+            frame index, frame, FaceMesh results and list of landmark
+            positions in pixels of each face found
+        """
+        idx, img = item
+        # downscaled once, shared by the crop and the whole frame, with
+        # crops and landmarks in downscaled pixels until the end
+        if self.resolution is None:
+            frame, scale = img, None
+        else:
+            frame, scale = self.resolution.resize(img)
+        window = self._window
+        results = self._process(frame, window)
+        if window is not None and not results.multi_face_landmarks:
+            # face lost in the crop, look for it in the whole frame
+            window = None
+            results = self._process(frame, window)
+        whole = (0, 0, frame.shape[1], frame.shape[0])
+        if window is None:
+            window = whole
+        faces = []
+        for faceLandmarks in results.multi_face_landmarks or []:
+            # normalised landmark coordinates scaled to pixels in one go
+            landmarks = _landmark_xy(faceLandmarks)
+            landmarks *= window[2:]
+            landmarks += window[:2]
+            faces.append(landmarks)
+        if self.roi:
+            self._window = self._next_window(faces[0] if len(faces) == 1 else None, frame.shape)
+        if scale is not None:
+            for landmarks in faces:
+                landmarks /= scale
+        # landmarks are only drawn from results when it covers the whole frame
+        return idx, img, results if window == whole else None, faces
+
+    def _process(self, img, window):
+        '''
+        Run FaceMesh on the whole frame, or on a (x, y, width, height)
+        crop of it
+        '''
+        if window is None:
+            return self.faceMesh.process(cv2.cvtColor(img, cv2.COLOR_BGR2RGB))
+        # FaceMesh tracks in normalised image coordinates, so crops get a
+        # FaceMesh of their own, started again whenever the crop moves
+        if window != self._roi_mesh_window:
+            if self._roi_mesh is not None:
+                self._roi_mesh.close()
+            self._roi_mesh = self.mpFaceMesh.FaceMesh(self.staticMode,
+                                                      self.maxFaces,
+                                                      self.refineLandmarks,
+                                                      self.minDetectionCon,
+                                                      self.minTrackCon)
+            self._roi_mesh_window = window
+        x, y, w, h = window
+        return self._roi_mesh.process(cv2.cvtColor(img[y:y+h, x:x+w], cv2.COLOR_BGR2RGB))
+
+    def _next_window(self, landmarks, shape):
+        '''
+        Get the crop FaceMesh is run on in the next frame, which is kept
+        while the face stays well inside it so that FaceMesh can keep
+        tracking, and None to use the whole frame
+        '''
+        if landmarks is None:
+            return None
+        low, high = landmarks.min(axis=0), landmarks.max(axis=0)
+        size = (high - low).max()
+        window = self._window
+        if window is not None:
+            # keep the crop while a quarter of the margin is left around
+            # the face and the face has not shrunk to half the crop
+            x, y, w, h = window
+            inner = self.roi_margin * size / 4
+            if (np.all(low - inner >= (x, y)) and np.all(high + inner <= (x + w, y + h))
+                    and max(w, h) <= 2 * (1 + 2 * self.roi_margin) * size):
+                return window
+        low = np.maximum(np.floor(low - self.roi_margin * size), 0).astype(int)
+        high = np.minimum(np.ceil(high + self.roi_margin * size), (shape[1], shape[0])).astype(int)
+        if np.any(high - low < 2):
+            return None
+        return int(low[0]), int(low[1]), int(high[0] - low[0]), int(high[1] - low[1])
+
+    def _solve(self, item):
+        """Extracts landmark positions and solves the head pose for each
+        face found, drawing the face mesh onto the frame (pose solving stage)
+
+        Parameters
+        ----------
+        item : tuple
+            frame index, frame, FaceMesh results (None if FaceMesh was run
+            on a crop) and list of landmark positions of each face found
+
+        Returns
+        -------
+        tuple
+            frame index, annotated frame and list of dicts of face data
+        """
+        idx, img, results, found = item
+        faces = []
+        if not found:
+            # tracking lost, so the next pose is solved from scratch
+            self.pose_solver.reset()
+        else:
+            for face_idx, landmarks in enumerate(found):
+                if len(found) > 1:
+                    # the previous pose may belong to another face
+                    self.pose_solver.reset()
+                if not self.headless and results is not None:
+                    self.mpDraw.draw_landmarks(img,
+                                               results.multi_face_landmarks[face_idx],
+                                               self.mpFaceMesh.FACEMESH_TESSELATION,
+                                               None,
+                                               self.mpDrawStyles
+                                               .get_default_face_mesh_tesselation_style())
+                elif not self.headless:
+                    self._draw_mesh(img, landmarks.astype(np.int32))
+                self.nose2d = tuple(landmarks[1])
+                landmark_positions = landmarks.astype(np.int32)
+                key_landmark_positions = landmark_positions[self._key_landmark_indices]
 
-                self.face2d['all landmark positions'].append(landmark_positions)
-                self.face2d['key landmark positions'].append(key_landmark_positions)
-                
                 yaw, pitch, roll, p1, p2 = self.calculate_pose(key_landmark_positions)
                 
                 # if self.nose2d:
@@ -259,19 +825,48 @@ class MediaPipe(PoseDetector):
                 #     p2 = (int(nose2d[0] - yaw * 2), int(nose2d[1] - pitch * 2))
 
                 # cv2.line(img, p1, p2, (255,0,0), 3)
-                self.pose['yaw'].append(yaw)
-                self.pose['pitch'].append(pitch)
-                self.pose['roll'].append(roll)
-  
+                faces.append({'all landmark positions': landmark_positions,
+                              'key landmark positions': key_landmark_positions,
+                              'yaw': yaw,
+                              'pitch': pitch,
+                              'roll': roll})
 
                 # res, pose = viz_pose(res, param_lst, [key_landmark_positions]) 
                 # self.pose['yaw'].append(pose[0])
                 # self.pose['pitch'].append(pose[1])
                 # self.pose['roll'].append(pose[2])   
 
-                
+        return idx, img, faces
+
+    def _record(self, idx, img, faces):
+        """Stores the face data found in a frame, in frame order
+
+        Parameters
+        ----------
+        idx : int
+            index of the frame in the video
+        img : ndarray
+            ndarray representing the annotated frame
+        faces : list, dict
+            list of dicts of face data found in the frame
+        """
+        frame_number = self._frame_number(idx)
+        time = frame_number / self.video.fps
+        if faces:
+            # one row per frame, so only the first face found is recorded
+            face = faces[0]
+            self.face2d.add(idx, {'time': time,
+                                  'frame': frame_number,
+                                  'all landmark positions': face['all landmark positions'],
+                                  'key landmark positions': face['key landmark positions']})
+            self.pose.add(idx, {'time': time,
+                                'frame': frame_number,
+                                'yaw': face['yaw'],
+                                'pitch': face['pitch'],
+                                'roll': face['roll']})
         
-        self.tracking_frames.append(cv2.cvtColor(img, cv2.COLOR_BGR2RGB))
+        if not self.headless:
+            self.tracking_frames.add(idx, img)
         
         return
     
@@ -287,31 +882,9 @@ class MediaPipe(PoseDetector):
         #     self.pose['time'].append(time)
         #     self.pose['frame'].append(self.face2d['frame'][idx])
         #     face2d = self.face2d['key landmark positions'][idx]
-        face2d = np.array(face2d, dtype=np.float64)
-        face3d = np.array(self.face3d, dtype=np.float64)
-
-        success, rot_vec, trans_vec = cv2.solvePnP(face3d,
-                                                    face2d,
-                                                    self.camera.internal_matrix,
-                                                    self.camera.distortion_matrix,
-                                                    flags=cv2.SOLVEPNP_ITERATIVE)
-        
-        rmat = cv2.Rodrigues(rot_vec)[0]
-
-        P = np.hstack((rmat, np.zeros((3, 1), dtype=np.float64)))
-        # print(P)
-        eulerAngles =  cv2.decomposeProjectionMatrix(P)[6]
-        yaw = eulerAngles[1, 0]
-        pitch = eulerAngles[0, 0]
-        roll = eulerAngles[2,0]
-        
-        if pitch < 0:
-            pitch = - 180 - pitch
-        elif pitch >= 0: 
-            pitch = 180 - pitch
-        
-        yaw *= -1
-        pitch *= -1
+        # warm started from the pose in the previous frame
+        eulerAngles = self.pose_solver.solve(face2d)
+        yaw, pitch, roll = self._head_angles(eulerAngles)
         
         if self.nose2d:
             nose2d = self.nose2d
@@ -319,7 +892,83 @@ class MediaPipe(PoseDetector):
             p2 = (int(nose2d[0] - yaw * 2), int(nose2d[1] - pitch * 2))
         
         return yaw, pitch, roll, p1, p2
+
+    def solve_poses(self, camera=None, threads=1):
+        """Solves the head pose again in every tracked frame from the
+        stored key landmark positions, without running FaceMesh again
+
+        This allows the Camera to be calibrated after tracking.
+
+        Parameters
+        ----------
+        camera : Camera, optional
+            Camera object used to solve the poses (default the current Camera)
+        threads : int, optional
+            number of threads used for solving (default 1)
+
+        Returns
+        -------
+        self
+        """
+        if camera is not None:
+            self.camera = camera
+        self.rmats, eulerAngles = solve_poses(self.face2d['key landmark positions'],
+                                              self.face3d,
+                                              self.camera,
+                                              self.face2d['frame'],
+                                              threads)
+        self.pose['yaw'], self.pose['pitch'], self.pose['roll'] = self._head_angles(eulerAngles)
+
+        return self
+
+    @staticmethod
+    def _head_angles(eulerAngles):
+        '''
+        Convert Euler angles about the x, y and z axes into yaw, pitch
+        and roll, for one frame or an array of frames
+        '''
+        eulerAngles = np.asarray(eulerAngles)
+        yaw = eulerAngles[..., 1]
+        pitch = eulerAngles[..., 0]
+        roll = eulerAngles[..., 2]
+
+        pitch = np.where(pitch < 0, - 180 - pitch, 180 - pitch)[()]
+
+        yaw = yaw * -1
+        pitch = pitch * -1
+
+        return yaw, pitch, roll
     
+    def _frame_number(self, idx):
+        # frames are numbered from 1, matching the capture position after reading
+        return idx + 1
+
+    def _frame_index(self, frame_number):
+        return frame_number - 1
+
+    def _draw(self, img, face2d, pose):
+        if face2d is None:
+            return
+        self._draw_mesh(img, face2d['all landmark positions'].astype(np.int32))
+
+    def _draw_mesh(self, img, landmarks):
+        connections = np.array(list(self.mpFaceMesh.FACEMESH_TESSELATION))
+        tesselation_style = self.mpDrawStyles.get_default_face_mesh_tesselation_style()
+        cv2.polylines(img, list(landmarks[connections]), False,
+                      tesselation_style.color, tesselation_style.thickness)
+
+    def _shard_kwargs(self):
+        kwargs = super()._shard_kwargs()
+        kwargs.update({'staticMode': self.staticMode,
+                       'maxFaces': self.maxFaces,
+                       'refineLandmarks': self.refineLandmarks,
+                       'minDetectionCon': self.minDetectionCon,
+                       'minTrackCon': self.minTrackCon,
+                       'roi': self.roi,
+                       'roi_margin': self.roi_margin,
+                       'resolution': self.resolution})
+        return kwargs
+
     def __str__(self):
         return f'MediaPipe Face Detector with video {self.video.filename}'
     
@@ -333,21 +982,38 @@ class TDDFA_V2(PoseDetector):
     
     Attributes
     ----------
+    config : str
+        path to the 3DDFA_v2 model configuration file
     current_path : str
         string for tracking file path of 3DDFA source files, required
         due configuration of 3DDFA module.
-    tracking_frames : list, ndarray
-        list containing frames which have successfully been tracked
+    model_variant : str
+        'opt' or 'int8' variant of the ONNX models used, or None for the
+        exported models
+    params : Results
+        3DMM parameters and roi box of every tracked frame
+    resolution : Resolution
+        resolution frames are downscaled to before running FaceBoxes, or
+        None for FaceBoxes' own limit
+    scheduler : DetectionScheduler
+        scheduler deciding when the face is detected again while tracking
+    reconstruction : Reconstruction
+        lazy view reconstructing landmarks, meshes, angles and pose boxes
+        from params
+    tracking_frames : FrameStore
+        store holding frames which have successfully been tracked
         
     Methods
     -------
-    run(args)
-        run through the tracking procedure using 3DDFA_v2
-    run_smooth(args)
-        run through the tracking procedure using 3DDFA_v2 with smoothing
+    stream(video=None)
+        run through the tracking procedure using 3DDFA_v2, yielding the
+        results of each frame
     """
 
-    def __init__(self, video=Video(), camera=Camera(), show=True, smooth=False, dense=False):
+    def __init__(self, video=None, camera=None, show=True, smooth=False, dense=False, pipeline=False,
+                 shards=1, overlap=10, shard=None, headless=False, frame_store=None, session_options=None,
+                 fused_io=False, sparse_pose=False, scheduler=None, resolution=None, config=None,
+                 model_variant=None):
         """
         Parameters
         ----------
@@ -358,235 +1024,369 @@ class TDDFA_V2(PoseDetector):
         show : bool, optional
             flag for displaying video output (default True)
         smooth : bool
-            flag for using smooth tracking by looking n frames ahead (default False)
+            flag for smooth tracking by looking n frames ahead, which is not
+            available for 3DDFA_v2 and raises a ValueError if set (default False)
         dense : bool
             flag for using dense facial landmark model with 38,365 landmarks (default False, with 68 landmarks)
+        pipeline : bool, optional
+            flag for running decoding, inference, pose solving and encoding
+            as separate threaded stages (default False)
+        shards : int, optional
+            number of worker processes the video is split between (default 1)
+        overlap : int, optional
+            number of warm-up frames decoded before each shard (default 10)
+        shard : tuple, optional
+            (start, stop, overlap) frame range processed by a sharded worker
+            (default None, whole video)
+        headless : bool, optional
+            flag for analysis-only tracking without drawing, display or
+            video writing (default False)
+        frame_store : FrameStore, optional
+            store the tracked frames are kept in (default FrameStore(),
+            which keeps no frames)
+        session_options : dict, optional
+            onnxruntime session settings shared by all 3DDFA_v2 models, e.g.
+            {'intra_op_num_threads': 2}, see TDDFA_v2/utils/session.py
+            (default None, onnxruntime defaults)
+        fused_io : bool, optional
+            flag for using models exported with the input normalization and
+            parameter de-standardization inside the graph, which take raw
+            uint8 images (default False)
+        sparse_pose : bool, optional
+            flag for using the model exported with the sparse landmark
+            reconstruction and pose calculation inside the graph, giving the
+            landmarks and pose of a frame in one onnxruntime call (default False)
+        scheduler : DetectionScheduler, optional
+            scheduler deciding when the face is detected again while
+            tracking (default DetectionScheduler(), which detects the face
+            again in the whole frame once its region of interest collapses;
+            HealthScheduler also checks the fit and searches near the last
+            face)
+        resolution : Resolution, optional
+            resolution frames are downscaled to before running FaceBoxes,
+            with boxes given in full resolution pixels (default None,
+            FaceBoxes' own limit of 720 x 1080)
+        config : str, optional
+            path to the 3DDFA_v2 model configuration file (default
+            TDDFA_v2/configs/mb1_120x120.yml)
+        model_variant : str, optional
+            'opt' for the ONNX models with their graphs optimized offline,
+            or 'int8' for the models quantized to uint8, built on first use
+            and cached, see TDDFA_v2/utils/model_cache.py (default None,
+            the exported models)
         
         """
-        super().__init__(video, camera, show)
-        timestamp = datetime.now().strftime("%H:%M:%S")
-        print('-'*120)
-        print('{:<100} {:>19}'.format(f'Creating TDDFA_v2 object for video {self.video.filename}:', timestamp))
-        print('-'*120)
-        print(self.video)
-        import argparse
-        import os.path as osp
-        parser = argparse.ArgumentParser(description='The demo of video of 3DDFA_V2')
-        self.current_path = osp.dirname(osp.abspath(__file__))
-
-        # Dummy arguments to avoid ipykernel errors
-        # parser.add_argument(
-        #     "-i", "--ip", help="a dummy argument to fool ipython", default="1")
-        # parser.add_argument(
-        #     "-s", "--stdin", help="a dummy argument to fool ipython", default="1")
-        # parser.add_argument(
-        #     "-c", "--control", help="a dummy argument to fool ipython", default="1")
-        # parser.add_argument(
-        #     "-b", "--hb", help="a dummy argument to fool ipython", default="1")
-        # parser.add_argument(
-        #     "-K", "--Session.key", help="a dummy argument to fool ipython", default="1")
-        # parser.add_argument(
-        #     "-S", "--Session.signature_scheme", help="a dummy argument to fool ipython", default="1")
-        # parser.add_argument(
-        #     "-l", "--shell", help="a dummy argument to fool ipython", default="1")
-        # parser.add_argument(
-        #     "-t", "--transport", help="a dummy argument to fool ipython", default="1")
-        # parser.add_argument(
-        #     "-o", "--iopub", help="a dummy argument to fool ipython", default="1")
-        
-        # Actual arguments
-        parser.add_argument('-c', '--config', type=str, default=f'{self.current_path}/TDDFA_v2/configs/mb1_120x120.yml')
-        parser.add_argument('-f', '--video_fp', type=str, default=self.video.filename)
-        parser.add_argument('-m', '--mode', default='cpu', type=str, help='gpu or cpu mode')
-        if dense:
-            parser.add_argument('-o', '--opt', type=str, default='dense', choices=['sparse', 'dense'])
-        else:
-            parser.add_argument('-o', '--opt', type=str, default='sparse', choices=['sparse', 'dense'])
-        parser.add_argument('--onnx', action='store_true', default=False)
         if smooth:
-            parser.add_argument('-n_pre', default=5, type=int, help='the pre frames of smoothing')
-            parser.add_argument('-n_next', default=5, type=int, help='the next frames of smoothing')
-            parser.add_argument('-s', '--start', default=-1, type=int, help='the started frames')
-            parser.add_argument('-e', '--end', default=-1, type=int, help='the end frame')
-            args = parser.parse_args(args=[])
-            print(args)
-            self.run_smooth(args)
-        else:
-            args = parser.parse_args(args=[])
-            self.run(args)
+            raise ValueError('Smooth tracking is not available for TDDFA_v2')
+        super().__init__(video, camera, show, pipeline, shards, overlap, shard, headless, frame_store)
+        self.smooth = smooth
+        self.dense = dense
+        self.session_options = session_options
+        self.fused_io = fused_io
+        self.sparse_pose = sparse_pose
+        self.scheduler = scheduler if scheduler is not None else DetectionScheduler()
+        self.resolution = resolution
+        self.opt = 'dense' if dense else 'sparse'
+        self.current_path = osp.dirname(osp.abspath(__file__))
+        self.config = config if config is not None else f'{self.current_path}/TDDFA_v2/configs/mb1_120x120.yml'
+        self.model_variant = model_variant
 
-        timestamp = datetime.now().strftime("%H:%M:%S")
-        print('-'*120)
-        print('{:<100} {:>19}'.format(f'3DDFA_v2 object complete!', timestamp))
-        print('-'*120)
-        
-    
-    def run(self, args):
+    def stream(self, video=None):
         """Runs through 3DDFA_v2 tracking process, calling relevant
-        functions
+        functions and yielding the results of each tracked frame
         
         More information found here:
 
         https://github.com/cleardusk/3DDFA_V2
+
+        Parameters
+        ----------
+        video : Video, optional
+            video to track instead of the current one (default None,
+            current video)
+
+        Yields
+        ------
+        dict
+            dict of the face2d, pose and params values of a tracked frame
         """
+        self._reset(video if video is not None else self.video)
+        timestamp = datetime.now().strftime("%H:%M:%S")
+        print('-'*120)
+        print('{:<100} {:>19}'.format(f'Running TDDFA_v2 object on video {self.video.filename}:', timestamp))
+        print('-'*120)
+        print(self.video)
+        if self.shards > 1:
+            yield from self._stream_sharded()
+            return
         # import EdiHeadyTrack.TDDFA_v2 as TDDFA_v2
         # from .TDDFA_v2.FaceBoxes import FaceBoxes
         # from .TDDFA_v2.TDDFA import TDDFA
     
-        from .TDDFA_v2.utils.render import render
-        from .TDDFA_v2.utils.pose import viz_pose, plot_pose_box
         # from .TDDFA_v2.utils.newpose import estimate_head_pose
-        from .TDDFA_v2.utils.functions import cv_draw_landmark, get_suffix
-    
-        import os 
-        import imageio
-        from tqdm import tqdm
-        import yaml
-        import os
-        os.environ['KMP_DUPLICATE_LIB_OK'] = 'True'
-        os.environ['OMP_NUM_THREADS'] = '4'
 
-        from .TDDFA_v2.TDDFA_ONNX import TDDFA_ONNX
-        from .TDDFA_v2.FaceBoxes.FaceBoxes_ONNX import FaceBoxes_ONNX
+        # models are kept from one run to the next
+        if not hasattr(self, 'tddfa'):
+            self._build_models(self.config)
 
-        cfg = yaml.load(open(args.config), Loader=yaml.SafeLoader)
-        face_boxes = FaceBoxes_ONNX()
-        tddfa = TDDFA_ONNX(**cfg)
-
-        # Given a video path
-        fn = args.video_fp.split('/')[-1]
-        reader = imageio.get_reader(args.video_fp)
-        
-        fps = reader.get_meta_data()['fps']
-
-        suffix = get_suffix(args.video_fp)
         # video_wfp = f'{self.current_path}/TDDFA_v2/examples/results/videos/{fn.replace(suffix, "")}_{args.opt}.mp4'
         video_wfp = f'TDDFA_tracking.mp4'
         # writer = imageio.get_writer(video_wfp, fps=fps)
-        writer = cv2.VideoWriter(video_wfp,
-                              cv2.VideoWriter_fourcc(*'mp4v'),
-                              self.video.fps,
-                              (self.video.width,self.video.height))
+        writer = self._writer(video_wfp)
     
 
         # run
-        dense_flag = args.opt in ('3d',)
-        pre_ver = None
+        if self.opt not in ('sparse', 'dense'):
+            raise ValueError(f'Unknown opt {self.opt}')
+        self.dense_flag = self.opt in ('3d',)
+        self.pre_ver = None
 
-        progress_bar = tqdm(range(self.video.total_frames))
+        first, start, stop = self._frame_range()
+        progress_bar = self._progress_bar()
         
-        self.video.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
-        while True:
-            i = int(self.video.cap.get(cv2.CAP_PROP_POS_FRAMES))
-            success, frame_bgr = self.video.cap.read()
-            if success:
+        frames = self._frames(self._track, self._solve)
+        try:
+            for i, res, landmark_positions, pose, param, roi_box in frames:
                 progress_bar.update(1)
-                if i == 0:
-                    # the first frame, detect face, here we only use the first face, you can change depending on your need
-                    boxes = face_boxes(frame_bgr)
-                    boxes = [boxes[0]]
-                    param_lst, roi_box_lst = tddfa(frame_bgr, boxes)
-
-                    camera_frame_1 = param_lst[:12]
-
-                    ver = tddfa.recon_vers(param_lst, roi_box_lst, dense_flag=dense_flag)[0]
-
-                    # refine
-                    param_lst, roi_box_lst = tddfa(frame_bgr, [ver], crop_policy='landmark')
-                    ver = tddfa.recon_vers(param_lst, roi_box_lst, dense_flag=dense_flag)[0]
-                else:
-                    param_lst, roi_box_lst = tddfa(frame_bgr, [pre_ver], crop_policy='landmark')
-
-                    roi_box = roi_box_lst[0]
-                    # todo: add confidence threshold to judge the tracking is failed
-                    if abs(roi_box[2] - roi_box[0]) * abs(roi_box[3] - roi_box[1]) < 2020:
-                        boxes = face_boxes(frame_bgr)
-                        boxes = [boxes[0]]
-                        param_lst, roi_box_lst = tddfa(frame_bgr, boxes)
-
-                    ver = tddfa.recon_vers(param_lst, roi_box_lst, dense_flag=dense_flag)[0]
-
-                pre_ver = ver  # for tracking
-                
+                if i < start:
+                    # warm-up frame before the start of a shard
+                    continue
+                self.params.add(i, {'frame': i,
+                                    'param': param,
+                                    'roi box': roi_box})
                 # Adding landmarks to face2d
-                self.face2d['frame'].append(i)
-                self.face2d['time'].append(i/self.video.fps)
-
-                # print(list(ver[:-1][0]))
-                x = list(ver[:-1][0])
-                y = list(ver[:-1][1])
-                top = [int(round(x[y.index(max(y))])), int(round(max(y)))]
-                bottom = [int(round(x[y.index(min(y))])), int(round(min(y)))]
-                left = [int(round(min(x))), int(round(y[x.index(min(x))]))]
-                right = [int(round(max(x))), int(round(y[x.index(max(x))]))]
-                landmark_positions = [top, bottom, left, right]
-                self.face2d['all landmark positions'].append(landmark_positions)
-
-                # Calculate the Euler angles 
-                if args.opt == 'sparse':
-                    res = cv_draw_landmark(frame_bgr, ver)
-                    
-                    res, pose = viz_pose(res, param_lst, [ver]) 
-                    self.pose['frame'].append(i)
-                    self.pose['time'].append(i/self.video.fps)
+                self.face2d.add(i, {'frame': i,
+                                    'time': i/self.video.fps,
+                                    'all landmark positions': landmark_positions})
+
+                if self.opt == 'sparse':
                     # Calculate the Euler angles
-                    self.pose['yaw'].append(pose[0])
-                    self.pose['pitch'].append(pose[1]*-1) 
-                    self.pose['roll'].append(pose[2])
-                    
-                    # Display the pose on the frame
-                    if self.show == True:
-                        cv2.namedWindow("EdiHeadyTrack", cv2.WINDOW_NORMAL)
-                        cv2.resizeWindow("EdiHeadyTrack", int(self.video.width/2), int(self.video.height/2))
-                        cv2.imshow('EdiHeadyTrack', res)
+                    self.pose.add(i, {'frame': i,
+                                      'time': i/self.video.fps,
+                                      'yaw': pose[0],
+                                      'pitch': pose[1]*-1,
+                                      'roll': pose[2]})
+                yield self._row(i)
+
+                if self.opt == 'sparse':
+                    if self.headless:
+                        continue
                     
                     # Write the frame to the video
                     writer.write(res)
-                    self.tracking_frames.append(cv2.cvtColor(res, cv2.COLOR_BGR2RGB))
+                    self.tracking_frames.add(i, res)
                     
-                    # Break if 'q' is pressed
-                    if cv2.waitKey(5) & 0xFF == ord('q'):
-                        # self.video.cap.release()
-                        writer.release()
-                        cv2.destroyAllWindows()
-                        progress_bar.close()
+                    # Display the pose on the frame, break if 'q' is pressed
+                    if self._display(res):
                         print('Face tracking interrupted...')
                         break
-                elif args.opt == 'dense':
-                    print([ver])
-                    res = render(frame_bgr, [ver], tddfa.tri)
-                    # res = cv_draw_landmark(frame_bgr, ver)
-                    # res, pose = viz_pose(res, param_lst, [ver]) 
-                    # self.pose['frame'].append(i)
-                    # self.pose['time'].append(i/self.video.fps)
-                    # self.pose['yaw'].append(pose[0])
-                    # self.pose['pitch'].append(pose[1])
-                    # self.pose['roll'].append(pose[2])   
-                    # if self.show == True:
-                    #     cv2.namedWindow("EdiHeadyTrack", cv2.WINDOW_NORMAL)
-                    #     cv2.resizeWindow("EdiHeadyTrack", int(self.video.width/2), int(self.video.height/2))
-                    #     cv2.imshow('EdiHeadyTrack', res)
-                    # writer.write(res)
-                
-                    # self.tracking_frames.append(cv2.cvtColor(res, cv2.COLOR_BGR2RGB))
-                    
-                
-                    # if cv2.waitKey(5) & 0xFF == ord('q'):
-                    #     # self.video.cap.release()
-                    #     writer.release()
-                    #     cv2.destroyAllWindows()
-                    #     progress_bar.close()
-                    #     print('Face tracking interrupted...')
-                    #     break
-                else:
-                    raise ValueError(f'Unknown opt {args.opt}')
-                
             else:
-                # self.video.cap.release()
-                writer.release()
-                cv2.destroyAllWindows()
-                progress_bar.close()
                 print('Face tracking complete...')
-                break
+        finally:
+            frames.close()
+            # self.video.cap.release()
+            if writer is not None:
+                writer.release()
+            cv2.destroyAllWindows()
+            progress_bar.close()
         
-        print(f'Dump to {video_wfp}')
\ No newline at end of file
+        if writer is not None:
+            print(f'Dump to {video_wfp}')
+        timestamp = datetime.now().strftime("%H:%M:%S")
+        print('-'*120)
+        print('{:<100} {:>19}'.format(f'3DDFA_v2 object complete!', timestamp))
+        print('-'*120)
+
+    def _reset(self, video):
+        super()._reset(video)
+        # only the 62 parameters and roi box of each frame are kept, from
+        # which everything else can be reconstructed
+        self.params = Results({'frame': np.int64,
+                               'param': np.float32,
+                               'roi box': np.float32}, getattr(video, 'total_frames', 0))
+        self._reconstruction = None
+
+    @property
+    def reconstruction(self):
+        """Reconstruction : lazy view of the 3DMM reconstruction of every
+        tracked frame"""
+        if self._reconstruction is None:
+            if not hasattr(self, 'tddfa'):
+                # sharded runs only build the models in the workers
+                self._build_models(self.config)
+            self._reconstruction = Reconstruction(self.params, self.tddfa)
+        return self._reconstruction
+
+    def _build_models(self, config=None):
+        '''
+        Build the FaceBoxes face detector and the 3DDFA_v2 model
+        '''
+        import os
+        import yaml
+        os.environ['KMP_DUPLICATE_LIB_OK'] = 'True'
+
+        from .TDDFA_v2.TDDFA_ONNX import TDDFA_ONNX
+        from .TDDFA_v2.FaceBoxes.FaceBoxes_ONNX import FaceBoxes_ONNX
+
+        if config is None:
+            config = f'{self.current_path}/TDDFA_v2/configs/mb1_120x120.yml'
+        with open(config) as f:
+            cfg = yaml.load(f, Loader=yaml.SafeLoader)
+        self.face_boxes = FaceBoxes_ONNX(session_options=self.session_options, fused_io=self.fused_io,
+                                         variant=self.model_variant)
+        self.tddfa = TDDFA_ONNX(session_options=self.session_options, fused_io=self.fused_io,
+                                sparse_pose=self.sparse_pose, variant=self.model_variant, **cfg)
+
+    def _draw(self, img, face2d, pose):
+        super()._draw(img, face2d, pose)
+        if pose is not None:
+            yaw, pitch, roll = pose['yaw'], pose['pitch'], pose['roll']
+            cv2.putText(img, f'yaw: {yaw:.1f}, pitch: {pitch:.1f}, roll: {roll:.1f}', (20, 40),
+                        cv2.FONT_HERSHEY_DUPLEX, 1, (40, 255, 0), 2)
+
+    def _results(self):
+        return super()._results() + (self.params,)
+
+    def _shard_kwargs(self):
+        kwargs = super()._shard_kwargs()
+        kwargs.update({'smooth': self.smooth,
+                       'dense': self.dense,
+                       'session_options': self.session_options,
+                       'fused_io': self.fused_io,
+                       'sparse_pose': self.sparse_pose,
+                       'scheduler': self.scheduler,
+                       'resolution': self.resolution,
+                       'config': self.config,
+                       'model_variant': self.model_variant})
+        return kwargs
+
+    def _track(self, item):
+        """Regresses the 3DMM parameters for a frame, tracking the face
+        from the previous frame's landmarks (inference stage)
+
+        Parameters
+        ----------
+        item : tuple
+            frame index and ndarray representing the frame
+
+        Returns
+        -------
+        tuple
+            frame index, frame, parameter list, roi box list, vertices and
+            pose (None unless given by the sparse_pose model)
+        """
+        i, frame_bgr = item
+        detected = False
+        if self.pre_ver is None:
+            # the first frame, detect face, here we only use the first face, you can change depending on your need
+            self.scheduler.reset()
+            boxes = self._detect(frame_bgr)
+            boxes = [boxes[0]]
+            param_lst, roi_box_lst, ver, pose = self._regress_detection(frame_bgr, boxes)
+            detected = True
+        else:
+            param_lst, roi_box_lst, ver, pose = self._regress(frame_bgr, [self.pre_ver], crop_policy='landmark')
+
+            if self.scheduler.needs_detection(i, roi_box_lst[0], ver):
+                # look around the last known face first, then the whole frame
+                window = self.scheduler.search_window(frame_bgr.shape)
+                boxes = self._detect(frame_bgr, window)
+                if not boxes and window is not None:
+                    boxes = self._detect(frame_bgr)
+                if boxes:
+                    param_lst, roi_box_lst, ver, pose = self._regress_detection(frame_bgr, [boxes[0]])
+                    detected = True
+
+        self.scheduler.update(i, roi_box_lst[0], detected)
+        self.pre_ver = ver  # for tracking
+        return i, frame_bgr, param_lst, roi_box_lst, ver, pose
+
+    def _detect(self, frame_bgr, window=None):
+        '''
+        Detect faces in the whole frame, or only inside a search window,
+        in which the face is expected at the size it was last tracked at
+        '''
+        x0, y0 = 0, 0
+        face_size = None
+        if window is not None:
+            x0, y0, x1, y1 = window
+            frame_bgr = frame_bgr[y0:y1, x0:x1]
+            if self.scheduler.roi_box is not None:
+                face_size = self.scheduler.roi_box[2] - self.scheduler.roi_box[0]
+        scale = None
+        if self.resolution is not None:
+            scale = self.resolution.scale(frame_bgr.shape, face_size)
+        boxes = self.face_boxes(frame_bgr, scale=scale)
+        if window is None:
+            return boxes
+        return [[box[0] + x0, box[1] + y0, box[2] + x0, box[3] + y0, box[4]] for box in boxes]
+
+    def _regress_detection(self, frame_bgr, boxes):
+        '''
+        Regress the parameters of a detected face, refined by cropping
+        again around the landmarks found
+        '''
+        param_lst, roi_box_lst, ver, pose = self._regress(frame_bgr, boxes)
+        return self._regress(frame_bgr, [ver], crop_policy='landmark')
+
+    def _regress(self, frame_bgr, objs, **kvs):
+        '''
+        Regress the parameters of a face and reconstruct its vertices,
+        and its pose when the sparse_pose model is used
+        '''
+        if self.tddfa.sparse_pose and not self.dense_flag:
+            param_lst, roi_box_lst, ver_lst, pose_lst = self.tddfa.sparse(frame_bgr, objs, **kvs)
+            return param_lst, roi_box_lst, ver_lst[0], pose_lst[0]
+        param_lst, roi_box_lst = self.tddfa(frame_bgr, objs, **kvs)
+        ver = self.tddfa.recon_vers(param_lst, roi_box_lst, dense_flag=self.dense_flag)[0]
+        return param_lst, roi_box_lst, ver, None
+
+    def _solve(self, item):
+        """Finds the extreme landmark positions and head pose for a
+        tracked frame, drawing them onto the frame (pose solving stage)
+
+        Parameters
+        ----------
+        item : tuple
+            frame index, frame, parameter list, roi box list, vertices and
+            pose (or None)
+
+        Returns
+        -------
+        tuple
+            frame index, annotated frame, extreme landmark positions, pose,
+            parameters and roi box
+        """
+        from .TDDFA_v2.utils.render import render
+        from .TDDFA_v2.utils.pose import viz_pose, calc_pose
+        from .TDDFA_v2.utils.functions import cv_draw_landmark
+
+        i, frame_bgr, param_lst, roi_box_lst, ver, pose = item
+
+        # print(list(ver[:-1][0]))
+        x = list(ver[:-1][0])
+        y = list(ver[:-1][1])
+        top = [int(round(x[y.index(max(y))])), int(round(max(y)))]
+        bottom = [int(round(x[y.index(min(y))])), int(round(min(y)))]
+        left = [int(round(min(x))), int(round(y[x.index(min(x))]))]
+        right = [int(round(max(x))), int(round(y[x.index(max(x))]))]
+        landmark_positions = [top, bottom, left, right]
+
+        # Calculate the Euler angles 
+        if self.headless:
+            res = None
+            if self.opt != 'sparse':
+                pose = None
+            elif pose is None:
+                pose = calc_pose(param_lst[-1])[1]
+        elif self.opt == 'sparse':
+            res = cv_draw_landmark(frame_bgr, ver)
+            res, pose = viz_pose(res, param_lst, [ver]) 
+        else:
+            print([ver])
+            res = render(frame_bgr, [ver], self.tddfa.tri)
+            pose = None
+            # res = cv_draw_landmark(frame_bgr, ver)
+            # res, pose = viz_pose(res, param_lst, [ver]) 
+
+        return i, res, landmark_positions, pose, param_lst[0], roi_box_lst[0][:4]
@@ -0,0 +1,256 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+
+class PoseSolver:
+    """
+    A class representing a Perspective-n-Point head pose solver, which
+    starts each solve from the pose found in the previous frame
+
+    Consecutive frames of high frame rate video have almost identical
+    poses, so the iterative solve converges in far fewer steps from the
+    previous pose than from scratch. A cold solve is used for the first
+    frame, after reset() (e.g. when tracking is lost) and whenever a
+    warm-started solve fails.
+
+    ...
+
+    Attributes
+    ----------
+    distortion_matrix : ndarray
+        array representing the Camera's lens distortion parameters
+    face3d : ndarray
+        array of known 3d face points (from mesh model)
+    internal_matrix : ndarray
+        array representing the Camera's intrinsic parameters
+    rot_vec : ndarray
+        rotation vector found in the previous frame, or None
+    trans_vec : ndarray
+        translation vector found in the previous frame, or None
+
+    Methods
+    -------
+    solve(face2d)
+        finds the Euler angles of the head from detected 2d face points
+    solve_rotation(face2d)
+        finds the rotation vector of the head from detected 2d face points
+    reset()
+        forgets the previous pose so the next solve starts cold
+    """
+    def __init__(self, face3d, camera):
+        """
+        Parameters
+        ----------
+        face3d : list
+            list of known 3d face points (from mesh model)
+        camera : Camera
+            Camera object the face points were recorded with
+        """
+        self.face3d = np.ascontiguousarray(face3d, dtype=np.float64)
+        self.internal_matrix = np.ascontiguousarray(camera.internal_matrix, dtype=np.float64)
+        self.distortion_matrix = np.ascontiguousarray(camera.distortion_matrix, dtype=np.float64)
+        self.reset()
+
+    def solve(self, face2d):
+        """Finds the Euler angles of the head from detected 2d face points
+
+        Parameters
+        ----------
+        face2d : ndarray
+            array of detected 2d face points, in the order of face3d
+
+        Returns
+        -------
+        ndarray
+            Euler angles about the x, y and z axes in degrees, as given
+            by cv2.decomposeProjectionMatrix
+        """
+        # Euler angles straight from the rotation matrix, as found by
+        # cv2.decomposeProjectionMatrix for a projection matrix [R|0]
+        rmat = cv2.Rodrigues(self.solve_rotation(face2d))[0]
+        return np.array(cv2.RQDecomp3x3(rmat)[0])
+
+    def solve_rotation(self, face2d):
+        """Finds the rotation vector of the head from detected 2d face points
+
+        Parameters
+        ----------
+        face2d : ndarray
+            array of detected 2d face points, in the order of face3d
+
+        Returns
+        -------
+        ndarray
+            rotation vector of the head, shape (3, 1)
+        """
+        face2d = np.ascontiguousarray(face2d, dtype=np.float64)
+        if self.rot_vec is None or not self._solve(face2d, warm=True):
+            self._solve(face2d, warm=False)
+        return self.rot_vec
+
+    def reset(self):
+        """Forgets the previous pose so the next solve starts cold
+        """
+        self.rot_vec = None
+        self.trans_vec = None
+
+    def _solve(self, face2d, warm):
+        '''
+        Run the iterative PnP solve, returning True if a usable pose
+        was found
+        '''
+        if warm:
+            success, rot_vec, trans_vec = cv2.solvePnP(self.face3d,
+                                                       face2d,
+                                                       self.internal_matrix,
+                                                       self.distortion_matrix,
+                                                       self.rot_vec.copy(),
+                                                       self.trans_vec.copy(),
+                                                       useExtrinsicGuess=True,
+                                                       flags=cv2.SOLVEPNP_ITERATIVE)
+        else:
+            success, rot_vec, trans_vec = cv2.solvePnP(self.face3d,
+                                                       face2d,
+                                                       self.internal_matrix,
+                                                       self.distortion_matrix,
+                                                       flags=cv2.SOLVEPNP_ITERATIVE)
+        # a warm start can run away to a pose behind the camera
+        usable = success and np.all(np.isfinite(rot_vec)) and trans_vec[2, 0] > 0
+        if usable or not warm:
+            self.rot_vec, self.trans_vec = rot_vec, trans_vec
+        return usable
+
+
+
+def solve_poses(face2d, face3d, camera, frames=None, threads=1):
+    """Solves the head pose in every frame from stored 2d face points
+    in one batched pass
+
+    Frames are split into contiguous chunks solved in separate threads,
+    warm starting from the previous frame within each chunk. Rotation
+    matrices and Euler angles are then found for all frames at once.
+
+    Parameters
+    ----------
+    face2d : ndarray
+        array of detected 2d face points, shape (frames, points, 2)
+    face3d : list
+        list of known 3d face points (from mesh model)
+    camera : Camera
+        Camera object the face points were recorded with
+    frames : ndarray, optional
+        frame number of each row, so warm starts are only carried
+        between consecutive frames (default consecutive)
+    threads : int, optional
+        number of threads used for solving (default 1)
+
+    Returns
+    -------
+    rmats : ndarray
+        rotation matrix of each frame, shape (frames, 3, 3)
+    eulerAngles : ndarray
+        Euler angles about the x, y and z axes in degrees, as given by
+        cv2.decomposeProjectionMatrix, shape (frames, 3)
+    """
+    face2d = np.asarray(face2d, dtype=np.float64)
+    restart = np.ones(len(face2d), dtype=bool)
+    if frames is not None:
+        restart[1:] = np.diff(frames) != 1
+    rot_vecs = np.zeros((len(face2d), 3))
+
+    def solve_chunk(rows):
+        solver = PoseSolver(face3d, camera)
+        for row in rows:
+            if restart[row]:
+                solver.reset()
+            rot_vecs[row] = solver.solve_rotation(face2d[row])[:, 0]
+
+    chunks = [rows for rows in np.array_split(np.arange(len(face2d)), threads) if len(rows)]
+    with ThreadPoolExecutor(threads) as pool:
+        list(pool.map(solve_chunk, chunks))
+
+    rmats = rodrigues(rot_vecs)
+    return rmats, euler_angles(rmats)
+
+
+def rodrigues(rot_vecs):
+    """Converts rotation vectors into rotation matrices, as cv2.Rodrigues
+
+    Parameters
+    ----------
+    rot_vecs : ndarray
+        array of rotation vectors, shape (..., 3)
+
+    Returns
+    -------
+    ndarray
+        array of rotation matrices, shape (..., 3, 3)
+    """
+    rot_vecs = np.asarray(rot_vecs, dtype=np.float64)
+    theta = np.linalg.norm(rot_vecs, axis=-1)[..., None, None]
+    axis = rot_vecs / np.maximum(theta[..., 0], np.finfo(np.float64).tiny)
+    cross = np.zeros(rot_vecs.shape[:-1] + (3, 3))
+    cross[..., 0, 1], cross[..., 0, 2] = -axis[..., 2], axis[..., 1]
+    cross[..., 1, 0], cross[..., 1, 2] = axis[..., 2], -axis[..., 0]
+    cross[..., 2, 0], cross[..., 2, 1] = -axis[..., 1], axis[..., 0]
+    outer = axis[..., :, None] * axis[..., None, :]
+    return (np.cos(theta) * np.eye(3) + (1 - np.cos(theta)) * outer
+            + np.sin(theta) * cross)
+
+
+def euler_angles(rmats):
+    """Finds the Euler angles of rotation matrices, following the
+    Givens rotations of cv2.RQDecomp3x3
+
+    Parameters
+    ----------
+    rmats : ndarray
+        array of rotation matrices, shape (..., 3, 3)
+
+    Returns
+    -------
+    ndarray
+        Euler angles about the x, y and z axes in degrees, shape (..., 3)
+    """
+    rmats = np.asarray(rmats, dtype=np.float64)
+    eps = np.finfo(np.float64).eps
+
+    def givens(s, c):
+        norm = 1. / np.sqrt(c * c + s * s + eps)
+        return s * norm, c * norm
+
+    # rotation about x zeroing element (2, 1)
+    s_x, c_x = givens(rmats[..., 2, 1], rmats[..., 2, 2])
+    m = rmats.copy()
+    m[..., :, 1] = rmats[..., :, 1] * c_x[..., None] - rmats[..., :, 2] * s_x[..., None]
+    m[..., :, 2] = rmats[..., :, 1] * s_x[..., None] + rmats[..., :, 2] * c_x[..., None]
+
+    # rotation about y zeroing element (2, 0)
+    s_y, c_y = givens(-m[..., 2, 0], m[..., 2, 2])
+    n = m.copy()
+    n[..., :, 0] = m[..., :, 0] * c_y[..., None] + m[..., :, 2] * s_y[..., None]
+    n[..., :, 2] = m[..., :, 2] * c_y[..., None] - m[..., :, 0] * s_y[..., None]
+
+    # rotation about z zeroing element (1, 0)
+    s_z, c_z = givens(n[..., 1, 0], n[..., 1, 1])
+    r_00 = n[..., 0, 0] * c_z - n[..., 0, 1] * s_z
+    r_11 = n[..., 1, 0] * s_z + n[..., 1, 1] * c_z
+
+    # keep the first two diagonal entries of the triangular factor
+    # positive, turning the rotations by 180 degrees where needed
+    flip_z = (r_00 < 0) & (r_11 < 0)
+    flip_y = (r_00 < 0) & (r_11 >= 0)
+    flip_x = (r_00 >= 0) & (r_11 < 0)
+    c_z = np.where(flip_z, -c_z, c_z)
+    s_z = np.where(flip_z | flip_y | flip_x, -s_z, s_z)
+    c_y = np.where(flip_y, -c_y, c_y)
+    s_y = np.where(flip_y | flip_x, -s_y, s_y)
+    c_x = np.where(flip_x, -c_x, c_x)
+    s_x = np.where(flip_x, -s_x, s_x)
+
+    x = np.degrees(np.arccos(np.clip(c_x, -1, 1))) * np.where(s_x >= 0, 1, -1)
+    y = np.degrees(np.arccos(np.clip(c_y, -1, 1))) * np.where(s_y >= 0, 1, -1)
+    z = np.degrees(np.arccos(np.clip(c_z, -1, 1))) * np.where(s_z >= 0, 1, -1)
+    return np.stack([x, y, z], axis=-1)
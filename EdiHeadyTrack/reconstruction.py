@@ -0,0 +1,188 @@
+from functools import lru_cache
+
+import numpy as np
+
+
+class Reconstruction:
+    """
+    A class representing a lazy view of the 3DMM reconstruction of every
+    tracked frame, computed on demand from the stored parameters
+
+    Only the 62 parameters and the roi box of each frame are stored,
+    264 bytes per frame. Sparse landmarks and Euler angles are
+    reconstructed for the whole sequence at once on first use and kept,
+    while dense meshes are reconstructed frame by frame and only the
+    most recently used ones are kept.
+
+    ...
+
+    Attributes
+    ----------
+    cache_size : int
+        number of dense meshes kept in memory
+    model : TDDFA_ONNX
+        3DDFA_v2 model giving the BFM bases and triangles
+    params : Results
+        stored 'frame', 'param' and 'roi box' of every tracked frame
+
+    Methods
+    -------
+    vertices(frame_number=None)
+        gets the 68 sparse landmarks of a frame, or of every frame
+    mesh(frame_number)
+        gets the dense mesh vertices of a frame
+    angles(frame_number=None)
+        gets the yaw, pitch and roll of a frame, or of every frame
+    pose_box(frame_number)
+        gets the image points of the pose box of a frame
+    clear()
+        discards every cached reconstruction
+    """
+    def __init__(self, params, model, cache_size=32):
+        """
+        Parameters
+        ----------
+        params : Results
+            stored 'frame', 'param' and 'roi box' of every tracked frame
+        model : TDDFA_ONNX
+            3DDFA_v2 model giving the BFM bases and triangles
+        cache_size : int, optional
+            number of dense meshes kept in memory (default 32)
+        """
+        self.params = params
+        self.model = model
+        self.cache_size = cache_size
+        self.clear()
+
+    @property
+    def tri(self):
+        """ndarray : triangles of the dense mesh"""
+        return self.model.tri
+
+    def vertices(self, frame_number=None):
+        """Gets the 68 sparse landmarks of a frame, or of every frame
+
+        Parameters
+        ----------
+        frame_number : int, optional
+            frame number as recorded in the 'frame' column (default None,
+            every tracked frame)
+
+        Returns
+        -------
+        ndarray
+            landmark positions in pixels, shape (3, 68), or (frames, 3, 68)
+            for every frame
+        """
+        vertices = self._sequence('vertices')
+        if frame_number is None:
+            return vertices
+        return vertices[self._row(frame_number)]
+
+    def mesh(self, frame_number):
+        """Gets the dense mesh vertices of a frame
+
+        Parameters
+        ----------
+        frame_number : int
+            frame number as recorded in the 'frame' column
+
+        Returns
+        -------
+        ndarray
+            mesh vertices in pixels, shape (3, vertices)
+        """
+        self._row(frame_number)
+        self._refresh()
+        return self._mesh(frame_number)
+
+    def angles(self, frame_number=None):
+        """Gets the yaw, pitch and roll of a frame, or of every frame
+
+        Parameters
+        ----------
+        frame_number : int, optional
+            frame number as recorded in the 'frame' column (default None,
+            every tracked frame)
+
+        Returns
+        -------
+        ndarray
+            yaw, pitch and roll in degrees as given by 3DDFA_v2, shape (3,),
+            or (frames, 3) for every frame
+        """
+        angles = self._sequence('angles')
+        if frame_number is None:
+            return angles
+        return angles[self._row(frame_number)]
+
+    def pose_box(self, frame_number):
+        """Gets the image points of the pose box of a frame
+
+        Parameters
+        ----------
+        frame_number : int
+            frame number as recorded in the 'frame' column
+
+        Returns
+        -------
+        ndarray
+            pose box corners in pixels, shape (10, 2)
+        """
+        from .TDDFA_v2.utils.pose import calc_pose_box
+        row = self._row(frame_number)
+        return calc_pose_box(self._sequence('cameras')[row], self._sequence('vertices')[row])
+
+    def clear(self):
+        """Discards every cached reconstruction
+        """
+        self._cache = {}
+        self._cached_rows = None
+        self._mesh = lru_cache(self.cache_size)(self._reconstruct_mesh)
+
+    def _row(self, frame_number):
+        '''
+        Find the row of a frame, raising a KeyError if it was not tracked
+        '''
+        row = self.params.row(frame_number)
+        if row is None:
+            raise KeyError(f'Frame {frame_number} was not tracked')
+        return row
+
+    def _refresh(self):
+        '''
+        Discard every cached reconstruction once frames have been added
+        since the last call
+        '''
+        rows = len(self)
+        if self._cached_rows != rows:
+            self.clear()
+            self._cached_rows = rows
+
+    def _sequence(self, key):
+        '''
+        Reconstruct the landmarks, camera matrices and angles of every
+        frame, again only when frames have been added since the last call
+        '''
+        self._refresh()
+        if key not in self._cache:
+            if key == 'vertices':
+                self._cache[key] = self.model.recon_seq(self.params['param'], self.params['roi box'])
+            else:
+                from .TDDFA_v2.utils.pose import calc_pose_seq
+                self._cache['cameras'], self._cache['angles'] = calc_pose_seq(self.params['param'])
+        return self._cache[key]
+
+    def _reconstruct_mesh(self, frame_number):
+        '''
+        Reconstruct the dense mesh of a frame, cached by frame number so
+        that rows shifted by frames added before it are not mistaken
+        '''
+        idx = self.params.index(frame_number)
+        columns = self.params.columns
+        return self.model.recon_seq(columns['param'][idx:idx+1],
+                                    columns['roi box'][idx:idx+1],
+                                    dense_flag=True)[0]
+
+    def __len__(self):
+        return int(np.count_nonzero(self.params.valid))
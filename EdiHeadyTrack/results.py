@@ -0,0 +1,217 @@
+from collections.abc import Mapping
+
+import numpy as np
+
+
+class Results(Mapping):
+    """
+    A class representing columnar time histories of tracking results,
+    with one preallocated row for every frame of the video
+
+    Columns are read like the values of a dict and give a read-only
+    ndarray holding only the rows of frames which have been tracked. While
+    frames are tracked in order without gaps this is a view of the
+    column, otherwise the rows are gathered once and kept until the
+    results change. Columns of points, such as landmark positions, are
+    allocated on the first frame recorded, once the number of points is
+    known.
+
+    ...
+
+    Attributes
+    ----------
+    columns : dict, ndarray
+        dict of arrays holding every row of each column
+    dtypes : dict
+        dict of the dtype of each column
+    valid : ndarray, bool
+        mask of the rows holding a tracked frame
+
+    Methods
+    -------
+    add(idx, values)
+        records the values of a tracked frame
+    merge(other)
+        records every tracked frame of another Results object
+    row(frame_number)
+        gets the position of a frame among the tracked rows
+    index(frame_number)
+        gets the index of the row of a frame in the underlying columns
+    to_dict()
+        gets the tracked rows of each column as a dict of lists
+    """
+    def __init__(self, dtypes, capacity=0):
+        """
+        Parameters
+        ----------
+        dtypes : dict
+            dict of the dtype of each column, in column order
+        capacity : int, optional
+            number of rows to preallocate, normally the length of the
+            video in frames (default 0)
+        """
+        self.dtypes = dict(dtypes)
+        self.valid = np.zeros(capacity, dtype=bool)
+        self.columns = {key: None for key in self.dtypes}
+        # number of tracked rows, and one past the last of them
+        self._count = 0
+        self._end = 0
+        self._changed()
+
+    def add(self, idx, values):
+        """Records the values of a tracked frame
+
+        Parameters
+        ----------
+        idx : int
+            index of the frame in the video
+        values : dict
+            dict of the values of each column for this frame
+        """
+        if idx >= len(self.valid):
+            self._grow(max(idx + 1, 2 * len(self.valid)))
+        for key, value in values.items():
+            column = self.columns[key]
+            if column is None:
+                value = np.asarray(value, dtype=self.dtypes[key])
+                column = np.zeros((len(self.valid),) + value.shape, dtype=self.dtypes[key])
+                self.columns[key] = column
+            column[idx] = value
+        if not self.valid[idx]:
+            self.valid[idx] = True
+            self._count += 1
+            self._end = max(self._end, idx + 1)
+        self._changed()
+
+    def merge(self, other):
+        """Records every tracked frame of another Results object
+
+        Parameters
+        ----------
+        other : Results
+            Results object holding the same columns
+        """
+        rows = np.flatnonzero(other.valid)
+        if len(rows) == 0:
+            return
+        if rows[-1] >= len(self.valid):
+            self._grow(rows[-1] + 1)
+        for key, column in other.columns.items():
+            if column is None:
+                continue
+            if self.columns[key] is None:
+                self.columns[key] = np.zeros((len(self.valid),) + column.shape[1:], dtype=column.dtype)
+            self.columns[key][rows] = column[rows]
+        self.valid[rows] = True
+        self._count = int(np.count_nonzero(self.valid))
+        self._end = max(self._end, int(rows[-1]) + 1)
+        self._changed()
+
+    def row(self, frame_number):
+        """Gets the position of a frame among the tracked rows
+
+        Parameters
+        ----------
+        frame_number : int
+            frame number as recorded in the 'frame' column
+
+        Returns
+        -------
+        int
+            position of the frame in each column, or None if the frame
+            was not tracked
+        """
+        frames = self['frame']
+        if self._sorted is None:
+            self._sorted = bool(np.all(frames[1:] > frames[:-1]))
+        if self._sorted:
+            # frames are recorded in order, so the row is found by bisection
+            row = int(np.searchsorted(frames, frame_number))
+            if row < len(frames) and frames[row] == frame_number:
+                return row
+            return None
+        rows = np.flatnonzero(frames == frame_number)
+        if len(rows) == 0:
+            return None
+        return int(rows[0])
+
+    def index(self, frame_number):
+        """Gets the index of the row of a frame in the underlying columns
+
+        Parameters
+        ----------
+        frame_number : int
+            frame number as recorded in the 'frame' column
+
+        Returns
+        -------
+        int
+            index of the frame in each array of `columns`, or None if the
+            frame was not tracked
+        """
+        row = self.row(frame_number)
+        if row is None or self._count == self._end:
+            return row
+        if self._indices is None:
+            self._indices = np.flatnonzero(self.valid)
+        return int(self._indices[row])
+
+    def to_dict(self):
+        """Gets the tracked rows of each column as a dict of lists
+
+        Returns
+        -------
+        dict
+            dict of lists holding the tracked rows of each column
+        """
+        return {key: self[key].tolist() for key in self}
+
+    def _grow(self, capacity):
+        '''
+        Reallocate every column with room for a given number of rows
+        '''
+        valid = np.zeros(capacity, dtype=bool)
+        valid[:len(self.valid)] = self.valid
+        for key, column in self.columns.items():
+            if column is not None:
+                grown = np.zeros((capacity,) + column.shape[1:], dtype=column.dtype)
+                grown[:len(column)] = column
+                self.columns[key] = grown
+        self.valid = valid
+        self._changed()
+
+    def _changed(self):
+        '''
+        Drop the tracked rows kept from the columns once the results change
+        '''
+        self._tracked = {}
+        self._sorted = None
+        self._indices = None
+
+    def __getitem__(self, key):
+        tracked = self._tracked.get(key)
+        if tracked is not None:
+            return tracked
+        column = self.columns[key]
+        if column is None:
+            return np.empty(0, dtype=self.dtypes[key])
+        if self._count == self._end:
+            # every row up to the last tracked frame is tracked
+            tracked = column[:self._end]
+        else:
+            tracked = column[self.valid]
+        tracked.flags.writeable = False
+        self._tracked[key] = tracked
+        return tracked
+
+    def __setitem__(self, key, value):
+        if self.columns[key] is None:
+            self.columns[key] = np.zeros(len(self.valid), dtype=self.dtypes[key])
+        self.columns[key][self.valid] = value
+        self._changed()
+
+    def __iter__(self):
+        return iter(self.dtypes)
+
+    def __len__(self):
+        return len(self.dtypes)
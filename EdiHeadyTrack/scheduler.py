@@ -0,0 +1,270 @@
+import numpy as np
+
+
+class DetectionScheduler:
+    """
+    A class representing a scheduler deciding when a face tracker runs
+    its face detector again, which only does so once the tracked region
+    of interest has collapsed
+
+    Trackers follow the face from the landmarks of the previous frame
+    and ask the scheduler after every frame whether the face should be
+    detected again, and where in the frame to look for it.
+
+    ...
+
+    Attributes
+    ----------
+    detections : int
+        number of times the face detector has found the face while tracking
+    last_attempt : int
+        index of the frame the face detector was last run on, whether or
+        not it found the face, or None
+    last_detection : int
+        index of the frame the face was last detected in, or None
+    min_area : float
+        area of the region of interest in square pixels below which
+        tracking is taken to have failed
+    roi_box : ndarray
+        region of interest (x0, y0, x1, y1) tracked in the previous frame,
+        or None
+
+    Methods
+    -------
+    needs_detection(idx, roi_box, ver)
+        decides whether the face should be detected again
+    search_window(shape)
+        gets the part of the frame the face detector should search
+    update(idx, roi_box, detected=False)
+        records the region of interest the face was tracked to
+    reset()
+        forgets the tracked face, e.g. at the start of a video
+    """
+    def __init__(self, min_area=2020):
+        """
+        Parameters
+        ----------
+        min_area : float, optional
+            area of the region of interest in square pixels below which
+            tracking is taken to have failed (default 2020)
+        """
+        self.min_area = min_area
+        self.detections = 0
+        self.reset()
+
+    def needs_detection(self, idx, roi_box, ver):
+        """Decides whether the face should be detected again
+
+        Parameters
+        ----------
+        idx : int
+            index of the frame in the video
+        roi_box : list
+            region of interest (x0, y0, x1, y1) the face was tracked to
+        ver : ndarray
+            tracked landmark positions in pixels, shape (3, points)
+
+        Returns
+        -------
+        bool
+            True if the face detector should be run on this frame, which
+            is then recorded as an attempt
+        """
+        return self._attempt(idx, _area(roi_box) < self.min_area)
+
+    def search_window(self, shape):
+        """Gets the part of the frame the face detector should search
+
+        Parameters
+        ----------
+        shape : tuple
+            shape of the frame
+
+        Returns
+        -------
+        tuple
+            (x0, y0, x1, y1) window in pixels, or None for the whole frame
+        """
+        return None
+
+    def update(self, idx, roi_box, detected=False):
+        """Records the region of interest the face was tracked to
+
+        Parameters
+        ----------
+        idx : int
+            index of the frame in the video
+        roi_box : list
+            region of interest (x0, y0, x1, y1) the face was tracked to
+        detected : bool, optional
+            flag for a region of interest found by running the face
+            detector (default False)
+        """
+        self.roi_box = np.asarray(roi_box[:4], dtype=np.float64)
+        if detected:
+            self.detections += 1
+            self.last_attempt = idx
+            self.last_detection = idx
+
+    def reset(self):
+        """Forgets the tracked face, e.g. at the start of a video
+        """
+        self.roi_box = None
+        self.last_attempt = None
+        self.last_detection = None
+
+    def _attempt(self, idx, detect):
+        '''
+        Record that the face detector runs on a frame, so that a failed
+        detection is not retried on schedule every frame after it
+        '''
+        if detect:
+            self.last_attempt = idx
+        return detect
+
+
+class HealthScheduler(DetectionScheduler):
+    """
+    A class representing a scheduler which scores how well the face was
+    tracked in every frame, running the face detector again around the
+    last known face as soon as the fit degrades
+
+    Each frame is scored by the change of its region of interest since
+    the previous frame, the spread of its landmarks and the offset
+    between its region of interest and the one its own landmarks give
+    for cropping the next frame. The detector can also be run every
+    period frames since it was last run, regardless of the scores.
+
+    No landmarks independent of the 3DMM fit are available to measure a
+    reprojection residual against, so the offset stands in for one: a
+    fit which has slid off the face gives landmarks which no longer fill
+    the region they were regressed from. The default bounds were only
+    checked on the test clips, which never reach them, and are best
+    tuned on footage like the one being tracked before relying on them,
+    which is why DetectionScheduler remains the default of TDDFA_V2.
+
+    ...
+
+    Attributes
+    ----------
+    health : dict
+        scores of the last frame checked
+    margin : float
+        size of the search window either side of the previous region of
+        interest, as a fraction of its size
+    max_roi_offset : float
+        largest offset between the region of interest and the one given
+        by its landmarks, as a fraction of its size
+    max_roi_change : float
+        largest change of the region of interest between frames, as a
+        fraction of its size
+    max_spread : float
+        largest spread of the landmarks, as a fraction of the region of
+        interest size
+    min_spread : float
+        smallest spread of the landmarks, as a fraction of the region of
+        interest size
+    period : int
+        number of frames after the face detector was last run after which
+        it is always run again, or 0 to only run it when the fit degrades
+
+    Methods
+    -------
+    score(roi_box, ver)
+        scores how well the face was tracked in a frame
+    """
+    def __init__(self, min_area=2020, max_roi_change=0.3, min_spread=0.08, max_spread=0.35,
+                 max_roi_offset=0.15, period=0, margin=1.0):
+        """
+        Parameters
+        ----------
+        min_area : float, optional
+            area of the region of interest in square pixels below which
+            tracking is taken to have failed (default 2020)
+        max_roi_change : float, optional
+            largest change of the region of interest between frames, as a
+            fraction of its size (default 0.3)
+        min_spread : float, optional
+            smallest spread of the landmarks, as a fraction of the region
+            of interest size (default 0.08)
+        max_spread : float, optional
+            largest spread of the landmarks, as a fraction of the region
+            of interest size (default 0.35)
+        max_roi_offset : float, optional
+            largest offset between the region of interest and the one
+            given by its landmarks, as a fraction of its size (default 0.15)
+        period : int, optional
+            number of frames after the face detector was last run after
+            which it is always run again (default 0, only when the fit
+            degrades)
+        margin : float, optional
+            size of the search window either side of the previous region
+            of interest, as a fraction of its size (default 1.0)
+        """
+        super().__init__(min_area)
+        self.max_roi_change = max_roi_change
+        self.min_spread = min_spread
+        self.max_spread = max_spread
+        self.max_roi_offset = max_roi_offset
+        self.period = period
+        self.margin = margin
+        self.health = {}
+
+    def score(self, roi_box, ver):
+        """Scores how well the face was tracked in a frame
+
+        Parameters
+        ----------
+        roi_box : list
+            region of interest (x0, y0, x1, y1) the face was tracked to
+        ver : ndarray
+            tracked landmark positions in pixels, shape (3, points)
+
+        Returns
+        -------
+        dict
+            'area' of the region of interest in square pixels, and its
+            'roi change', the landmark 'spread' and the 'roi offset' as
+            fractions of its size
+        """
+        roi_box = np.asarray(roi_box[:4], dtype=np.float64)
+        size = max(roi_box[2] - roi_box[0], 1e-6)
+        if self.roi_box is None:
+            roi_change = 0.
+        else:
+            roi_change = np.abs(roi_box - self.roi_box).max() / size
+        # the region of interest the landmarks themselves give, as used
+        # to crop the next frame, see parse_roi_box_from_landmark
+        xy = np.asarray(ver)[:2]
+        low, high = xy.min(axis=1), xy.max(axis=1)
+        center, radius = (low + high) / 2, (high - low).max() / 2
+        refit = np.concatenate((center, center)) + np.sqrt(2) * radius * np.array([-1, -1, 1, 1])
+        return {'area': _area(roi_box),
+                'roi change': roi_change,
+                'spread': xy.std(axis=1).mean() / size,
+                'roi offset': np.abs(refit - roi_box).max() / size}
+
+    def needs_detection(self, idx, roi_box, ver):
+        self.health = self.score(roi_box, ver)
+        if self.period and (self.last_attempt is None or idx - self.last_attempt >= self.period):
+            return self._attempt(idx, True)
+        return self._attempt(idx, self.health['area'] < self.min_area
+                             or self.health['roi change'] > self.max_roi_change
+                             or not self.min_spread <= self.health['spread'] <= self.max_spread
+                             or self.health['roi offset'] > self.max_roi_offset)
+
+    def search_window(self, shape):
+        if self.roi_box is None:
+            return None
+        size = self.roi_box[2:] - self.roi_box[:2]
+        low = np.floor(self.roi_box[:2] - self.margin * size).astype(int)
+        high = np.ceil(self.roi_box[2:] + self.margin * size).astype(int)
+        x0, y0 = np.maximum(low, 0)
+        x1, y1 = np.minimum(high, (shape[1], shape[0]))
+        if x1 <= x0 or y1 <= y0:
+            return None
+        return int(x0), int(y0), int(x1), int(y1)
+
+
+def _area(roi_box):
+    return abs(roi_box[2] - roi_box[0]) * abs(roi_box[3] - roi_box[1])
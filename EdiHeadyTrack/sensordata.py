@@ -58,8 +58,8 @@ class Head(SensorData):
         Filter object used for data filtering
     id : str, int, float
         unique identifier given to Head
-    pose : dict
-        dict containing Head pose time history
+    pose : Results
+        Head pose time history, read like a dict
 
     Methods
     -------
@@ -72,7 +72,7 @@ class Head(SensorData):
     """
     _counter = 0
     
-    def __init__(self, posedetector=PoseDetector(), id=_counter):
+    def __init__(self, posedetector=None, id=_counter):
         """
         Parameters
         ----------
@@ -81,6 +81,8 @@ class Head(SensorData):
         id : str, int, float, optional
             unique identifier for each Head object (defaults to count of existing heads)
         """
+        if posedetector is None:
+            posedetector = PoseDetector()
         timestamp = datetime.now().strftime("%H:%M:%S")
         print('-'*120)
         print('{:<100} {:>19}'.format(f'Creating Head object for {posedetector}:', timestamp))
@@ -100,7 +102,7 @@ class Head(SensorData):
         print('{:<100} {:>19}'.format(f'Head object complete!', timestamp))
         print('-'*120)
 
-    def apply_filter(self, filter=Filter()):
+    def apply_filter(self, filter=None):
         """Applies filter to head pose data and updates pose 
         
         Parameters
@@ -113,13 +115,12 @@ class Head(SensorData):
         self
         """
         # print('Filtering data...')
-        self.filter = filter
-        data = pd.DataFrame.from_dict(self.posedetector.pose)
+        self.filter = filter if filter is not None else Filter()
         properties = ['yaw', 'pitch', 'roll']
         for property in properties:
-            signal = np.array(data[property])
+            signal = self.posedetector.pose[property]
             filtered_signal = self.filter.apply(signal)
-            self.posedetector.pose[property] = list(filtered_signal)
+            self.posedetector.pose[property] = filtered_signal
         
         self.calculate_kinematics()
         
@@ -135,9 +136,10 @@ class Head(SensorData):
         self.acceleration['frame'] = self.posedetector.pose['frame'][2:]
         self.acceleration['time'] = self.posedetector.pose['time'][2:]
 
+        dt = np.diff(self.posedetector.pose['time'])
         for key in list(self.posedetector.pose.keys())[2:]:
-            self.velocity[key] = np.diff(np.array(self.posedetector.pose[key])) / np.diff(np.array(self.posedetector.pose['time']))
-            self.acceleration[key] = np.diff(np.array(self.velocity[key])) / np.diff(np.array(self.velocity['time']))
+            self.velocity[key] = np.diff(self.posedetector.pose[key]) / dt
+            self.acceleration[key] = np.diff(self.velocity[key]) / dt[1:]
 
         return self
     
@@ -147,7 +149,7 @@ class Head(SensorData):
         data to cs
         """
         # Save pose data to CSV
-        pose_df = pd.DataFrame.from_dict(self.posedetector.pose)
+        pose_df = pd.DataFrame.from_dict(self.posedetector.pose.to_dict())
         pose_df.to_csv(f"resources/head_pose_{self.id}.csv", index=False)
 
         # Save velocity data to CSV
@@ -194,7 +196,7 @@ class IMU(SensorData):
         else:
             self.id = IMU._counter
 
-    def apply_filter(self, filter=Filter()):
+    def apply_filter(self, filter=None):
         """Applies filter to sensor data and updates
         
         Parameters
@@ -207,7 +209,7 @@ class IMU(SensorData):
         self
         """
         # print('Filtering data...')
-        self.filter = filter
+        self.filter = filter if filter is not None else Filter()
         data = pd.DataFrame.from_dict(self.velocity)
         # print(data)
         properties = ['yaw', 'pitch', 'roll']
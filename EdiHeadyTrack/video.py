@@ -39,6 +39,8 @@ class Video:
     -------
     create_writer()
         creates video writer object
+    frames(start=0, stop=None)
+        yields frames from the video along with their frame index
     get_dim()
         gets video dimensions
     get_fps()
@@ -70,6 +72,33 @@ class Video:
                             self.fps,
                             (self.width, self.height))
  
+    def frames(self, start=0, stop=None):
+        '''
+        Yield frames from the video along with their frame index
+
+        Parameters
+        ----------
+        start : int, optional
+            index of the first frame to be read (default 0)
+        stop : int, optional
+            index of the frame to stop before (default end of video)
+
+        Yields
+        ------
+        idx : int
+            index of the frame in the video
+        frame : ndarray
+            ndarray representing the BGR frame
+        '''
+        self.cap.set(cv2.CAP_PROP_POS_FRAMES, start)
+        idx = start
+        while stop is None or idx < stop:
+            success, frame = self.cap.read()
+            if not success:
+                break
+            yield idx, frame
+            idx += 1
+
     def get_dim(self):
         '''
         Get video resolution
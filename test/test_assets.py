@@ -0,0 +1,53 @@
+import os
+import pickle
+import numpy as np
+import pytest
+from EdiHeadyTrack.TDDFA_v2.utils import assets
+from EdiHeadyTrack.TDDFA_v2.utils.io import _load
+
+@pytest.fixture
+def compiled_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(assets, 'compiled_dir', str(tmp_path / 'compiled'))
+    assets.clear_assets()
+    yield tmp_path / 'compiled'
+    assets.clear_assets()
+
+def test_load_bfm(compiled_dir):
+    bfm_fp = assets.make_abs_path('../configs/bfm_noneck_v3.pkl')
+    bfm = assets.load_bfm(bfm_fp, shape_dim=40, exp_dim=10)
+    assert (compiled_dir / 'bfm_noneck_v3_40_10' / 'sources.json').exists()
+
+    ref = _load(bfm_fp)
+    u = ref['u'].astype(np.float32)
+    w_shp = ref['w_shp'].astype(np.float32)[..., :40]
+    w_exp = ref['w_exp'].astype(np.float32)[..., :10]
+    keypoints = ref['keypoints'].astype(np.int64)
+    w = np.hstack((w_shp, w_exp))
+    expected = {
+        'u': u, 'w_shp': w_shp, 'w_exp': w_exp, 'w': w, 'keypoints': keypoints,
+        'tri': _load(assets.make_abs_path('../configs/tri.pkl')).T,
+        'w_norm': np.linalg.norm(w, axis=0),
+        'u_base': u[keypoints].reshape(-1, 1),
+        'w_shp_base': w_shp[keypoints], 'w_exp_base': w_exp[keypoints], 'w_base': w[keypoints],
+    }
+    assert sorted(bfm) == sorted(expected)
+    for key, arr in expected.items():
+        assert isinstance(bfm[key], np.memmap) and not bfm[key].flags.writeable
+        assert bfm[key].flags.c_contiguous
+        assert np.array_equal(bfm[key], arr), key
+    # shared by later loads
+    assert assets.load_bfm(bfm_fp, shape_dim=40, exp_dim=10) is bfm
+
+def test_recompile(compiled_dir, tmp_path):
+    fp = str(tmp_path / 'param_mean_std.pkl')
+    with open(fp, 'wb') as f:
+        pickle.dump({'mean': np.zeros(62, dtype=np.float32), 'std': np.ones(62, dtype=np.float32)}, f)
+    assert np.array_equal(assets.load_param_mean_std(fp)['mean'], np.zeros(62))
+    # replaced by a file with an older mtime, e.g. copied with cp -p
+    mtime = os.stat(fp).st_mtime_ns
+    with open(fp, 'wb') as f:
+        pickle.dump({'mean': np.ones(62, dtype=np.float32), 'std': np.ones(62, dtype=np.float32)}, f)
+    os.utime(fp, ns=(mtime - 10**9, mtime - 10**9))
+    assets.clear_assets()
+    assert np.array_equal(assets.load_param_mean_std(fp)['mean'], np.ones(62))
+    assert sorted(os.listdir(compiled_dir)) == ['param_mean_std', 'param_mean_std.lock']
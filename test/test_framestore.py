@@ -0,0 +1,33 @@
+from EdiHeadyTrack.framestore import FrameStore, ThumbnailStore, DiskStore
+
+TEST_FILE = 'test/resources/testvidshort.mp4'
+from EdiHeadyTrack import Video
+TEST_VIDEO = Video(TEST_FILE)
+TEST_FRAMES = list(TEST_VIDEO.frames(0, 4))
+
+def test_FrameStore():
+    store = FrameStore()
+    for idx, img in TEST_FRAMES:
+        store.add(idx, img)
+    assert len(store) == 0
+    assert store.get(0) is None
+
+def test_ThumbnailStore():
+    store = ThumbnailStore(scale=0.5, step=2)
+    for idx, img in TEST_FRAMES:
+        store.add(idx, img)
+    assert len(store) == 2
+    assert store.get(2).shape == (360, 640, 3)
+    assert store.get(1) is None
+    store.close()
+    assert len(store) == 0
+
+def test_DiskStore():
+    store = DiskStore()
+    for idx, img in TEST_FRAMES:
+        store.add(idx, img)
+    assert len(store) == 4
+    assert 3 in store
+    assert store.get(3).shape == (720, 1280, 3)
+    store.close()
+    assert store.get(3) is None
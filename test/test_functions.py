@@ -0,0 +1,50 @@
+import cv2
+import numpy as np
+import pytest
+from EdiHeadyTrack.TDDFA_v2.utils.functions import crop_img, crop_resize, resize_roi
+
+TEST_FILE = 'test/resources/testvidshort.mp4'
+SIZE = 120
+
+@pytest.fixture(scope='module')
+def img():
+    cap = cv2.VideoCapture(TEST_FILE)
+    img = cap.read()[1]
+    cap.release()
+    return img
+
+def reference(img, roi_box):
+    # crop_img, cv2.resize and normalization, as TDDFA_ONNX did before
+    crop = cv2.resize(crop_img(img, roi_box), dsize=(SIZE, SIZE), interpolation=cv2.INTER_LINEAR)
+    return crop, (crop.astype(np.float32).transpose(2, 0, 1) - 127.5) / 128.
+
+IN_FRAME = [[560.3, 120.6, 860.2, 480.9], [10, 10, 50, 50], [0, 0, 1280, 720]]
+OUT_OF_FRAME = [[1100, -60, 1400, 250], [-40.4, 500, 300, 780.2], [-100, -100, 1500, 900]]
+
+@pytest.mark.parametrize('roi_box', IN_FRAME)
+def test_resize_roi(img, roi_box):
+    crop, inp = reference(img, roi_box)
+    assert np.array_equal(resize_roi(img, roi_box, SIZE), crop)
+    assert np.allclose(crop_resize(img, roi_box, SIZE), inp, atol=1e-6)
+
+@pytest.mark.parametrize('roi_box', OUT_OF_FRAME)
+def test_resize_roi_out_of_frame(img, roi_box):
+    # warped instead of resized, which rounds some pixels the other way
+    crop, inp = reference(img, roi_box)
+    diff = np.abs(resize_roi(img, roi_box, SIZE).astype(int) - crop)
+    assert diff.max() <= 1 and diff.mean() < 0.1
+    assert np.abs(crop_resize(img, roi_box, SIZE) - inp).max() <= 1 / 128 + 1e-6
+
+def test_crop_resize_out(img):
+    out = np.full((3, SIZE, SIZE), np.nan, dtype=np.float32)
+    buf = np.empty((SIZE, SIZE, 3), dtype=np.uint8)
+    for roi_box in IN_FRAME + OUT_OF_FRAME:
+        assert crop_resize(img, roi_box, SIZE, out=out, buf=buf) is out
+        assert np.array_equal(out, crop_resize(img, roi_box, SIZE))
+        assert np.array_equal(buf, resize_roi(img, roi_box, SIZE))
+    # a batch of crops written in place
+    batch = np.empty((2, 3, SIZE, SIZE), dtype=np.float32)
+    for i, roi_box in enumerate(IN_FRAME[:1] + OUT_OF_FRAME[:1]):
+        crop_resize(img, roi_box, SIZE, out=batch[i], buf=buf)
+    assert np.array_equal(batch[1], crop_resize(img, OUT_OF_FRAME[0], SIZE))
+    assert np.array_equal(batch[0], crop_resize(img, IN_FRAME[0], SIZE))
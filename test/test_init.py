@@ -0,0 +1,29 @@
+import pytest
+
+import EdiHeadyTrack
+from EdiHeadyTrack.benchmark_import import time_import
+
+
+def test_import_is_lazy():
+    # run in a fresh interpreter, other tests have already loaded everything
+    _, loaded = time_import('import EdiHeadyTrack')
+    assert loaded == []
+    _, loaded = time_import('from EdiHeadyTrack.posedetector import TDDFA_V2, MediaPipe; '
+                            'TDDFA_V2(); MediaPipe()')
+    assert loaded == []
+
+def test_models_without_torch():
+    # the models are validated against their records, not exported again
+    _, loaded = time_import('from EdiHeadyTrack.posedetector import TDDFA_V2; '
+                            'd = TDDFA_V2(headless=True); d._build_models()')
+    assert 'onnxruntime' in loaded
+    assert 'torch' not in loaded
+
+def test_lazy_attributes():
+    from EdiHeadyTrack.posedetector import MediaPipe
+    from EdiHeadyTrack.plot import Plot
+    assert EdiHeadyTrack.MediaPipe is MediaPipe
+    assert EdiHeadyTrack.Plot is Plot
+    assert 'TDDFA_V2' in dir(EdiHeadyTrack)
+    with pytest.raises(AttributeError):
+        EdiHeadyTrack.Missing
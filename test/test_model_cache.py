@@ -0,0 +1,125 @@
+import os
+import numpy as np
+import pytest
+from EdiHeadyTrack.TDDFA_v2.utils import model_cache
+from EdiHeadyTrack.TDDFA_v2.utils.model_cache import (
+    VARIANTS, dynamic_batch, ensure_model, ensure_variant, read_record, variant_path, verify,
+)
+
+class Builder:
+    # stands in for an exporter, writing a small MatMul model
+    def __init__(self, seed=0, batch='batch'):
+        self.seed = seed
+        self.batch = batch
+        self.calls = 0
+
+    def __call__(self, wfp):
+        import onnx
+        from onnx import TensorProto, helper, numpy_helper
+        self.calls += 1
+        w = np.random.default_rng(self.seed).normal(size=(64, 32)).astype(np.float32)
+        graph = helper.make_graph(
+            [helper.make_node('MatMul', ['input', 'w'], ['output'])], 'matmul',
+            [helper.make_tensor_value_info('input', TensorProto.FLOAT, [self.batch, 64])],
+            [helper.make_tensor_value_info('output', TensorProto.FLOAT, [self.batch, 32])],
+            [numpy_helper.from_array(w, 'w')],
+        )
+        onnx.save(helper.make_model(graph, opset_imports=[helper.make_opsetid('', 13)], ir_version=8), wfp)
+        return f'builder {self.seed}'
+
+def run(model_fp, x):
+    import onnxruntime
+    session = onnxruntime.InferenceSession(model_fp, providers=['CPUExecutionProvider'])
+    return session.run(None, {'input': x})[0]
+
+@pytest.fixture
+def source(tmp_path):
+    source = tmp_path / 'model.pth'
+    source.write_bytes(b'weights')
+    return str(source)
+
+def test_record(tmp_path, source):
+    model_fp, build = str(tmp_path / 'model.onnx'), Builder()
+    assert ensure_model(model_fp, build, sources=(source,)) == model_fp
+    record = read_record(model_fp)
+    assert record['sha256'] == model_cache._sha256(model_fp)
+    assert record['size'] == os.path.getsize(model_fp)
+    assert record['exporter'] == 'builder 0'
+    assert record['sources'] == {'model.pth': model_cache._sha256(source)}
+    assert verify(model_fp, full=True, sources=(source,))
+    # later loads use the model as it is
+    ensure_model(model_fp, build, sources=(source,), full=True)
+    assert build.calls == 1
+
+def test_rebuild(tmp_path, source):
+    model_fp, build = str(tmp_path / 'model.onnx'), Builder()
+    ensure_model(model_fp, build, sources=(source,))
+    # the model is changed
+    with open(model_fp, 'r+b') as f:
+        f.seek(-4, os.SEEK_END)
+        f.write(b'\0\0\0\0')
+    assert not verify(model_fp)
+    ensure_model(model_fp, build, sources=(source,))
+    assert build.calls == 2
+    assert verify(model_fp, full=True, sources=(source,))
+    # its source is changed, which only a full check notices
+    with open(source, 'wb') as f:
+        f.write(b'new weights')
+    ensure_model(model_fp, build, sources=(source,))
+    assert build.calls == 2
+    ensure_model(model_fp, build, sources=(source,), full=True)
+    assert build.calls == 3
+    assert verify(model_fp, full=True, sources=(source,))
+
+def test_new_source(tmp_path, source):
+    model_fp, build = str(tmp_path / 'model.onnx'), Builder()
+    ensure_model(model_fp, build)
+    assert read_record(model_fp)['sources'] == {}
+    # a source missing from the record counts as changed
+    assert not verify(model_fp, full=True, sources=(source,))
+    ensure_model(model_fp, build, sources=(source,), full=True)
+    assert build.calls == 2
+
+def test_adopt(tmp_path, source):
+    model_fp, build = str(tmp_path / 'model.onnx'), Builder()
+    Builder(seed=1)(model_fp)
+    ensure_model(model_fp, build, sources=(source,))
+    assert build.calls == 0
+    record = read_record(model_fp)
+    assert record['exporter'] is None
+    assert record['sources'] == {'model.pth': model_cache._sha256(source)}
+    assert verify(model_fp, full=True, sources=(source,))
+
+def test_adopt_fixed_batch(tmp_path, source):
+    model_fp, build = str(tmp_path / 'model.onnx'), Builder()
+    # exported before the batch axis was made dynamic, so built again
+    Builder(seed=1, batch=1)(model_fp)
+    assert not dynamic_batch(model_fp)
+    ensure_model(model_fp, build, sources=(source,), adopt=dynamic_batch)
+    assert build.calls == 1
+    assert dynamic_batch(model_fp)
+    assert read_record(model_fp)['exporter'] == 'builder 0'
+    # a dynamic batch is adopted as it is
+    other_fp = str(tmp_path / 'other.onnx')
+    Builder(seed=1)(other_fp)
+    ensure_model(other_fp, build, sources=(source,), adopt=dynamic_batch)
+    assert build.calls == 1
+    assert read_record(other_fp)['exporter'] is None
+
+@pytest.mark.parametrize('variant', VARIANTS)
+def test_variant(tmp_path, variant):
+    model_fp = str(tmp_path / 'model.onnx')
+    ensure_model(model_fp, Builder())
+    variant_fp = ensure_variant(model_fp, variant)
+    assert variant_fp == variant_path(model_fp, variant) == str(tmp_path / f'model.{variant}.onnx')
+    assert read_record(variant_fp)['sources'] == {'model.onnx': read_record(model_fp)['sha256']}
+    x = np.random.default_rng(2).normal(size=(4, 64)).astype(np.float32)
+    ref = run(model_fp, x)
+    assert np.allclose(run(variant_fp, x), ref, atol=1e-4 if variant == 'opt' else 0.5)
+    # rebuilt along with the model
+    mtime = os.stat(variant_fp).st_mtime_ns
+    os.remove(model_fp)
+    ensure_model(model_fp, Builder(seed=1))
+    variant_fp = ensure_variant(model_fp, variant)
+    assert os.stat(variant_fp).st_mtime_ns != mtime
+    assert not np.allclose(run(variant_fp, x), ref, atol=0.5)
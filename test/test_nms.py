@@ -0,0 +1,31 @@
+import numpy as np
+import pytest
+from EdiHeadyTrack.TDDFA_v2.FaceBoxes.benchmark_nms import make_dets
+from EdiHeadyTrack.TDDFA_v2.FaceBoxes.utils.nms.py_cpu_nms import py_cpu_nms
+from EdiHeadyTrack.TDDFA_v2.FaceBoxes.utils.nms_wrapper import available_backends, get_backend
+
+def make_tied_dets():
+    # a grid of 10x10 boxes shifted by 5 pixels, so that neighbours overlap by
+    # exactly 1/3 horizontally and 1/7 diagonally, with distinct scores
+    xy = np.array([(x, y) for x in range(0, 40, 5) for y in range(0, 40, 5)], dtype=np.float32)
+    scores = np.random.default_rng(0).permutation(len(xy)).astype(np.float32) / len(xy)
+    return np.hstack((xy, xy + 9, scores[:, None]))
+
+@pytest.mark.parametrize('backend', available_backends())
+@pytest.mark.parametrize('n', [1, 100, 1000])
+@pytest.mark.parametrize('thresh', [0.3, 0.5])
+def test_nms_random(backend, n, thresh):
+    dets = make_dets(n)
+    nms = get_backend(backend)
+    assert [int(i) for i in nms(dets, thresh)] == [int(i) for i in py_cpu_nms(dets, thresh)]
+    # unsorted input
+    dets = dets[np.random.default_rng(1).permutation(n)]
+    assert [int(i) for i in nms(dets, thresh)] == [int(i) for i in py_cpu_nms(dets, thresh)]
+
+@pytest.mark.parametrize('backend', available_backends())
+@pytest.mark.parametrize('thresh', [1 / 7, 0.2, 1 / 3, 0.4])
+def test_nms_tied(backend, thresh):
+    # overlaps equal to thresh are kept
+    dets = make_tied_dets()
+    keep = [int(i) for i in get_backend(backend)(dets, thresh)]
+    assert keep == [int(i) for i in py_cpu_nms(dets, thresh)]
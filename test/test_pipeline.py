@@ -0,0 +1,41 @@
+from EdiHeadyTrack.pipeline import Pipeline, AsyncWriter
+
+def test_Pipeline_order():
+    pipeline = Pipeline(range(50), lambda x: x + 1, lambda x: x * 2, maxsize=2)
+    assert list(pipeline) == [(x + 1) * 2 for x in range(50)]
+
+def test_Pipeline_error():
+    def stage(x):
+        if x == 3:
+            raise ValueError('bad frame')
+        return x
+    pipeline = Pipeline(range(10), stage)
+    try:
+        list(pipeline)
+        assert False
+    except ValueError as error:
+        assert str(error) == 'bad frame'
+
+def test_Pipeline_close():
+    pipeline = Pipeline(range(1000), lambda x: x, maxsize=1)
+    for item in pipeline:
+        if item == 5:
+            break
+    pipeline.close()
+    assert pipeline._threads == []
+
+def test_AsyncWriter():
+    class Writer:
+        def __init__(self):
+            self.frames = []
+            self.released = False
+        def write(self, frame):
+            self.frames.append(frame)
+        def release(self):
+            self.released = True
+    writer = AsyncWriter(Writer())
+    for frame in range(20):
+        writer.write(frame)
+    writer.release()
+    assert writer.writer.frames == list(range(20))
+    assert writer.writer.released
@@ -7,7 +7,7 @@ from EdiHeadyTrack import Camera
 TEST_CAMERA = Camera()
 SHOW = False
 from EdiHeadyTrack.posedetector import MediaPipe
-MEDIAPIPE = MediaPipe(TEST_VIDEO, TEST_CAMERA, SHOW)
+MEDIAPIPE = MediaPipe(TEST_VIDEO, TEST_CAMERA, SHOW).run()
 from EdiHeadyTrack import Filter
 FILTER = Filter().low_pass_butterworth(fs=4000, lowcut=160, order=4)
 from EdiHeadyTrack import Head
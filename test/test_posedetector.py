@@ -1,10 +1,17 @@
-from EdiHeadyTrack.posedetector import PoseDetector, MediaPipe, TDDFA_V2
+from itertools import islice
+
+import numpy as np
+import pytest
+from EdiHeadyTrack.posedetector import PoseDetector, MediaPipe, TDDFA_V2, _landmark_xy
 
 TEST_FILE = 'test/resources/testvidshort.mp4'
 from EdiHeadyTrack import Video
 TEST_VIDEO = Video(TEST_FILE)
 from EdiHeadyTrack import Camera
 TEST_CAMERA = Camera()
+from EdiHeadyTrack.framestore import ThumbnailStore
+from EdiHeadyTrack.scheduler import DetectionScheduler, HealthScheduler
+from EdiHeadyTrack.resolution import Resolution
 SHOW = False
 
 def test_PoseDetector():
@@ -13,12 +20,161 @@ def test_PoseDetector():
     assert type(posedetector.video) == Video
 
 def test_MediaPipe():
-    mediapipe = MediaPipe(TEST_VIDEO, TEST_CAMERA, SHOW)
-    assert mediapipe.face2d['key landmark positions'][0][0] == [723, 253]
+    mediapipe = MediaPipe(TEST_VIDEO, TEST_CAMERA, SHOW).run()
+    assert mediapipe.face2d['key landmark positions'][0][0].tolist() == [723, 253]
     # assert round(mediapipe.pose['yaw'][0], 2) == 0.0
     assert round(mediapipe.pose['yaw'][0], 2) == -6.51
 
+def test_landmark_xy():
+    from mediapipe.framework.formats.landmark_pb2 import NormalizedLandmarkList
+    xyz = np.random.default_rng(0).uniform(-0.1, 1.1, (478, 3)).astype(np.float32)
+    xyz[0] = 0
+    landmark_list = NormalizedLandmarkList()
+    for x, y, z in xyz.tolist():
+        landmark_list.landmark.add(x=x, y=y, z=z)
+    expected = np.array([(lm.x, lm.y) for lm in landmark_list.landmark], dtype=np.float64)
+    assert np.array_equal(_landmark_xy(landmark_list), expected)
+    # read one by one when laid out otherwise
+    landmark_list.landmark[5].visibility = 0.5
+    landmark_list.landmark[7].ClearField('z')
+    assert np.array_equal(_landmark_xy(landmark_list), expected)
+    assert _landmark_xy(NormalizedLandmarkList()).shape == (0, 2)
+
+def test_MediaPipe_lazy():
+    mediapipe = MediaPipe(TEST_VIDEO, TEST_CAMERA, SHOW, headless=True)
+    assert len(mediapipe.pose['yaw']) == 0
+    stream = mediapipe.stream()
+    first, second = islice(stream, 2)
+    stream.close()
+    assert first['frame'] < second['frame']
+    assert first['key landmark positions'][0].tolist() == [723, 253]
+    assert round(first['yaw'], 2) == -6.51
+
+def test_MediaPipe_run_reuse():
+    mediapipe = MediaPipe(headless=True)
+    assert mediapipe.run(TEST_VIDEO) is mediapipe
+    first = mediapipe.pose['yaw'].copy()
+    mediapipe.run(TEST_VIDEO)
+    assert mediapipe.pose['yaw'].tolist() == first.tolist()
+
+def test_MediaPipe_pipeline():
+    mediapipe = MediaPipe(TEST_VIDEO, TEST_CAMERA, SHOW, pipeline=True, frame_store=ThumbnailStore()).run()
+    assert mediapipe.face2d['key landmark positions'][0][0].tolist() == [723, 253]
+    assert round(mediapipe.pose['yaw'][0], 2) == -6.51
+    assert mediapipe.pose['frame'].tolist() == sorted(mediapipe.pose['frame'])
+    assert len(mediapipe.tracking_frames) == len(list(TEST_VIDEO.frames()))
+
+
+def test_MediaPipe_shards():
+    serial = MediaPipe(TEST_VIDEO, TEST_CAMERA, SHOW).run()
+    sharded = MediaPipe(TEST_VIDEO, TEST_CAMERA, SHOW, shards=2, overlap=5).run()
+    assert sharded.pose['frame'].tolist() == serial.pose['frame'].tolist()
+    # the first shard starts at frame 0 so matches the serial run exactly
+    half = TEST_VIDEO.total_frames // 2
+    assert sharded.pose['yaw'][:half].tolist() == serial.pose['yaw'][:half].tolist()
+    assert len(sharded.tracking_frames) == 0
+
+def test_MediaPipe_solve_poses():
+    mediapipe = MediaPipe(TEST_VIDEO, TEST_CAMERA, SHOW, headless=True).run()
+    yaw = mediapipe.pose['yaw'].copy()
+    mediapipe.solve_poses(TEST_CAMERA, threads=2)
+    assert np.allclose(mediapipe.pose['yaw'], yaw, atol=1e-3)
+    assert mediapipe.rmats.shape == (len(yaw), 3, 3)
+
+def test_MediaPipe_roi():
+    full = MediaPipe(TEST_VIDEO, TEST_CAMERA, SHOW, headless=True).run()
+    roi = MediaPipe(TEST_VIDEO, TEST_CAMERA, SHOW, headless=True, roi=True).run()
+    assert roi.pose['frame'].tolist() == full.pose['frame'].tolist()
+    # the first frame is found in the whole frame, later ones in a crop
+    assert roi.face2d['key landmark positions'][0][0].tolist() == [723, 253]
+    assert roi._roi_mesh_window is not None
+    assert np.abs(roi.face2d['all landmark positions'][10:].astype(int)
+                  - full.face2d['all landmark positions'][10:]).max() <= 3
+    assert np.allclose(roi.pose['yaw'][10:], full.pose['yaw'][10:], atol=1)
+
+def test_MediaPipe_resolution():
+    full = MediaPipe(TEST_VIDEO, TEST_CAMERA, SHOW, headless=True).run()
+    small = MediaPipe(TEST_VIDEO, TEST_CAMERA, SHOW, headless=True, resolution=Resolution(640)).run()
+    assert small.pose['frame'].tolist() == full.pose['frame'].tolist()
+    # landmarks are given in full resolution pixels
+    assert np.median(np.abs(small.face2d['all landmark positions'].astype(int)
+                            - full.face2d['all landmark positions'])) <= 2
+    assert np.allclose(small.pose['yaw'], full.pose['yaw'], atol=3)
+
+def test_MediaPipe_headless(tmp_path):
+    mediapipe = MediaPipe(TEST_VIDEO, TEST_CAMERA, SHOW, headless=True).run()
+    assert mediapipe.face2d['key landmark positions'][0][0].tolist() == [723, 253]
+    assert round(mediapipe.pose['yaw'][0], 2) == -6.51
+    assert len(mediapipe.tracking_frames) == 0
+    assert mediapipe.get_frame(mediapipe.pose['frame'][0]).shape == (720, 1280, 3)
+    mediapipe.render(str(tmp_path / 'tracking.mp4'))
+    assert Video(str(tmp_path / 'tracking.mp4')).total_frames > 0
     
 def test_TDDFA():
-    tddfa = TDDFA_V2(TEST_VIDEO, TEST_CAMERA, SHOW)
-#     tddfa = TDDFA_V2(TEST_VIDEO, TEST_CAMERA, SHOW)
\ No newline at end of file
+    tddfa = TDDFA_V2(TEST_VIDEO, TEST_CAMERA, SHOW).run()
+
+def test_TDDFA_smooth():
+    with pytest.raises(ValueError):
+        TDDFA_V2(TEST_VIDEO, TEST_CAMERA, SHOW, smooth=True)
+
+def test_TDDFA_stream():
+    tddfa = TDDFA_V2(TEST_VIDEO, TEST_CAMERA, SHOW, headless=True)
+    assert len(tddfa.pose['yaw']) == 0
+    assert not hasattr(tddfa, 'tddfa')
+    rows = list(islice(tddfa.stream(), 3))
+    assert [row['frame'] for row in rows] == sorted(row['frame'] for row in rows)
+    assert rows[0]['param'].shape == (62,)
+    # the models are kept for the next run
+    models = tddfa.tddfa
+    tddfa.run()
+    assert tddfa.tddfa is models
+    assert tddfa.pose['yaw'][:3].tolist() == [row['yaw'] for row in rows]
+
+def test_TDDFA_params():
+    tddfa = TDDFA_V2(TEST_VIDEO, TEST_CAMERA, SHOW, headless=True).run()
+    assert tddfa.params['param'].shape == (len(tddfa.pose['yaw']), 62)
+    assert tddfa.params['param'].dtype == np.float32
+    frame = tddfa.params['frame'][0]
+    angles = tddfa.reconstruction.angles(frame)
+    assert np.allclose(angles[0], tddfa.pose['yaw'][0], atol=1e-3)
+    assert np.allclose(-angles[1], tddfa.pose['pitch'][0], atol=1e-3)
+    vertices = tddfa.reconstruction.vertices(frame)
+    assert vertices.shape == (3, 68)
+    assert np.rint(vertices[0].min()) == tddfa.face2d['all landmark positions'][0][2][0]
+#     tddfa = TDDFA_V2(TEST_VIDEO, TEST_CAMERA, SHOW)
+
+def test_TDDFA_model_variant():
+    exported = TDDFA_V2(TEST_VIDEO, TEST_CAMERA, SHOW, headless=True).run()
+    optimized = TDDFA_V2(TEST_VIDEO, TEST_CAMERA, SHOW, headless=True, model_variant='opt').run()
+    assert optimized.tddfa.session is not exported.tddfa.session
+    assert np.allclose(optimized.pose['yaw'], exported.pose['yaw'], atol=1e-3)
+    quantized = TDDFA_V2(TEST_VIDEO, TEST_CAMERA, SHOW, headless=True, model_variant='int8').run()
+    assert quantized.tddfa.session is not exported.tddfa.session
+    assert quantized.tddfa.session.get_inputs()[0].name == exported.tddfa.session.get_inputs()[0].name
+    assert np.allclose(quantized.pose['yaw'], exported.pose['yaw'], atol=5)
+
+def test_TDDFA_fused_io():
+    exported = TDDFA_V2(TEST_VIDEO, TEST_CAMERA, SHOW, headless=True).run()
+    fused = TDDFA_V2(TEST_VIDEO, TEST_CAMERA, SHOW, headless=True, fused_io=True).run()
+    assert fused.tddfa.fused_io and fused.face_boxes.fused_io
+    assert np.array_equal(fused.pose['frame'], exported.pose['frame'])
+    for angle in ('yaw', 'pitch', 'roll'):
+        assert np.allclose(fused.pose[angle], exported.pose[angle], atol=1e-6)
+    assert np.array_equal(fused.face2d['all landmark positions'], exported.face2d['all landmark positions'])
+
+def test_TDDFA_sparse_pose():
+    exported = TDDFA_V2(TEST_VIDEO, TEST_CAMERA, SHOW, headless=True).run()
+    sparse = TDDFA_V2(TEST_VIDEO, TEST_CAMERA, SHOW, headless=True, sparse_pose=True).run()
+    assert sparse.tddfa.sparse_pose
+    assert np.array_equal(sparse.pose['frame'], exported.pose['frame'])
+    for angle in ('yaw', 'pitch', 'roll'):
+        assert np.allclose(sparse.pose[angle], exported.pose[angle], atol=1e-4)
+    assert np.array_equal(sparse.face2d['all landmark positions'], exported.face2d['all landmark positions'])
+
+def test_TDDFA_scheduler():
+    scheduler = HealthScheduler(period=20)
+    tddfa = TDDFA_V2(TEST_VIDEO, TEST_CAMERA, SHOW, headless=True, scheduler=scheduler).run()
+    assert scheduler.detections == 1 + (len(tddfa.pose['yaw']) - 1) // 20
+    assert np.all(np.abs(tddfa.pose['yaw']) < 10)
+    # only the collapse of the region of interest by default
+    assert type(TDDFA_V2(TEST_VIDEO, TEST_CAMERA, SHOW, headless=True).scheduler) is DetectionScheduler
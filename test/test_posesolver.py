@@ -0,0 +1,41 @@
+import cv2
+import numpy as np
+from EdiHeadyTrack.posesolver import PoseSolver, solve_poses
+
+from EdiHeadyTrack import Camera
+TEST_CAMERA = Camera()
+FACE3D = [[0, -1.126865, 7.475604],
+          [-4.445859, 2.663991, 3.173422],
+          [-2.456206, -4.342621, 4.283884],
+          [0, -9.403378, 4.264492],
+          [4.445859, 2.663991, 3.173422],
+          [2.456206, -4.342621, 4.283884]]
+
+def project(rot_vec):
+    trans_vec = np.array([[1.], [-2.], [60.]])
+    face2d = cv2.projectPoints(np.array(FACE3D), rot_vec, trans_vec,
+                               TEST_CAMERA.internal_matrix, TEST_CAMERA.distortion_matrix)[0]
+    return face2d.reshape(-1, 2)
+
+def test_PoseSolver():
+    solver = PoseSolver(FACE3D, TEST_CAMERA)
+    for angle in np.linspace(0, 0.3, 10):
+        rot_vec = np.array([[angle], [angle / 2], [0.05]])
+        angles = solver.solve(project(rot_vec))
+        expected = cv2.RQDecomp3x3(cv2.Rodrigues(rot_vec)[0])[0]
+        assert np.allclose(angles, expected, atol=1e-4)
+
+def test_PoseSolver_reset():
+    solver = PoseSolver(FACE3D, TEST_CAMERA)
+    solver.solve(project(np.array([[0.1], [0.2], [0.]])))
+    assert solver.rot_vec is not None
+    solver.reset()
+    assert solver.rot_vec is None
+
+def test_solve_poses():
+    rot_vecs = np.array([[angle, angle / 2, 0.05] for angle in np.linspace(0, 0.3, 10)])
+    face2d = np.array([project(rot_vec[:, None]) for rot_vec in rot_vecs])
+    rmats, angles = solve_poses(face2d, FACE3D, TEST_CAMERA, threads=2)
+    expected = np.array([cv2.RQDecomp3x3(cv2.Rodrigues(rot_vec)[0])[0] for rot_vec in rot_vecs])
+    assert rmats.shape == (10, 3, 3)
+    assert np.allclose(angles, expected, atol=1e-4)
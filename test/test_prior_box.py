@@ -0,0 +1,50 @@
+from itertools import product
+from math import ceil
+
+import numpy as np
+import pytest
+from EdiHeadyTrack.TDDFA_v2.FaceBoxes.utils.config import cfg
+from EdiHeadyTrack.TDDFA_v2.FaceBoxes.utils.prior_box import PriorBox, prior_boxes
+
+SIZES = [(720, 1080), (480, 640), (333, 517), (64, 96)]
+
+def reference(image_size):
+    # PriorBox.forward as it was, one anchor at a time
+    anchors = []
+    for k, step in enumerate(cfg['steps']):
+        f = [ceil(image_size[0] / step), ceil(image_size[1] / step)]
+        for i, j in product(range(f[0]), range(f[1])):
+            for min_size in cfg['min_sizes'][k]:
+                s_kx = min_size / image_size[1]
+                s_ky = min_size / image_size[0]
+                if min_size == 32:
+                    dense = [0, 0.25, 0.5, 0.75]
+                elif min_size == 64:
+                    dense = [0, 0.5]
+                else:
+                    dense = [0.5]
+                for dy, dx in product(dense, dense):
+                    anchors += [(j + dx) * step / image_size[1], (i + dy) * step / image_size[0], s_kx, s_ky]
+    output = np.array(anchors, dtype=np.float32).reshape(-1, 4)
+    if cfg['clip']:
+        np.clip(output, 0, 1, out=output)
+    return output
+
+@pytest.mark.parametrize('image_size', SIZES)
+def test_prior_boxes(image_size):
+    priors = prior_boxes(image_size)
+    assert priors.dtype == np.float32
+    assert np.array_equal(priors, reference(image_size))
+
+@pytest.mark.parametrize('image_size', SIZES[:2])
+def test_PriorBox(image_size):
+    pytest.importorskip('torch')
+    assert np.array_equal(PriorBox(image_size=image_size).forward().numpy(), reference(image_size))
+
+def test_prior_boxes_cached():
+    priors = prior_boxes((720, 1080))
+    assert prior_boxes((720, 1080)) is priors
+    assert prior_boxes((480, 640)) is not priors
+    assert not priors.flags.writeable
+    with pytest.raises(ValueError):
+        priors[0, 0] = 0
@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+from EdiHeadyTrack.reconstruction import Reconstruction
+from EdiHeadyTrack.results import Results
+from EdiHeadyTrack.TDDFA_v2.utils.pose import calc_pose
+from EdiHeadyTrack.TDDFA_v2.utils.tddfa_util import recon_vers_seq
+
+class Model:
+    # stands in for TDDFA_ONNX with small random bases
+    tri = np.zeros((1, 3), dtype=np.int32)
+
+    def __init__(self):
+        rng = np.random.default_rng(0)
+        self.bases = {False: (rng.normal(size=(3 * 68, 1)), rng.normal(size=(3 * 68, 50))),
+                      True: (rng.normal(size=(3 * 200, 1)), rng.normal(size=(3 * 200, 50)))}
+        self.calls = 0
+
+    def recon_seq(self, params, roi_boxes, dense_flag=False):
+        self.calls += 1
+        u, w = self.bases[dense_flag]
+        return recon_vers_seq(params, roi_boxes, u.astype(np.float32), w.astype(np.float32), 120)
+
+def make_params():
+    rng = np.random.default_rng(1)
+    params = Results({'frame': np.int64, 'param': np.float32, 'roi box': np.float32}, 4)
+    for idx in (0, 1, 3):
+        rot = np.eye(3) * 1e-3 + rng.normal(scale=1e-4, size=(3, 3))
+        param = np.concatenate((np.hstack((rot, rng.normal(size=(3, 1)))).ravel(), rng.normal(size=50)))
+        params.add(idx, {'frame': idx, 'param': param, 'roi box': [10, 20, 130, 140]})
+    return params
+
+def test_Reconstruction():
+    params = make_params()
+    model = Model()
+    reconstruction = Reconstruction(params, model)
+    assert len(reconstruction) == 3
+    assert reconstruction.vertices().shape == (3, 3, 68)
+    assert reconstruction.vertices(3).shape == (3, 68)
+    assert np.allclose(reconstruction.angles(1), calc_pose(params['param'][1])[1], atol=1e-3)
+    assert reconstruction.pose_box(0).shape == (10, 2)
+    with pytest.raises(KeyError):
+        reconstruction.vertices(2)
+
+def test_Reconstruction_cache():
+    params = make_params()
+    model = Model()
+    reconstruction = Reconstruction(params, model, cache_size=1)
+    reconstruction.vertices(0)
+    reconstruction.vertices(1)
+    assert model.calls == 1
+    assert reconstruction.mesh(0).shape == (3, 200)
+    reconstruction.mesh(0)
+    assert model.calls == 2
+    reconstruction.mesh(1)
+    reconstruction.mesh(0)
+    assert model.calls == 4
+    # adding a frame invalidates the sequence
+    params.add(2, {'frame': 2, 'param': params['param'][0], 'roi box': [10, 20, 130, 140]})
+    assert reconstruction.vertices().shape == (4, 3, 68)
+
+def test_Reconstruction_mesh_merge():
+    params = make_params()
+    model = Model()
+    reconstruction = Reconstruction(params, model)
+    meshes = {frame: reconstruction.mesh(frame) for frame in (0, 1, 3)}
+    # a frame merged in before the others shifts the rows after it
+    other = Results(dict(params.dtypes), 4)
+    other.add(2, {'frame': 2, 'param': params['param'][0] * 2, 'roi box': [0, 0, 120, 120]})
+    params.merge(other)
+    for frame in (0, 1, 3):
+        assert np.array_equal(reconstruction.mesh(frame), meshes[frame])
+    assert not np.array_equal(reconstruction.mesh(2), meshes[3])
+    ref = Reconstruction(params, Model())
+    for frame in range(4):
+        assert np.array_equal(reconstruction.mesh(frame), ref.mesh(frame))
@@ -0,0 +1,20 @@
+import numpy as np
+from EdiHeadyTrack.resolution import Resolution
+
+def test_Resolution():
+    assert Resolution().scale((720, 1280, 3)) == 1
+    assert Resolution(max_side=640).scale((720, 1280, 3)) == 0.5
+    assert Resolution(max_side=1920).scale((720, 1280, 3)) == 1
+    assert Resolution(face_size=384).scale((720, 1280, 3)) == 0.5
+    # the smaller of the two limits is used, and can be given per call
+    assert Resolution(max_side=960, face_size=384).scale((720, 1280, 3)) == 0.5
+    assert Resolution(max_side=960).scale((720, 1280, 3), face_size=768) == 0.25
+
+def test_Resolution_resize():
+    img = np.zeros((720, 1280, 3), dtype=np.uint8)
+    small, scale = Resolution(max_side=427).resize(img)
+    assert small.shape == (240, 427, 3)
+    assert scale == (427 / 1280, 240 / 720)
+    same, scale = Resolution().resize(img)
+    assert same is img
+    assert scale == (1, 1)
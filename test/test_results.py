@@ -0,0 +1,73 @@
+import numpy as np
+from EdiHeadyTrack.results import Results
+
+def make_results():
+    results = Results({'frame': np.int64,
+                       'yaw': np.float64,
+                       'all landmark positions': np.int16}, 4)
+    for idx in (0, 2, 5):
+        results.add(idx, {'frame': idx + 1,
+                          'yaw': idx / 10,
+                          'all landmark positions': [[idx, idx], [idx, 2*idx]]})
+    return results
+
+def test_Results():
+    results = make_results()
+    assert list(results.keys()) == ['frame', 'yaw', 'all landmark positions']
+    assert results['frame'].tolist() == [1, 3, 6]
+    assert results['all landmark positions'].shape == (3, 2, 2)
+    assert results['all landmark positions'].dtype == np.int16
+    assert results.row(3) == 1
+    assert results.row(2) is None
+    results['yaw'] = np.zeros(3)
+    assert results.to_dict()['yaw'] == [0.0, 0.0, 0.0]
+
+def test_Results_merge():
+    results = Results({'frame': np.int64,
+                       'yaw': np.float64,
+                       'all landmark positions': np.int16})
+    results.add(1, {'frame': 2, 'yaw': 0.5})
+    results.merge(make_results())
+    assert results['frame'].tolist() == [1, 2, 3, 6]
+    assert results['yaw'].tolist() == [0.0, 0.5, 0.2, 0.5]
+
+def test_Results_views():
+    results = Results({'frame': np.int64, 'yaw': np.float64}, 8)
+    for idx in range(3):
+        results.add(idx, {'frame': idx + 1, 'yaw': idx / 10})
+    # tracked in order, so columns are read-only views, kept until a change
+    yaw = results['yaw']
+    assert np.shares_memory(yaw, results.columns['yaw'])
+    assert not yaw.flags.writeable
+    assert results['yaw'] is yaw
+    results.add(3, {'frame': 4, 'yaw': 0.3})
+    assert results['yaw'] is not yaw
+    assert results['yaw'].tolist() == [0.0, 0.1, 0.2, 0.3]
+    # a gap, so the tracked rows are gathered once
+    results.add(6, {'frame': 7, 'yaw': 0.6})
+    yaw = results['yaw']
+    assert not np.shares_memory(yaw, results.columns['yaw'])
+    assert results['yaw'] is yaw
+    assert yaw.tolist() == [0.0, 0.1, 0.2, 0.3, 0.6]
+    results['yaw'] = np.ones(5)
+    assert results['yaw'].tolist() == [1.0] * 5
+
+def test_Results_row():
+    results = make_results()
+    assert [results.row(frame) for frame in range(8)] == [None, 0, None, 1, None, None, 2, None]
+    # rows merged in before the others
+    other = Results(dict(results.dtypes))
+    other.add(1, {'frame': 2})
+    results.merge(other)
+    assert [results.row(frame) for frame in (1, 2, 3, 6)] == [0, 1, 2, 3]
+    # frames out of order are still found
+    results['frame'] = [6, 3, 2, 1]
+    assert [results.row(frame) for frame in (1, 2, 3, 6, 4)] == [3, 2, 1, 0, None]
+
+def test_Results_index():
+    results = make_results()
+    assert [results.index(frame) for frame in (1, 3, 6, 2)] == [0, 2, 5, None]
+    full = Results({'frame': np.int64}, 4)
+    for idx in range(3):
+        full.add(idx, {'frame': idx + 10})
+    assert [full.index(frame) for frame in (10, 11, 12)] == [0, 1, 2]
@@ -0,0 +1,54 @@
+import numpy as np
+from EdiHeadyTrack.scheduler import DetectionScheduler, HealthScheduler
+
+def face(x0, y0, size):
+    # landmarks spread over a square, with the region of interest the
+    # tracker would crop around them
+    rng = np.random.default_rng(0)
+    xy = rng.uniform(0, 1, size=(2, 68)) * size + [[x0], [y0]]
+    center, radius = [x0 + size / 2, y0 + size / 2], size / 2
+    roi_box = [center[0] - np.sqrt(2) * radius, center[1] - np.sqrt(2) * radius,
+               center[0] + np.sqrt(2) * radius, center[1] + np.sqrt(2) * radius]
+    return roi_box, np.vstack((xy, np.zeros((1, 68))))
+
+def test_DetectionScheduler():
+    scheduler = DetectionScheduler()
+    assert not scheduler.needs_detection(1, [0, 0, 100, 100], None)
+    assert scheduler.needs_detection(1, [0, 0, 40, 40], None)
+    assert scheduler.search_window((720, 1280, 3)) is None
+    assert scheduler.last_attempt == 1
+    scheduler.update(1, [0, 0, 100, 100], detected=True)
+    assert scheduler.detections == 1
+    assert scheduler.last_detection == 1
+
+def test_HealthScheduler():
+    scheduler = HealthScheduler()
+    roi_box, ver = face(400, 200, 300)
+    scheduler.update(0, roi_box, detected=True)
+    assert not scheduler.needs_detection(1, roi_box, ver)
+    assert 0.08 < scheduler.health['spread'] < 0.35
+    # a sudden jump of the region of interest
+    jumped, ver = face(600, 200, 300)
+    assert scheduler.needs_detection(2, jumped, ver)
+    # landmarks collapsed to a point
+    assert scheduler.needs_detection(2, roi_box, np.full((3, 68), 500.))
+
+def test_HealthScheduler_period():
+    scheduler = HealthScheduler(period=5)
+    roi_box, ver = face(400, 200, 300)
+    scheduler.update(0, roi_box, detected=True)
+    assert not scheduler.needs_detection(4, roi_box, ver)
+    assert scheduler.needs_detection(5, roi_box, ver)
+    # the face is not found, which is not retried before the next period
+    scheduler.update(5, roi_box)
+    assert scheduler.last_detection == 0 and scheduler.last_attempt == 5
+    assert not any(scheduler.needs_detection(idx, roi_box, ver) for idx in range(6, 10))
+    assert scheduler.needs_detection(10, roi_box, ver)
+
+def test_HealthScheduler_search_window():
+    scheduler = HealthScheduler(margin=0.5)
+    assert scheduler.search_window((720, 1280, 3)) is None
+    scheduler.update(0, [100, 200, 300, 400])
+    assert scheduler.search_window((720, 1280, 3)) == (0, 100, 400, 500)
+    scheduler.update(1, [1200, 600, 1400, 800])
+    assert scheduler.search_window((720, 1280, 3)) == (1100, 500, 1280, 720)
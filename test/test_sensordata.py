@@ -12,7 +12,7 @@ from EdiHeadyTrack import Camera
 TEST_CAMERA = Camera()
 SHOW = False
 from EdiHeadyTrack.posedetector import MediaPipe
-MEDIAPIPE = MediaPipe(TEST_VIDEO, TEST_CAMERA, SHOW)
+MEDIAPIPE = MediaPipe(TEST_VIDEO, TEST_CAMERA, SHOW).run()
 Head._counter=0
 
 def test_Head_counter():
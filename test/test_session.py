@@ -0,0 +1,32 @@
+import yaml
+from EdiHeadyTrack.TDDFA_v2.FaceBoxes.FaceBoxes_ONNX import FaceBoxes_ONNX
+from EdiHeadyTrack.TDDFA_v2.TDDFA_ONNX import TDDFA_ONNX, make_abs_path
+from EdiHeadyTrack.TDDFA_v2.utils.session import clear_sessions
+
+with open(make_abs_path('configs/mb1_120x120.yml')) as f:
+    CFG = yaml.load(f, Loader=yaml.SafeLoader)
+
+def test_TDDFA_ONNX_sessions():
+    clear_sessions()
+    first = TDDFA_ONNX(**CFG)
+    second = TDDFA_ONNX(**CFG, session_options={})
+    assert second.session is first.session
+    assert second.bfm_session is first.bfm_session
+    # options given in another order are the same options
+    single = TDDFA_ONNX(**CFG, session_options={'intra_op_num_threads': 1, 'graph_optimization_level': 'all'})
+    again = TDDFA_ONNX(**CFG, session_options={'graph_optimization_level': 'all', 'intra_op_num_threads': 1})
+    assert single.session is again.session
+    assert single.session is not first.session
+    assert single.bfm_session is not first.bfm_session
+    clear_sessions()
+    assert TDDFA_ONNX(**CFG).session is not first.session
+
+def test_FaceBoxes_ONNX_sessions():
+    clear_sessions()
+    first, second = FaceBoxes_ONNX(), FaceBoxes_ONNX()
+    assert second.session is first.session
+    single = FaceBoxes_ONNX(session_options={'intra_op_num_threads': 1})
+    assert single.session is not first.session
+    assert FaceBoxes_ONNX(session_options={'intra_op_num_threads': 1}).session is single.session
+    # the fused model is another model
+    assert FaceBoxes_ONNX(fused_io=True).session is not first.session
@@ -0,0 +1,84 @@
+import cv2
+import numpy as np
+import pytest
+import yaml
+from EdiHeadyTrack.TDDFA_v2.TDDFA_ONNX import TDDFA_ONNX, make_abs_path
+from EdiHeadyTrack.TDDFA_v2.utils.model_cache import tddfa_onnx_path
+from EdiHeadyTrack.TDDFA_v2.utils.session import get_session
+from EdiHeadyTrack.TDDFA_v2.utils.tddfa_util import recon_vers_seq
+
+TEST_FILE = 'test/resources/testvidshort.mp4'
+
+@pytest.fixture(scope='module')
+def tddfa():
+    with open(make_abs_path('configs/mb1_120x120.yml')) as f:
+        cfg = yaml.load(f, Loader=yaml.SafeLoader)
+    return TDDFA_ONNX(**cfg)
+
+@pytest.fixture(scope='module')
+def frames():
+    cap = cv2.VideoCapture(TEST_FILE)
+    frames = [cap.read()[1] for _ in range(3)]
+    cap.release()
+    # a face box, a shifted one, and one partly out of the frame
+    face = [560, 120, 860, 480, 0.99]
+    objs_lst = [
+        [face, [600, 140, 880, 500, 0.9]],
+        [],
+        [face, [1100, -60, 1400, 250, 0.8], [40, 500, 300, 780, 0.7]],
+    ]
+    return frames, objs_lst
+
+def fixed_batch_model(model_fp, wfp, batch_size):
+    # the model with its batch axis fixed, as exported before it was made dynamic
+    import onnx
+    from onnx import numpy_helper
+    model = onnx.load(model_fp)
+    for value in list(model.graph.input) + list(model.graph.output):
+        dim = value.type.tensor_type.shape.dim[0]
+        dim.Clear()
+        dim.dim_value = batch_size
+    for node in model.graph.node:
+        if node.op_type == 'Constant' and numpy_helper.to_array(node.attribute[0].t).tolist() == [1, -1]:
+            node.attribute[0].t.CopyFrom(numpy_helper.from_array(np.array([batch_size, -1], dtype=np.int64)))
+    onnx.save(model, wfp)
+    return wfp
+
+def check_batch(tddfa, frames, objs_lst):
+    param_lst_lst, roi_box_lst_lst = tddfa.batch(frames, objs_lst)
+    assert [len(param_lst) for param_lst in param_lst_lst] == [len(objs) for objs in objs_lst]
+    for img, objs, param_lst, roi_box_lst in zip(frames, objs_lst, param_lst_lst, roi_box_lst_lst):
+        for obj, param, roi_box in zip(objs, param_lst, roi_box_lst):
+            (ref_param,), (ref_roi_box,) = tddfa(img, [obj])
+            assert param.shape == (62,)
+            assert np.allclose(param, ref_param, rtol=1e-4, atol=1e-4)
+            assert np.array_equal(roi_box, ref_roi_box)
+
+def test_batch(tddfa, frames):
+    check_batch(tddfa, *frames)
+
+def test_batch_fixed(tddfa, frames, tmp_path, monkeypatch):
+    # 5 crops in chunks of 2 and of 4, the last chunk padded
+    model_fp = tddfa_onnx_path()
+    for batch_size in (2, 4):
+        session = get_session(fixed_batch_model(model_fp, str(tmp_path / f'fixed_{batch_size}.onnx'), batch_size))
+        assert session.get_inputs()[0].shape[0] == batch_size
+        monkeypatch.setattr(tddfa, 'session', session)
+        monkeypatch.setattr(tddfa, 'batch_size', batch_size)
+        check_batch(tddfa, *frames)
+
+@pytest.mark.parametrize('dense_flag', [False, True])
+def test_recon_seq(tddfa, frames, dense_flag):
+    param_lst_lst, roi_box_lst_lst = tddfa.batch(*frames)
+    param_lst = [param for param_lst in param_lst_lst for param in param_lst]
+    roi_box_lst = [roi_box for roi_box_lst in roi_box_lst_lst for roi_box in roi_box_lst]
+    ref = np.stack(tddfa.recon_vers(param_lst, roi_box_lst, dense_flag=dense_flag))
+    ver = tddfa.recon_seq(np.stack(param_lst), np.stack(roi_box_lst), dense_flag=dense_flag)
+    assert ver.shape == ref.shape and ver.dtype == np.float32
+    # float32 vertices up to about 1000 pixels from the origin, within a few ulp
+    assert np.allclose(ver, ref, rtol=0, atol=1e-3)
+    # in chunks smaller than the sequence
+    u, w = (tddfa.bfm.u, tddfa.bfm.w) if dense_flag else (tddfa.bfm.u_base, tddfa.bfm.w_base)
+    chunked = recon_vers_seq(param_lst, roi_box_lst, u, w, tddfa.size, chunk=2)
+    assert np.allclose(chunked, ver, rtol=0, atol=1e-3)
+    assert recon_vers_seq(param_lst, roi_box_lst, u, w, tddfa.size, dtype=np.float64, chunk=3).dtype == np.float64
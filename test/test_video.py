@@ -24,4 +24,9 @@ def test_get_length():
 
 def test_get_fps():
     fps = TEST_VIDEO.get_fps()
-    assert fps == 240
\ No newline at end of file
+    assert fps == 240
+
+def test_frames():
+    frames = list(TEST_VIDEO.frames(10, 15))
+    assert [idx for idx, frame in frames] == [10, 11, 12, 13, 14]
+    assert frames[0][1].shape == (720, 1280, 3)